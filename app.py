@@ -1,43 +1,63 @@
-from flask import Flask, request, send_file, render_template, jsonify, redirect, url_for, session
+from flask import Flask, Blueprint, Response, request, send_file, render_template, jsonify, redirect, url_for, session, abort, stream_with_context
+from flask.cli import ScriptInfo
+from werkzeug.middleware.proxy_fix import ProxyFix
 from flask_login import LoginManager, login_required, current_user, login_user, logout_user
 from gigforge import utils, payments, ai_stub
-from gigforge.models import db, User, Client, Invoice, Gig, InvoiceItem
-from gigforge import fiverr_api
-import io, os, json
+from gigforge.models import db, User, Client, Invoice, Gig, InvoiceItem, UserStats, Job, ApiToken, rebuild_rollups
+from gigforge.render_cache import cache_key
+from gigforge import analytics, assets, auth, bulk, engines, generation, pricing, promo, search, fiverr_api, fiverr_sync, jobs, listing, metrics
+import io, os, json, time, zipfile
+import click
 from datetime import datetime
 
-app = Flask(__name__, static_folder="static", template_folder="templates")
-app.config['JSON_SORT_KEYS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-prod')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///nightanvil.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-
-db.init_app(app)
+bp = Blueprint("main", __name__, cli_group=None)
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
+
+DASHBOARD_RECENT_INVOICES = 5
+DASHBOARD_RECENT_GIGS = 20
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return auth.user_cache.load(int(user_id))
+
+@login_manager.request_loader
+def load_user_from_request(request):
+    return auth.load_user_from_request(request)
 
-@app.route("/")
+@bp.route("/")
 def index():
     return render_template("landing.html")
 
-@app.route("/login", methods=['GET', 'POST'])
+@bp.route("/login", methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        user = User.query.filter_by(username=username).first()
-        if user and user.check_password(password):
+        user, retry_after = _authenticate(username, password)
+        if user:
             login_user(user)
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
+        if retry_after:
+            return render_template('login.html', error='Too many attempts, try again later'), 429, \
+                {"Retry-After": str(retry_after)}
         return render_template('login.html', error='Invalid credentials')
     return render_template('login.html')
 
-@app.route("/register", methods=['GET', 'POST'])
+def _authenticate(username, password):
+    """(user, 0) on success, (None, seconds) while throttled, else (None, 0).
+
+    Throttled attempts are refused before the (deliberately slow) password hash runs.
+    """
+    wait = auth.login_retry_after(username, request.remote_addr)
+    if wait:
+        return None, int(wait) + 1
+    user = auth.find_user(username)
+    ok = bool(user and password and user.check_password(password))
+    auth.record_login(username, request.remote_addr, ok)
+    return (user if ok else None), 0
+
+@bp.route("/register", methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -45,7 +65,7 @@ def register():
         password = request.form.get('password')
         business_name = request.form.get('business_name', 'My Business')
         
-        if User.query.filter_by(username=username).first():
+        if not username or auth.find_user(username):
             return render_template('register.html', error='Username exists')
         
         user = User(username=username, email=email, business_name=business_name)
@@ -53,59 +73,293 @@ def register():
         db.session.add(user)
         db.session.commit()
         login_user(user)
-        return redirect(url_for('dashboard'))
+        return redirect(url_for('main.dashboard'))
     return render_template('register.html')
 
-@app.route("/dashboard")
+@bp.route("/api/tokens", methods=['POST'])
+def create_api_token():
+    """Exchange credentials (or a logged-in session) for an API token.
+
+    Send it as `Authorization: Bearer <token>`; requests authenticated that way
+    skip password hashing and the session cookie entirely.
+    """
+    data = request.get_json(silent=True) or {}
+    user = current_user if current_user.is_authenticated else None
+    if user is None:
+        user, retry_after = _authenticate(data.get('username'), data.get('password'))
+        if retry_after:
+            return jsonify({"error": "too many attempts"}), 429, {"Retry-After": str(retry_after)}
+        if user is None:
+            return jsonify({"error": "invalid credentials"}), 401
+    token, plaintext = auth.issue_token(user, data.get('name'))
+    return jsonify({**token.to_dict(), "token": plaintext}), 201
+
+@bp.route("/api/tokens", methods=['GET'])
+@login_required
+def list_api_tokens():
+    tokens = ApiToken.query.filter_by(user_id=current_user.id).order_by(ApiToken.id)
+    return jsonify([t.to_dict() for t in tokens])
+
+@bp.route("/api/tokens/<int:token_id>", methods=['DELETE'])
+@login_required
+def revoke_api_token(token_id):
+    """Revoke at once in this worker; other workers may accept the token for up to USER_CACHE_TTL seconds."""
+    token = ApiToken.query.filter_by(id=token_id, user_id=current_user.id).first_or_404()
+    if token.revoked_at is None:
+        token.revoked_at = datetime.utcnow()
+        db.session.commit()
+    return jsonify(token.to_dict())
+
+@bp.route("/dashboard")
+@engines.read_only
 @login_required
 def dashboard():
-    invoices = Invoice.query.filter_by(user_id=current_user.id).all()
-    gigs = Gig.query.filter_by(user_id=current_user.id).all()
-    clients = Client.query.filter_by(user_id=current_user.id).all()
-    total_revenue = sum(inv.amount for inv in invoices if inv.status == 'paid')
-    return render_template('dashboard.html', invoices=invoices, gigs=gigs, clients=clients, total_revenue=total_revenue)
+    # Counters come from the rollup tables; only the rows actually shown are fetched.
+    stats = db.session.get(UserStats, current_user.id) or UserStats(
+        invoice_count=0, client_count=0, gig_count=0, paid_revenue_cents=0)
+    invoices = db.session.execute(
+        db.select(Invoice.id, Invoice.project, Invoice.amount, Invoice.status, Invoice.created_at,
+                  Client.name.label('client_name'))
+        .outerjoin(Client, Invoice.client_id == Client.id)
+        .where(Invoice.user_id == current_user.id)
+        .order_by(Invoice.created_at.desc(), Invoice.id.desc())
+        .limit(DASHBOARD_RECENT_INVOICES)
+    ).all()
+    gigs = (Gig.query.filter_by(user_id=current_user.id)
+            .order_by(Gig.created_at.desc(), Gig.id.desc())
+            .limit(DASHBOARD_RECENT_GIGS).all())
+    return render_template('dashboard.html', invoices=invoices, gigs=gigs, stats=stats,
+                           total_revenue=stats.paid_revenue)
+
+@bp.cli.command("rebuild-rollups")
+def rebuild_rollups_command():
+    """Recompute dashboard rollups from the invoice/gig/client tables."""
+    rebuild_rollups()
+    print("Rollups rebuilt")
 
-@app.route("/logout")
+@bp.route("/logout")
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route("/checkout")
+@bp.route("/checkout")
 def checkout():
     return render_template("checkout.html")
 
-@app.route("/gigs/new", methods=['GET', 'POST'])
+def _optional_float(field):
+    raw = (request.form.get(field) or '').strip()
+    return float(raw) if raw else None
+
+@bp.route("/gigs/new", methods=['GET', 'POST'])
 @login_required
 def create_gig():
     if request.method == 'POST':
         title = request.form.get('title')
-        description = request.form.get('description')
-        price = float(request.form.get('price', 0))
-        
-        gig = Gig(user_id=current_user.id, title=title, description=description, price=price)
+        description = (request.form.get('description') or '').strip()
+        try:
+            price = float(request.form.get('price', 0))
+            hours, rate, fixed = (_optional_float(f) for f in ('hours', 'hourly_rate', 'fixed_price'))
+            # Checked by the quote engine now so `flask gigs-reprice` can't trip over them later.
+            utils.calc_price(hours=hours, rate=rate)
+            utils.calc_price(fixed=fixed)
+        except ValueError as e:  # includes pricing.QuoteError
+            return render_template('gig_form.html', error=str(e)), 400
+        ready = True
+        if not description:
+            # Bounded wait on the generator; if it is slow the gig starts with the template
+            # text and the jobs worker swaps in the real description.
+            description, ready = generation.describe(title)
+
+        gig = Gig(user_id=current_user.id, title=title, description=description, price=price,
+                  hours=hours, hourly_rate=rate, fixed_price=fixed)
         db.session.add(gig)
         db.session.commit()
-        return redirect(url_for('dashboard'))
+        if not ready:
+            jobs.enqueue('gig_descriptions', current_user.id, gig_ids=[gig.id])
+        return redirect(url_for('main.dashboard'))
     return render_template('gig_form.html')
 
-@app.route("/gigs/<int:gig_id>/sync-fiverr", methods=['POST'])
+MAX_DESCRIBE_TITLES = 500
+
+@bp.route("/api/gigs/descriptions", methods=['POST'])
+@login_required
+def describe_gigs_api():
+    """Bulk gig descriptions.
+
+    {"titles": [...], "bullets": 3} answers {"descriptions": [...]} in the same order, generated
+    in batched backend calls (cached titles cost nothing). {"gig_ids": [...]} or {"missing": true}
+    instead queues a job that fills in the descriptions of your existing gigs.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    bullets = data.get('bullets', 3)
+    if not isinstance(bullets, int) or not 1 <= bullets <= generation.MAX_BULLETS:
+        return jsonify({"error": f"bullets must be an integer from 1 to {generation.MAX_BULLETS}"}), 400
+    if 'gig_ids' in data or data.get('missing'):
+        gig_ids = data.get('gig_ids')
+        if gig_ids is not None and not (isinstance(gig_ids, list) and all(isinstance(i, int) for i in gig_ids)):
+            return jsonify({"error": "gig_ids must be a list of integers"}), 400
+        job = jobs.enqueue('gig_descriptions', current_user.id, gig_ids=gig_ids, bullets=bullets,
+                           overwrite=bool(data.get('overwrite')))
+        return jsonify({"status": "queued", "job_id": job.id,
+                        "status_url": url_for('main.job_status', job_id=job.id)}), 202
+    titles = data.get('titles')
+    if not isinstance(titles, list) or not all(isinstance(t, str) and t.strip() for t in titles):
+        return jsonify({"error": "titles must be a list of non-empty strings"}), 400
+    if len(titles) > MAX_DESCRIBE_TITLES:
+        return jsonify({"error": f"at most {MAX_DESCRIBE_TITLES} titles per request"}), 413
+    try:
+        descriptions = generation.service().generate_many(titles, bullets, timeout=generation.AI_TIMEOUT)
+    except generation.GenerationError as e:
+        return jsonify({"error": str(e)}), 502
+    except TimeoutError:
+        return jsonify({"error": "description backend timed out; try fewer titles"}), 504
+    return jsonify({"descriptions": descriptions})
+
+MAX_QUOTE_LINES = 100000
+
+@bp.route("/api/quote", methods=['POST'])
+def quote_api():
+    """Batch quotes in exact cents.
+
+    {"rules": {...}, "lines": [{"hours", "rate", "fixed", "quantity", "margin", "ref"}, ...]}
+    prices the given lines (see pricing.PricingRules.from_dict for rules). With
+    {"catalogue": true, "overrides": {...}} the signed-in user's gigs are repriced
+    instead (a what-if unless "apply": true, which writes the prices to the gigs).
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    try:
+        rules = pricing.PricingRules.from_dict(data.get('rules'))
+        if data.get('catalogue'):
+            if not current_user.is_authenticated:
+                return jsonify({"error": "login required"}), 401
+            return jsonify(pricing.reprice_gigs(current_user.id, rules, data.get('overrides'),
+                                                apply=bool(data.get('apply'))))
+        lines = data.get('lines')
+        if not isinstance(lines, list) or not all(isinstance(line, dict) for line in lines):
+            return jsonify({"error": "lines must be a list of objects"}), 400
+        if len(lines) > MAX_QUOTE_LINES:
+            return jsonify({"error": f"at most {MAX_QUOTE_LINES} lines per request"}), 413
+        result = pricing.quote(lines, rules)
+    except pricing.QuoteError as e:
+        return jsonify({"error": str(e)}), 400
+    rows = result.rows()
+    for line, row in zip(lines, rows):
+        if 'ref' in line:
+            row['ref'] = line['ref']
+    return jsonify({"lines": rows, "total_cents": int(result.total_cents.sum())})
+
+@bp.route("/gigs/<int:gig_id>/sync-fiverr", methods=['POST'])
 @login_required
 def sync_gig_to_fiverr(gig_id):
+    """Queue a push of one gig; Fiverr calls (and their retries) run on the jobs worker."""
     gig = Gig.query.get_or_404(gig_id)
     if gig.user_id != current_user.id:
         return jsonify({"error": "Unauthorized"}), 403
-    
-    result = fiverr_api.sync_gig_to_fiverr(gig.title, gig.description, gig.price)
-    if result.get('status') == 'success':
-        gig.fiverr_gig_id = result.get('gig_id')
-        gig.fiverr_url = result.get('url')
-        gig.status = 'fiverr_sync'
-        db.session.commit()
-        return jsonify({"status": "success", "url": gig.fiverr_url})
-    return jsonify(result), 400
+    job = jobs.enqueue('fiverr_sync', current_user.id, force=True, gig_ids=[gig.id])
+    return jsonify({"status": "queued", "job_id": job.id,
+                    "status_url": url_for('main.job_status', job_id=job.id)}), 202
 
-@app.route("/api/invoices/new", methods=['POST'])
+@bp.route("/gigs/sync-fiverr", methods=['POST'])
+@login_required
+def sync_all_gigs_to_fiverr():
+    """Queue a bulk sync of the user's draft/changed gigs; the jobs worker runs it concurrently."""
+    data = request.json or {}
+    job = jobs.enqueue('fiverr_sync', current_user.id, force=bool(data.get('force')), pull=bool(data.get('pull')))
+    return jsonify({"status": "queued", "job_id": job.id,
+                    "status_url": url_for('main.job_status', job_id=job.id)}), 202
+
+@bp.cli.command("fiverr-sync")
+@click.option('--user-id', type=int, default=None, help='Limit to one user (default: all users)')
+@click.option('--force', is_flag=True, help='Push every gig, even unchanged ones')
+@click.option('--pull', is_flag=True, help='Also pull remote edits for linked gigs')
+@click.option('--workers', type=int, default=None)
+@click.option('--rate', type=float, default=None, help='Max API calls per second')
+def fiverr_sync_command(user_id, force, pull, workers, rate):
+    """Sync draft/changed gigs to Fiverr."""
+    engine = fiverr_sync.SyncEngine(max_workers=workers, rate=rate)
+    summary = fiverr_sync.sync_draft_gigs(user_id, force=force, engine=engine)
+    if pull:
+        summary["pull"] = fiverr_sync.pull_gigs(user_id, engine=engine)
+    print(json.dumps(summary, indent=2))
+
+@bp.route("/api/invoices")
+@engines.read_only
+@login_required
+def list_invoices():
+    """Keyset-paginated invoices (?limit, ?cursor, ?status, ?since, ?until); ?format=ndjson|csv streams all."""
+    return listing.respond("invoices", current_user.id, request.args)
+
+@bp.route("/api/gigs")
+@engines.read_only
+@login_required
+def list_gigs():
+    return listing.respond("gigs", current_user.id, request.args)
+
+@bp.route("/api/clients")
+@engines.read_only
+@login_required
+def list_clients():
+    return listing.respond("clients", current_user.id, request.args)
+
+@bp.route("/api/search")
+@engines.read_only
+@login_required
+def search_api():
+    """Ranked prefix search over gigs, clients and invoices (?q, ?type=gig,client,invoice, ?limit, ?offset)."""
+    kinds = [k for k in request.args.get("type", "").split(",") if k] or None
+    try:
+        return jsonify(search.search(current_user.id, request.args.get("q", ""), kinds,
+                                     limit=request.args.get("limit", type=int),
+                                     offset=request.args.get("offset", 0, type=int)))
+    except search.SearchError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@bp.route("/api/analytics/revenue")
+@engines.read_only
+@login_required
+def analytics_revenue():
+    """Revenue (or ?metric=invoiced) per ?interval=day|week|month between ?start and ?end, in cents."""
+    try:
+        return jsonify(analytics.revenue_series(current_user.id, request.args.get("interval", "month"),
+                                                request.args.get("start"), request.args.get("end"),
+                                                request.args.get("metric", "revenue"),
+                                                fill=request.args.get("fill", "1") not in ("0", "false")))
+    except analytics.AnalyticsError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@bp.route("/api/analytics/aging")
+@engines.read_only
+@login_required
+def analytics_aging():
+    return jsonify(analytics.aging(current_user.id))
+
+@bp.route("/api/analytics/clients")
+@engines.read_only
+@login_required
+def analytics_clients():
+    """Client lifetime value, highest paid revenue first (?limit)."""
+    try:
+        return jsonify(analytics.client_lifetime_value(
+            current_user.id, request.args.get("limit", analytics.DEFAULT_CLIENTS, type=int)))
+    except analytics.AnalyticsError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@bp.route("/api/analytics/funnel")
+@engines.read_only
+@login_required
+def analytics_funnel():
+    """draft -> sent -> paid conversion for invoices created between ?start and ?end."""
+    try:
+        return jsonify(analytics.funnel(current_user.id, request.args.get("start"), request.args.get("end")))
+    except analytics.AnalyticsError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+@bp.route("/api/invoices/new", methods=['POST'])
 @login_required
 def create_invoice_api():
     data = request.json or {}
@@ -125,7 +379,93 @@ def create_invoice_api():
     db.session.commit()
     return jsonify({"status": "success", "invoice_id": invoice.id})
 
-@app.route("/generate_invoice", methods=["POST"])
+@bp.route("/api/invoices/bulk", methods=['POST'])
+@login_required
+def bulk_create_invoices_api():
+    """Create many invoices from a JSON array or an NDJSON body (Content-Type: application/x-ndjson)."""
+    chunk_size = request.args.get('chunk_size', bulk.DEFAULT_CHUNK_SIZE, type=int)
+    atomic = request.args.get('atomic', '').lower() in ('1', 'true', 'yes')
+    try:
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            stream = io.TextIOWrapper(request.stream, encoding='utf-8')
+            records = list(bulk.iter_records(stream))
+        else:
+            records = request.get_json(force=True)
+            if not isinstance(records, list):
+                raise ValueError("expected a JSON array")
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid payload: {e}"}), 400
+    results = bulk.bulk_create_invoices(current_user.id, records, chunk_size=chunk_size, atomic=atomic)
+    created = sum(1 for r in results if r["status"] == "created")
+    status = 201 if created == len(results) else (207 if created else 400)
+    return jsonify({"created": created, "failed": len(results) - created, "results": results}), status
+
+@bp.cli.command("invoices-import")
+@click.argument('path', type=click.Path(exists=True))
+@click.option('--user-id', type=int, required=True)
+@click.option('--chunk-size', type=int, default=bulk.DEFAULT_CHUNK_SIZE)
+@click.option('--atomic', is_flag=True, help='Write nothing unless every record is valid')
+def invoices_import_command(path, user_id, chunk_size, atomic):
+    """Bulk-create invoices from a JSON array or NDJSON file."""
+    with open(path) as f:
+        results = bulk.bulk_create_invoices(user_id, bulk.iter_records(f), chunk_size=chunk_size, atomic=atomic)
+    created = sum(1 for r in results if r["status"] == "created")
+    for r in results:
+        if r["status"] == "error":
+            print(f"record {r['index']}: {'; '.join(r['errors'])}")
+    print(f"Created {created} of {len(results)} invoices")
+
+@bp.route("/api/exports/invoices", methods=['POST'])
+@login_required
+def export_invoices_api():
+    """Queue a ZIP export of the user's invoice PDFs; optional `start`/`end` ISO dates bound created_at."""
+    data = request.json or {}
+    params = {k: data[k] for k in ('start', 'end') if data.get(k)}
+    try:
+        for value in params.values():
+            datetime.fromisoformat(value)
+    except ValueError:
+        return jsonify({"status": "error", "message": "start/end must be ISO dates"}), 400
+    job = jobs.enqueue('invoice_export', current_user.id, **params)
+    return jsonify({"status": "queued", "job_id": job.id,
+                    "status_url": url_for('main.job_status', job_id=job.id)}), 202
+
+def _user_job_or_404(job_id):
+    job = db.session.get(Job, job_id)
+    if job is None or job.user_id != current_user.id:
+        abort(404)
+    return job
+
+@bp.route("/api/exports/<int:job_id>")
+@bp.route("/api/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    job = _user_job_or_404(job_id)
+    data = job.to_dict()
+    if job.kind == 'invoice_export' and job.status == 'done' and job.result_path:  # only exports have a file
+        data["download_url"] = url_for('main.export_download', job_id=job.id)
+    return jsonify(data)
+
+@bp.route("/api/exports/<int:job_id>/download")
+@login_required
+def export_download(job_id):
+    job = _user_job_or_404(job_id)
+    if job.status != 'done' or not job.result_path or not os.path.exists(job.result_path):
+        return jsonify({"status": job.status, "message": "Export not ready"}), 409
+    # send_file streams the archive from disk in chunks.
+    return send_file(job.result_path, mimetype="application/zip",
+                     as_attachment=True, download_name=f"invoices-{job.id}.zip")
+
+@bp.cli.command("jobs-worker")
+@click.option('--once', is_flag=True, help='Exit once the queue is empty')
+@click.option('--processes', type=int, default=None, help='Render processes (0 = inline, default = CPU count)')
+@click.option('--poll-interval', type=float, default=1.0)
+def jobs_worker_command(once, processes, poll_interval):
+    """Run the background job worker (also applies queued Stripe webhook events)."""
+    jobs.run_worker(once=once, poll_interval=poll_interval, processes=processes,
+                    idle_hooks=(payments.process_inbox,))
+
+@bp.route("/generate_invoice", methods=["POST"])
 def generate_invoice_form():
     client = request.form.get("client","Client")
     project = request.form.get("project","Project")
@@ -135,30 +475,103 @@ def generate_invoice_form():
         if ":" in it:
             d,a = it.split(":",1)
             try:
-                items.append((d.strip(), float(a)))
-            except:
-                pass
-    pdf_bytes = utils.generate_invoice_pdf_bytes(items, client, project)
-    return send_file(io.BytesIO(pdf_bytes), mimetype="application/pdf",
+                amount = float(a)
+            except ValueError:
+                continue
+            if utils.valid_amount(amount):  # "nan", "inf" and absurd amounts are skipped like junk
+                items.append((d.strip(), amount))
+    pdf = utils.invoice_pdf_file(items, client, project)
+    return send_file(pdf, mimetype="application/pdf",
                      as_attachment=True, download_name="invoice.pdf")
 
-@app.route("/api/generate_proposal", methods=["POST"])
+@bp.route("/invoices/<int:invoice_id>/pdf")
+@engines.read_only
+@login_required
+def invoice_pdf_download(invoice_id):
+    """Render a stored invoice; line items are streamed from the database into the PDF."""
+    invoice = Invoice.query.filter_by(id=invoice_id, user_id=current_user.id).first_or_404()
+    client_name = invoice.client.name if invoice.client else "Client"
+    items = db.session.execute(
+        db.select(InvoiceItem.description, InvoiceItem.amount)
+        .where(InvoiceItem.invoice_id == invoice.id)
+        .order_by(InvoiceItem.id)
+        .execution_options(yield_per=1000))
+    pdf = utils.invoice_pdf_file(items, client_name, invoice.project,
+                                 invoice_date=invoice.created_at.date().isoformat(), invoice_number=invoice.id)
+    return send_file(pdf, mimetype="application/pdf",
+                     as_attachment=True, download_name=f"invoice-{invoice.id}.pdf")
+
+@bp.route("/api/generate_proposal", methods=["POST"])
 def api_proposal():
     payload = request.json or {}
-    ctx = utils.build_proposal_context(payload)
+    try:
+        ctx = utils.build_proposal_context(payload)
+    except pricing.QuoteError as e:
+        return jsonify({"error": str(e)}), 400
     md = utils.render_template("proposal.md.j2", ctx)
     return {"proposal_markdown": md}
 
-@app.route("/api/generate_promo", methods=["POST"])
+@bp.route("/api/documents/batch", methods=["POST"])
+@login_required
+def render_documents_batch():
+    """Render proposals and contracts for many payloads, streamed back as NDJSON.
+
+    The body is a JSON array or NDJSON of proposal payloads (contracts also read `scope`
+    and `payment_terms`); `?documents=proposal` or `contract` limits what is rendered.
+    Each output line is {"index": i, "proposal": ..., "contract": ...}; a bad record ends
+    the stream with {"index": i, "error": ...}.
+    """
+    documents = tuple(d for d in request.args.get('documents', 'proposal,contract').split(',') if d)
+    if not documents or set(documents) - set(utils.DOCUMENTS):
+        return jsonify({"error": f"documents must be from: {', '.join(utils.DOCUMENTS)}"}), 400
+    payloads = bulk.iter_records(io.TextIOWrapper(request.stream, encoding='utf-8'))
+
+    def generate():
+        index = 0
+        try:
+            for index, docs in utils.render_documents(payloads, documents):
+                yield json.dumps({"index": index, **docs}) + "\n"
+                index += 1
+        except (ValueError, TypeError, AttributeError) as e:
+            yield json.dumps({"index": index, "error": f"invalid record: {e}"}) + "\n"
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@bp.route("/api/generate_promo", methods=["GET", "POST"])
 def api_promo():
-    data = request.json or {}
+    """Promo image(s) for a title/subtitle.
+
+    `variants` (og, fiverr, twitter, square, story, thumb, a set such as "marketplaces", or
+    WIDTHxHEIGHT), `formats` (png, webp, jpeg) and `profile` (final, or preview for fast
+    encoding) choose the outputs, comma-separated or as JSON lists. One output is sent as the
+    image itself, several as a ZIP of promo-<variant>.<ext> files, all laid out in one pass.
+    """
+    data = (request.json or {}) if request.method == "POST" else request.args
     title = data.get("title","NightAnvil Gig")
     subtitle = data.get("subtitle","Professional services")
-    png = utils.generate_promo_image(title, subtitle)
-    return send_file(io.BytesIO(png), mimetype="image/png",
-                     as_attachment=True, download_name="promo.png")
+    try:
+        results = promo.cached_render(title, subtitle, data.get("variants", "og"), data.get("formats", "png"),
+                                      data.get("profile", "final"))
+    except promo.PromoError as e:
+        return jsonify({"error": str(e)}), 400
+    hits = {hit for _, _, hit in results}
+    if len(results) == 1:
+        rendered, entry, _ = results[0]
+        body, mimetype, etag = entry.data, rendered.mimetype, entry.key
+        download_name = f"promo.{promo.EXTENSIONS[rendered.format]}"
+    else:
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_STORED) as zf:  # images are compressed already
+            for rendered, entry, _ in results:
+                zf.writestr(zipfile.ZipInfo(promo.filename(rendered), time.gmtime(entry.created)[:6]), entry.data)
+        body, mimetype, download_name = archive.getvalue(), "application/zip", "promo.zip"
+        etag = cache_key(*(entry.key for _, entry, _ in results))
+    # Cache keys double as a strong ETag; GETs with If-None-Match/If-Modified-Since get a 304.
+    resp = send_file(io.BytesIO(body), mimetype=mimetype, as_attachment=True, download_name=download_name,
+                     etag=etag, last_modified=max(entry.created for _, entry, _ in results), max_age=86400)
+    resp.headers["X-Cache"] = (hits.pop() or "miss").upper() if len(hits) == 1 else "PARTIAL" if None in hits else "HIT"
+    return resp
 
-@app.route("/api/create_payment_intent", methods=["POST"])
+@bp.route("/api/create_payment_intent", methods=["POST"])
 def create_payment_intent():
     """API endpoint to create a Stripe payment intent for checkout."""
     data = request.json or {}
@@ -169,13 +582,165 @@ def create_payment_intent():
     if amount < 50:
         return jsonify({"status": "error", "message": "Amount must be at least $0.50"}), 400
     
-    result = payments.create_payment_intent(amount, client_name, project)
+    # Paying one of your own invoices links the intent so the webhook worker can settle it.
+    invoice = None
+    if data.get("invoice_id") and current_user.is_authenticated:
+        invoice = Invoice.query.filter_by(id=data["invoice_id"], user_id=current_user.id).first()
+    result = payments.create_payment_intent(amount, client_name, project, invoice.id if invoice else None)
+    if invoice is not None and result.get("status") == "success":
+        invoice.stripe_intent_id = result["intent_id"]
+        db.session.commit()
     return jsonify(result)
 
-@app.route("/webhook/payments", methods=["POST"])
+@bp.route("/webhook/payments", methods=["POST"])
 def webhook_payments():
     return payments.handle_webhook(request)
 
+@bp.cli.command("gigs-reprice")
+@click.option('--user-id', type=int, required=True)
+@click.option('--rules', 'rules_path', type=click.Path(exists=True, dir_okay=False), default=None,
+              help='JSON pricing rules (margin, tiers, volume, minimum)')
+@click.option('--margin', type=float, default=None, help='What-if: margin for every gig (0.25 = 25%)')
+@click.option('--rate', type=float, default=None, help='What-if: hourly rate for every hourly gig')
+@click.option('--rate-factor', type=float, default=None, help='What-if: scale each gig\'s own hourly rate')
+@click.option('--apply', is_flag=True, help='Write the new prices to the gigs (default: report only)')
+def gigs_reprice_command(user_id, rules_path, margin, rate, rate_factor, apply):
+    """Reprice a user's gig catalogue from its stored hours/rate/fixed inputs."""
+    rules = {}
+    if rules_path:
+        with open(rules_path) as f:
+            rules = json.load(f)
+    overrides = {"margin": margin, "rate": rate, "rate_factor": rate_factor}
+    try:
+        summary = pricing.reprice_gigs(user_id, pricing.PricingRules.from_dict(rules), overrides, apply=apply)
+    except pricing.QuoteError as e:
+        raise click.ClickException(str(e))
+    for change in summary["changes"][:20]:
+        print(f"gig {change['gig_id']:>8}: ${change['old_cents'] / 100:,.2f} -> ${change['new_cents'] / 100:,.2f}")
+    if summary["changed"] > 20:
+        print(f"... and {summary['changed'] - 20} more")
+    print(f"{summary['gigs']} gigs priced, {summary['changed']} changed; catalogue total "
+          f"${summary['old_total_cents'] / 100:,.2f} -> ${summary['new_total_cents'] / 100:,.2f}"
+          + ("" if apply else " (what-if; pass --apply to save)"))
+
+@bp.route("/static/<path:filename>", defaults={"prefix": "static"})
+@bp.route("/assets/<path:filename>", defaults={"prefix": "assets"})
+def static_file(prefix, filename):
+    """Fingerprinted build output from `flask assets-build`, else the source file."""
+    return assets.serve(prefix, filename)
+
+@bp.cli.command("assets-build")
+def assets_build_command():
+    """Fingerprint and gzip/brotli-compress static/ and assets/ into ASSET_BUILD_DIR."""
+    manifest = assets.build()
+    for logical, entry in sorted(manifest.items()):
+        sizes = ", ".join(f"{enc} {entry[enc]}" for enc in ("gz", "br") if enc in entry)
+        print(f"{logical} -> {entry['file']} ({entry['bytes']} bytes{', ' + sizes if sizes else ''})")
+
+@bp.cli.command("search-rebuild")
+def search_rebuild_command():
+    """(Re)build the full-text search index from the gig, client and invoice tables."""
+    try:
+        count = search.rebuild()
+    except search.SearchError as e:
+        raise click.ClickException(str(e))
+    db.session.commit()
+    print(f"Indexed {count} documents")
+
+@bp.cli.command("templates-compile")
+def templates_compile_command():
+    """Compile the document templates into the bytecode cache (TEMPLATE_CACHE_DIR)."""
+    names = utils.precompile_templates()
+    print(f"Compiled {len(names)} templates: {', '.join(names)}")
+
+@bp.cli.command("webhooks-process")
+@click.option('--batch-size', type=int, default=None)
+def webhooks_process_command(batch_size):
+    """Apply all pending Stripe webhook events now."""
+    print(f"Applied {payments.drain_inbox(batch_size)} events")
+
+@bp.cli.command("webhooks-replay")
+@click.option('--file', 'path', type=click.Path(exists=True), default=None,
+              help='NDJSON file of Stripe events to ingest (duplicates are skipped)')
+@click.option('--status', 'statuses', multiple=True, default=('unmatched',),
+              help='Re-apply stored events with this status (repeatable)')
+@click.option('--since', default=None, help='Only stored events received at/after this ISO timestamp')
+def webhooks_replay_command(path, statuses, since):
+    """Replay Stripe events from a file or from the inbox, then apply them."""
+    if path:
+        new = 0
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    new += payments.ingest_event(json.loads(line), raw=line.strip())
+        print(f"Ingested {new} new events from {path}")
+    else:
+        since_dt = datetime.fromisoformat(since) if since else None
+        print(f"Requeued {payments.requeue_events(statuses, since_dt)} events")
+    print(f"Applied {payments.drain_inbox()} events")
+
+class _LazyMigrateCommand(click.Command):
+    """`flask db ...` (Flask-Migrate) without importing alembic every time the app starts.
+
+    All arguments are handed to Flask-Migrate's own `db` group on first use.
+    """
+
+    def __init__(self):
+        super().__init__("db", help="Perform database migrations.", add_help_option=False,
+                         context_settings={"ignore_unknown_options": True, "allow_extra_args": True})
+
+    def invoke(self, ctx):
+        from flask_migrate import Migrate
+        from flask_migrate.cli import db as db_cli_group
+        info = ctx.ensure_object(ScriptInfo)
+        app = info.load_app()
+        if 'migrate' not in app.extensions:
+            Migrate(app, db, include_object=search.include_object)
+        return db_cli_group.main(args=ctx.args, prog_name=ctx.command_path, obj=info, standalone_mode=False)
+
+def create_app(config=None):
+    """Build the app. PDF, imaging, Stripe and HTTP client libraries load on first use;
+    warm() loads them up front (used by gunicorn --preload, see gunicorn.conf.py)."""
+    app = Flask(__name__, static_folder=None, template_folder="templates")  # see static_file()
+    app.config['JSON_SORT_KEYS'] = False
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-prod')
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///nightanvil.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Reverse proxies in front of the app (1 behind the Railway/Heroku router). Login
+    # throttling keys on the client address, which is the proxy's unless this is set.
+    app.config['PROXY_HOPS'] = int(os.getenv('PROXY_HOPS', '0'))
+    if config:
+        app.config.update(config)
+    if app.config['PROXY_HOPS']:
+        hops = app.config['PROXY_HOPS']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+
+    engines.configure(app)
+    db.init_app(app)
+    engines.init_app(app, db)
+    login_manager.init_app(app)
+    metrics.init_app(app)
+    assets.init_app(app)
+    app.register_blueprint(bp)
+    # Same rule Flask uses for its own templates: follow TEMPLATES_AUTO_RELOAD, else debug mode.
+    auto_reload = app.config.get('TEMPLATES_AUTO_RELOAD')
+    utils.set_template_auto_reload(app.debug if auto_reload is None else auto_reload)
+    utils.precompile_templates()
+    app.cli.add_command(_LazyMigrateCommand())
+    return app
+
+def warm():
+    """Import the heavy subsystems and build their shared read-only state in this process.
+
+    Called in the gunicorn master before forking so workers share those pages
+    instead of each paying the import cost (and memory) on first request.
+    """
+    utils.warm()
+    payments.warm()
+    fiverr_api.warm()
+
+app = create_app()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     app.run(host="0.0.0.0", port=port)
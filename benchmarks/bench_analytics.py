@@ -0,0 +1,89 @@
+"""Analytics latency over years of invoices: daily rollups vs. grouping the invoice table.
+
+    python -m benchmarks.bench_analytics --invoices 100000 --repeat 20
+
+Seeds one user with `--invoices` invoices (one every 37 minutes, ~7 years at 100k) and
+reports the median time of each /api/analytics endpoint, plus the same monthly revenue
+series computed by a SQL GROUP BY over the invoice table and by an ORM loop in Python.
+Charts are meant to stay under 100 ms however many years they span.
+"""
+import argparse, os, statistics, sys, tempfile, time
+from collections import defaultdict
+
+TARGET_MS = 100
+
+
+def median_ms(fn, repeat):
+    fn()  # warm up
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return statistics.median(timings) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app
+    from benchmarks.seed import PASSWORD, Scale, seed
+    from gigforge import models
+    from gigforge.models import db, Invoice
+
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        seed(db, models, Scale(users=1, clients=args.clients, invoices=args.invoices, items=1, gigs=0))
+        first, last = db.session.execute(db.select(db.func.min(Invoice.created_at),
+                                                   db.func.max(Invoice.created_at))).one()
+        print(f"{args.invoices} invoices from {first:%Y-%m-%d} to {last:%Y-%m-%d}, "
+              f"seeded in {time.perf_counter() - t0:.1f}s")
+
+        def sql_group_by():
+            month = db.func.strftime("%Y-%m", Invoice.paid_at)
+            return db.session.execute(
+                db.select(month, db.func.count(Invoice.id), db.func.sum(Invoice.amount_cents))
+                .where(Invoice.user_id == 1, Invoice.status == "paid").group_by(month)).all()
+
+        def orm_loop():
+            totals = defaultdict(int)
+            for inv in Invoice.query.filter_by(user_id=1, status="paid"):
+                totals[inv.paid_at.strftime("%Y-%m")] += round(inv.amount * 100)
+            db.session.expunge_all()
+            return totals
+
+        baselines = [("monthly revenue, SQL GROUP BY on invoice", median_ms(sql_group_by, args.repeat)),
+                     ("monthly revenue, ORM loop", median_ms(orm_loop, max(1, args.repeat // 4)))]
+
+    c = app.test_client()
+    c.post("/login", data={"username": "bench0", "password": PASSWORD})
+    span = f"start={first:%Y-%m-%d}&end={last:%Y-%m-%d}"
+    rows = []
+    for label, url in (("revenue by month", f"/api/analytics/revenue?interval=month&{span}"),
+                       ("revenue by week", f"/api/analytics/revenue?interval=week&{span}"),
+                       ("revenue by day", f"/api/analytics/revenue?interval=day&{span}"),
+                       ("invoiced by month", f"/api/analytics/revenue?metric=invoiced&{span}"),
+                       ("receivables aging", "/api/analytics/aging"),
+                       ("client lifetime value", "/api/analytics/clients?limit=50"),
+                       ("status funnel", "/api/analytics/funnel")):
+        def get(url=url):
+            resp = c.get(url)
+            assert resp.status_code == 200, resp.data
+        rows.append((f"GET {label}", median_ms(get, args.repeat)))
+
+    print(f"\n{'query':46} {'median ms':>10}")
+    for label, ms in rows + baselines:
+        flag = "" if ms < TARGET_MS or not label.startswith("GET revenue") else f"  (over {TARGET_MS} ms)"
+        print(f"{label:46} {ms:10.2f}{flag}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
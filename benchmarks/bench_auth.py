@@ -0,0 +1,66 @@
+"""Authenticated request throughput: uncached vs cached session users vs API tokens,
+and the CPU cost of a login flood with and without throttling.
+
+    python -m benchmarks.bench_auth --requests 2000 --flood 200
+"""
+import argparse, os, sys, tempfile, time
+
+
+def rate(fn, n):
+    fn()  # warm up
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return n / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--flood", type=int, default=200, help="failed logins in the flood test")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app
+    from gigforge import auth, models
+    from benchmarks.seed import SCALES, PASSWORD, seed
+
+    with app.app_context():
+        models.db.create_all()
+        username = seed(models.db, models, SCALES["small"])[0]
+        _, token = auth.issue_token(models.User.query.filter_by(username=username).one(), "bench")
+
+    session_client = app.test_client()
+    session_client.post("/login", data={"username": username, "password": PASSWORD})
+    token_client = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    endpoints = ("/api/invoices?limit=20", "/dashboard")
+
+    print(f"{'endpoint':<26} {'uncached rps':>13} {'cached rps':>11} {'token rps':>10}")
+    ttl = auth.user_cache.ttl
+    for url in endpoints:
+        auth.user_cache.ttl = 0
+        auth.user_cache.invalidate()
+        uncached = rate(lambda: session_client.get(url), args.requests)
+        auth.user_cache.ttl = ttl
+        cached = rate(lambda: session_client.get(url), args.requests)
+        token_rps = rate(lambda: token_client.get(url, headers=headers), args.requests)
+        print(f"{url:<26} {uncached:>13.0f} {cached:>11.0f} {token_rps:>10.0f}")
+
+    flood = app.test_client()
+    bad = {"username": username, "password": "wrong"}
+    print(f"\n{'login flood':<26} {'seconds':>13} {'per attempt ms':>15}")
+    for label, limit in (("unthrottled", 10**9), ("throttled", auth.LOGIN_MAX_FAILURES)):
+        auth.login_throttle.clear(); auth.address_throttle.clear()
+        auth.login_throttle.max_failures = limit
+        t0 = time.perf_counter()
+        for _ in range(args.flood):
+            flood.post("/login", data=bad)
+        elapsed = time.perf_counter() - t0
+        print(f"{label:<26} {elapsed:>13.2f} {elapsed / args.flood * 1000:>15.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Rows/second: POST /api/invoices/new one invoice at a time vs. POST /api/invoices/bulk.
+
+    python -m benchmarks.bench_bulk_invoices --invoices 2000 --items 20
+"""
+import argparse, json, os, sys, tempfile, time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--invoices", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=20, help="line items per invoice")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app
+    from gigforge.models import db, User, Client
+
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@example.com", business_name="Bench")
+        user.set_password("bench")
+        db.session.add(user)
+        db.session.commit()
+        client = Client(user_id=user.id, name="Client")
+        db.session.add(client)
+        db.session.commit()
+        client_id = client.id
+
+    records = [{"client_id": client_id, "project": f"Project {i}",
+                "items": [{"desc": f"Item {j}", "amount": 10.0 + j} for j in range(args.items)]}
+               for i in range(args.invoices)]
+    rows = args.invoices * (args.items + 1)
+    c = app.test_client()
+    c.post("/login", data={"username": "bench", "password": "bench"})
+
+    t0 = time.perf_counter()
+    for record in records:
+        c.post("/api/invoices/new", json=record)
+    single = time.perf_counter() - t0
+
+    body = "\n".join(json.dumps(r) for r in records)
+    t0 = time.perf_counter()
+    resp = c.post(f"/api/invoices/bulk?chunk_size={args.chunk_size}", data=body,
+                  content_type="application/x-ndjson")
+    bulk = time.perf_counter() - t0
+    assert resp.json["created"] == args.invoices, resp.json
+
+    print(f"{'path':<12} {'seconds':>8} {'rows/s':>10}")
+    print(f"{'per-request':<12} {single:>8.2f} {rows / single:>10.0f}")
+    print(f"{'bulk':<12} {bulk:>8.2f} {rows / bulk:>10.0f}")
+    print(f"speedup      {single / bulk:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""Dashboard latency vs. invoice count.
+
+    python -m benchmarks.bench_dashboard --sizes 1000 10000 50000
+
+Seeds a throwaway SQLite database per size and reports the median /dashboard time.
+Latency should stay flat as the invoice count grows.
+"""
+import argparse, os, statistics, sys, tempfile, time
+from datetime import datetime, timedelta
+
+
+def seed(db, models, n_invoices, n_clients=50, n_gigs=100):
+    user = models.User(username="bench", email="bench@example.com", business_name="Bench")
+    user.set_password("bench")
+    db.session.add(user)
+    db.session.commit()
+    db.session.execute(db.insert(models.Client), [
+        {"user_id": user.id, "name": f"Client {i}"} for i in range(n_clients)])
+    db.session.execute(db.insert(models.Gig), [
+        {"user_id": user.id, "title": f"Gig {i}", "price": 50.0} for i in range(n_gigs)])
+    client_ids = [cid for (cid,) in db.session.query(models.Client.id)]
+    start = datetime(2020, 1, 1)
+    statuses = ("draft", "sent", "paid")
+    rows = [{"user_id": user.id, "client_id": client_ids[i % len(client_ids)], "project": f"Project {i}",
+             "amount": 100.0 + i % 500, "amount_cents": (100 + i % 500) * 100, "status": statuses[i % 3],
+             "created_at": start + timedelta(hours=i)}
+            for i in range(n_invoices)]
+    for i in range(0, len(rows), 5000):
+        db.session.execute(db.insert(models.Invoice), rows[i:i + 5000])
+    db.session.commit()
+    # Core inserts bypass the ORM flush hooks, so backfill the rollups once.
+    models.rebuild_rollups(user.id)
+
+
+def measure(size, repeat):
+    from app import app
+    from gigforge import models
+    with app.app_context():
+        models.db.drop_all()
+        models.db.create_all()
+        seed(models.db, models, size)
+    c = app.test_client()
+    c.post("/login", data={"username": "bench", "password": "bench"})
+    c.get("/dashboard")  # warm up
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        resp = c.get("/dashboard")
+        timings.append(time.perf_counter() - t0)
+        assert resp.status_code == 200
+    return statistics.median(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    print(f"{'invoices':>10} {'median ms':>10}")
+    for size in args.sizes:
+        print(f"{size:>10} {measure(size, args.repeat) * 1000:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
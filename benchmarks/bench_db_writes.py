@@ -0,0 +1,104 @@
+"""Concurrent writes to one SQLite file: default rollback journal vs the sqlite engine profile (WAL).
+
+Each writer is a separate process with its own app, like a gunicorn worker, committing
+invoices with line items; reader processes run dashboard-style queries at the same time.
+
+    python -m benchmarks.bench_db_writes --writers 4 --readers 2 --seconds 5
+"""
+import argparse, multiprocessing, os, sys, tempfile, time
+
+
+def _app(url, profile):
+    os.environ["DATABASE_URL"] = url
+    from app import create_app
+    return create_app({"SQLALCHEMY_DATABASE_URI": url, "DB_PROFILE": profile})
+
+
+def writer(url, profile, seconds, user_id, out):
+    from gigforge.models import db, Invoice, InvoiceItem
+    from sqlalchemy.exc import OperationalError
+    app = _app(url, profile)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            try:
+                invoice = Invoice(user_id=user_id, client_id=user_id, project="Bench", amount=30)
+                db.session.add(invoice)
+                db.session.flush()
+                db.session.add_all(InvoiceItem(invoice_id=invoice.id, description=f"Line {i}", amount=10)
+                                   for i in range(3))
+                db.session.commit()
+                done += 1
+            except OperationalError:  # "database is locked" after the busy timeout
+                db.session.rollback()
+                errors += 1
+    out.put(("write", done, errors))
+
+
+def reader(url, profile, seconds, user_id, out):
+    from gigforge.models import db, Invoice
+    from sqlalchemy.exc import OperationalError
+    app = _app(url, profile)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            try:
+                db.session.execute(db.select(db.func.count(Invoice.id), db.func.sum(Invoice.amount))
+                                   .where(Invoice.user_id == user_id)).one()
+                db.session.execute(db.select(Invoice).where(Invoice.user_id == user_id)
+                                   .order_by(Invoice.id.desc()).limit(20)).all()
+                db.session.commit()
+                done += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    out.put(("read", done, errors))
+
+
+def run(profile, args):
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from gigforge.models import db, Client, User
+    app = _app(url, profile)
+    with app.app_context():
+        db.create_all()
+        for n in range(1, args.writers + 1):
+            db.session.add(User(id=n, username=f"w{n}", email=f"w{n}@example.com", password_hash="x"))
+            db.session.add(Client(id=n, user_id=n, name=f"Client {n}"))
+        db.session.commit()
+        db.engine.dispose()
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=writer, args=(url, profile, args.seconds, n, out)) for n in range(1, args.writers + 1)]
+    procs += [ctx.Process(target=reader, args=(url, profile, args.seconds, 1, out)) for _ in range(args.readers)]
+    for p in procs:
+        p.start()
+    results = [out.get() for _ in procs]
+    for p in procs:
+        p.join()
+    total = lambda kind, i: sum(r[i] for r in results if r[0] == kind)
+    return total("write", 1) / args.seconds, total("read", 1) / args.seconds, total("write", 2) + total("read", 2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:g}s each")
+    print(f"{'profile':<22} {'commits/s':>10} {'reads/s':>9} {'locked errors':>14}")
+    rows = {}
+    for label, profile in (("off (rollback journal)", "off"), ("sqlite (WAL)", "sqlite")):
+        rows[profile] = run(profile, args)
+        writes, reads, errors = rows[profile]
+        print(f"{label:<22} {writes:>10.0f} {reads:>9.0f} {errors:>14}")
+    print(f"\nwrite throughput: {rows['sqlite'][0] / max(rows['off'][0], 1e-9):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Gig descriptions against a slow completion API: one call per title vs. the generation service.
+
+Simulates many gig forms (threads, one title each, titles repeating) and a bulk request,
+against a local OpenAI-style server with a fixed round-trip latency.
+
+    python -m benchmarks.bench_generation --titles 400 --distinct 100 --threads 16 --latency 0.2
+"""
+import argparse, random, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.standins import FakeCompletions, completions_server
+
+
+def run(label, titles, threads, fn, count=None):
+    FakeCompletions.stats.update(requests=0, prompts=0)
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(fn, titles))
+    elapsed = time.perf_counter() - t0
+    s = FakeCompletions.stats
+    print(f"{label:<34} {elapsed:>8.2f} {(count or len(titles)) / elapsed:>9.1f} {s['requests']:>10} {s['prompts']:>8}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--titles", type=int, default=400)
+    parser.add_argument("--distinct", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per backend round trip")
+    parser.add_argument("--per-prompt", type=float, default=0.002, help="extra seconds per prompt in a batch")
+    args = parser.parse_args(argv)
+
+    from gigforge import generation
+    from gigforge.render_cache import RenderCache
+    rng = random.Random(7)
+    titles = [f"Gig number {rng.randrange(args.distinct)}" for _ in range(args.titles)]
+    print(f"{args.titles} titles ({args.distinct} distinct), {args.threads} callers, "
+          f"{args.latency * 1000:.0f} ms per round trip")
+    print(f"{'mode':<34} {'seconds':>8} {'titles/s':>9} {'round trips':>10} {'prompts':>8}")
+    with completions_server(args.latency, args.per_prompt) as url:
+        backend = generation.OpenAIBackend(api_url=url, api_key="bench")
+        run("one call per title (before)", titles, args.threads,
+            lambda t: backend.complete([generation.make_prompt(t)]))
+        service = generation.GenerationService(backend, RenderCache())
+        run("service, one title per caller", titles, args.threads, service.generate)
+        run("  same titles again (cached)", titles, args.threads, service.generate)
+        service = generation.GenerationService(backend, RenderCache())
+        run("service, one bulk request", [titles], 1, service.generate_many, count=len(titles))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Promo rendering: time and bytes per variant, format and encoder profile.
+
+Also compares rendering a variant set in one pass with one call per size, and the final
+PNG profile with the previous default (RGB PNG at zlib level 6).
+
+    python -m benchmarks.bench_promo --variants all --formats png,webp,jpeg --repeat 5
+"""
+import argparse, io, statistics, sys, time
+
+TITLE = "Professional React Landing Page with Tailwind and Animations"
+SUBTITLE = "Fast delivery • Pixel perfect • Unlimited revisions"
+
+
+def timed(fn, repeat):
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", default="all")
+    parser.add_argument("--formats", default="png,webp,jpeg")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from gigforge import promo
+    promo.warm()
+    variants, formats = promo.parse_variants(args.variants), promo.parse_formats(args.formats)
+    measured = promo.measure(TITLE, 0), promo.measure(SUBTITLE, 1)
+
+    print(f"{'variant':<9} {'size':>10} {'format':<6} {'profile':<8} {'encode ms':>10} {'bytes':>9}")
+    for variant in variants:
+        img = promo.draw(*measured, variant, promo.BG_COLOR, "NightAnvil • 2024")
+        if variant.name == "og":
+            def legacy():
+                out = io.BytesIO()
+                img.save(out, format="PNG")
+                return out.getvalue()
+            ms, data = timed(legacy, args.repeat)
+            print(f"{variant.name:<9} {variant.width:>4}x{variant.height:<5} {'png':<6} {'before':<8} {ms:>10.1f} {len(data):>9,}")
+        for fmt in formats:
+            for profile in promo.PROFILES:
+                ms, data = timed(lambda: promo.encode(img, fmt, profile), args.repeat)
+                print(f"{variant.name:<9} {variant.width:>4}x{variant.height:<5} {fmt:<6} {profile:<8} {ms:>10.1f} {len(data):>9,}")
+
+    for profile in promo.PROFILES:
+        one_pass, out = timed(lambda: promo.render(TITLE, SUBTITLE, variants, formats, profile, year=2024), args.repeat)
+        per_size, _ = timed(lambda: [promo.render(TITLE, SUBTITLE, [v], [f], profile, year=2024)
+                                     for v in variants for f in formats], args.repeat)
+        print(f"\n{profile}: {len(out)} images, {sum(len(r.data) for r in out):,} bytes; "
+              f"one pass {one_pass:.0f} ms vs one call per image {per_size:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Batch quote engine vs. looping over calc_price, plus catalogue repricing.
+
+    python -m benchmarks.bench_quote --lines 1000 10000 100000 --gigs 20000
+"""
+import argparse, os, random, sys, tempfile, time
+
+
+def best_of(fn, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--gigs", type=int, default=20000, help="catalogue size for the repricing run")
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from gigforge import pricing, utils
+    pricing.warm()
+
+    rng = random.Random(1)
+    print(f"{'lines':>8} {'calc_price loop ms':>19} {'quote(dicts) ms':>16} {'quote(columns) ms':>18} {'speedup':>8}")
+    for n in args.lines:
+        lines = [{"hours": rng.randrange(1, 8000) / 100, "rate": rng.randrange(1000, 20000) / 100,
+                  **({"fixed": rng.randrange(1000, 500000) / 100} if i % 4 == 0 else {})} for i in range(n)]
+        columns = {key: [line.get(key, float("nan")) for line in lines] for key in ("hours", "rate", "fixed")}
+        loop = best_of(lambda: [utils.calc_price(l["hours"], l["rate"], l.get("fixed")) for l in lines])
+        dicts = best_of(lambda: pricing.quote(lines))
+        cols = best_of(lambda: pricing.quote(columns))
+        assert pricing.quote(lines).unit_cents.tolist() == [round(utils.calc_price(l["hours"], l["rate"], l.get("fixed")) * 100)
+                                                            for l in lines]
+        print(f"{n:>8} {loop * 1000:>19.1f} {dicts * 1000:>16.1f} {cols * 1000:>18.1f} {loop / cols:>7.0f}x")
+
+    from app import app
+    from gigforge.models import db, Gig, User
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        db.session.execute(db.insert(Gig), [
+            {"user_id": user.id, "title": f"Gig {i}", "price": 1.0,
+             "hours": rng.randrange(1, 8000) / 100 if i % 4 else None,
+             "hourly_rate": rng.randrange(1000, 20000) / 100 if i % 4 else None,
+             "fixed_price": rng.randrange(1000, 500000) / 100 if i % 4 == 0 else None}
+            for i in range(args.gigs)])
+        db.session.commit()
+        rules = pricing.PricingRules.from_dict({"margin": 0.3, "tiers": [{"up_to": 10, "factor": 1}, {"factor": 0.9}]})
+        t0 = time.perf_counter()
+        preview = pricing.reprice_gigs(user.id, rules, {"rate_factor": 1.1})
+        what_if = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        pricing.reprice_gigs(user.id, rules, {"rate_factor": 1.1}, apply=True)
+        applied = time.perf_counter() - t0
+    print(f"\nreprice {args.gigs} gigs: what-if {what_if * 1000:.0f} ms, apply {applied * 1000:.0f} ms "
+          f"({preview['changed']} prices written)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
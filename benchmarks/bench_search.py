@@ -0,0 +1,92 @@
+"""Search latency at scale: indexed prefix search vs. LIKE scans, plus index load/rebuild time.
+
+    python -m benchmarks.bench_search --rows 1000000 --users 1000
+"""
+import argparse, os, random, statistics, sys, tempfile, time
+
+WORDS = ("web", "design", "logo", "brand", "website", "landing", "page", "seo", "audit", "copy", "video",
+         "edit", "motion", "app", "mobile", "ios", "android", "api", "backend", "shopify", "store", "email",
+         "campaign", "newsletter", "podcast", "mixing", "voice", "translation", "spanish", "german", "data",
+         "dashboard", "report", "excel", "python", "script", "scraper", "wordpress", "plugin", "theme")
+QUERIES = ("we", "web", "web des", "shopify store", "newsl", "translation german")
+
+
+def timings(fn, repeat):
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(out), sorted(out)[int(len(out) * 0.95) - 1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000, help="indexed rows (gigs+clients+invoices+items)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app
+    from gigforge import search
+    from gigforge.models import db, Client, Gig, Invoice, InvoiceItem, User
+
+    rng = random.Random(7)
+    phrase = lambda n: " ".join(rng.choice(WORDS) for _ in range(n))
+    per_user = args.rows // args.users  # split: 30% gigs, 10% clients, 12% invoices, 48% items
+    n_gigs, n_clients, n_invoices = int(per_user * .3), max(1, int(per_user * .1)), max(1, int(per_user * .12))
+    n_items = max(0, per_user - n_gigs - n_clients - n_invoices) // n_invoices
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        db.session.execute(db.insert(User), [{"id": u, "username": f"u{u}", "username_key": f"u{u}",
+                                              "email": f"u{u}@example.com", "password_hash": "x"}
+                                             for u in range(1, args.users + 1)])
+        client_id = invoice_id = 0
+        for u in range(1, args.users + 1):
+            db.session.execute(db.insert(Client), [{"id": client_id + i + 1, "user_id": u, "name": f"{phrase(2).title()} Ltd",
+                                                    "email": f"{rng.choice(WORDS)}{i}@example.com"} for i in range(n_clients)])
+            db.session.execute(db.insert(Gig), [{"user_id": u, "title": phrase(3), "description": phrase(12), "price": 10}
+                                                for _ in range(n_gigs)])
+            db.session.execute(db.insert(Invoice), [{"id": invoice_id + i + 1, "user_id": u, "client_id": client_id + 1,
+                                                     "project": phrase(2), "amount": 1, "amount_cents": 100}
+                                                    for i in range(n_invoices)])
+            db.session.execute(db.insert(InvoiceItem), [{"invoice_id": invoice_id + i + 1, "description": phrase(4),
+                                                         "amount": 1} for i in range(n_invoices) for _ in range(n_items)])
+            client_id += n_clients
+            invoice_id += n_invoices
+        db.session.commit()
+        load = time.perf_counter() - t0
+        docs = db.session.execute(db.text(f"SELECT count(*) FROM {search.FTS_TABLE}")).scalar()
+        print(f"{docs} documents for {args.users} users, loaded with index triggers in {load:.1f}s")
+        t0 = time.perf_counter()
+        search.rebuild()
+        db.session.commit()
+        print(f"search-rebuild: {time.perf_counter() - t0:.1f}s\n")
+
+        user_id = args.users // 2
+
+        def like_scan(q):
+            # The unindexed equivalent: every matching row of the user's four tables (ranking needs all).
+            words = search.terms(q)
+            like = lambda *cols: [db.or_(*(c.like(f"%{w}%") for c in cols)) for w in words]
+            queries = [db.select(Gig.id).where(Gig.user_id == user_id, *like(Gig.title, Gig.description)),
+                       db.select(Client.id).where(Client.user_id == user_id, *like(Client.name, Client.email)),
+                       db.select(Invoice.id).where(Invoice.user_id == user_id, *like(Invoice.project)),
+                       db.select(InvoiceItem.invoice_id).join(Invoice, Invoice.id == InvoiceItem.invoice_id)
+                       .where(Invoice.user_id == user_id, *like(InvoiceItem.description))]
+            return [db.session.execute(query).all() for query in queries]
+
+        print(f"{'query':<20} {'hits':>6} {'search p50 ms':>14} {'p95 ms':>8} {'LIKE scan p50 ms':>17}")
+        for q in QUERIES:
+            hits = len(search.search(user_id, q, limit=100)["data"])
+            p50, p95 = timings(lambda: search.search(user_id, q), args.repeat)
+            like, _ = timings(lambda: like_scan(q), max(3, args.repeat // 10))
+            print(f"{q:<20} {hits:>6} {p50:>14.2f} {p95:>8.2f} {like:>17.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
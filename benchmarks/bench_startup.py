@@ -0,0 +1,100 @@
+"""Worker boot cost: import time and per-worker memory, lazy vs. eager vs. preloaded.
+
+    python -m benchmarks.bench_startup --workers 4
+
+* lazy:    `import app` as a worker does now (heavy libraries load on first use)
+* eager:   `import app` + app.warm(), i.e. everything loaded at boot, as before
+* preload: master imports + warms once, then forks workers (gunicorn --preload)
+
+Per-worker memory is private (unshared) RSS from /proc/<pid>/smaps_rollup after each
+worker renders one invoice PDF and one promo image, so Linux only.
+"""
+import argparse, json, os, statistics, subprocess, sys, tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = """
+import time, sys
+t0 = time.perf_counter()
+import app
+if {warm}:
+    app.warm()
+elapsed = time.perf_counter() - t0
+heavy = [m for m in ("reportlab.pdfgen.canvas", "PIL.Image", "stripe", "requests", "alembic") if m in sys.modules]
+rss = [int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmRSS")][0]
+print(__import__("json").dumps({{"seconds": elapsed, "rss_kb": rss, "heavy": heavy}}))
+"""
+
+FORK_PROBE = """
+import gc, json, os, sys
+preload = {preload}
+if preload:
+    import app
+    app.warm()
+    gc.collect()
+    gc.freeze()
+
+def private_kb():
+    fields = {{}}
+    for line in open("/proc/self/smaps_rollup"):
+        parts = line.split()
+        if len(parts) >= 2 and parts[1].isdigit():
+            fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields["Private_Clean"] + fields["Private_Dirty"], fields["Rss"]
+
+r, w = os.pipe()
+pids = []
+for _ in range({workers}):
+    pid = os.fork()
+    if pid == 0:
+        os.close(r)
+        import app
+        from gigforge import utils
+        utils.generate_invoice_pdf_bytes([("Design", 100.0)], "Client", "Project")
+        utils.generate_promo_image("Title", "Subtitle", year=2024)
+        priv, rss = private_kb()
+        os.write(w, (json.dumps({{"private_kb": priv, "rss_kb": rss}}) + "\\n").encode())
+        os._exit(0)
+    pids.append(pid)
+os.close(w)
+for pid in pids:
+    os.waitpid(pid, 0)
+with os.fdopen(r) as f:
+    print(json.dumps([json.loads(l) for l in f if l.strip()]))
+"""
+
+
+def run(code):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "nightanvil-startup.db"))
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<8} {'import ms':>10} {'RSS MB':>8}  heavy modules loaded")
+    for mode, warm in (("lazy", False), ("eager", True)):
+        runs = [run(IMPORT_PROBE.format(warm=warm)) for _ in range(args.repeat)]
+        ms = statistics.median(r["seconds"] for r in runs) * 1000
+        rss = statistics.median(r["rss_kb"] for r in runs) / 1024
+        print(f"{mode:<8} {ms:>10.1f} {rss:>8.1f}  {', '.join(runs[0]['heavy']) or '-'}")
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("per-worker memory needs /proc/self/smaps_rollup (Linux); skipped")
+        return 0
+    print(f"\n{'workers':<18} {'private MB/worker':>18} {'RSS MB/worker':>14}")
+    for label, preload in (("import per worker", False), ("preload + fork", True)):
+        workers = run(FORK_PROBE.format(preload=preload, workers=args.workers))
+        priv = statistics.mean(w["private_kb"] for w in workers) / 1024
+        rss = statistics.mean(w["rss_kb"] for w in workers) / 1024
+        print(f"{label:<18} {priv:>18.1f} {rss:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
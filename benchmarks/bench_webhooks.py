@@ -0,0 +1,74 @@
+"""Stripe webhook ingest latency and inbox apply throughput.
+
+    python -m benchmarks.bench_webhooks --events 5000
+
+Posts synthetic payment_intent events (with duplicate and out-of-order deliveries)
+to /webhook/payments, then drains the inbox and reports events/second.
+"""
+import argparse, json, os, random, statistics, sys, tempfile, time
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--duplicates", type=float, default=0.1, help="fraction of events delivered twice")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app import app
+    from benchmarks.standins import WEBHOOK_SECRET, stripe_signature
+    from gigforge import payments
+    payments.WEBHOOK_SECRET = WEBHOOK_SECRET  # verified by the real stripe SDK
+    from gigforge.models import db, User, Client, Invoice
+
+    rng = random.Random(42)
+    with app.app_context():
+        db.create_all()
+        user = User(username="bench", email="bench@example.com", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        client = Client(user_id=user.id, name="Client")
+        db.session.add(client)
+        db.session.commit()
+        db.session.execute(db.insert(Invoice), [
+            {"user_id": user.id, "client_id": client.id, "project": f"P{i}", "amount": 100.0,
+             "amount_cents": 10000, "status": "sent", "stripe_intent_id": f"pi_{i}"} for i in range(args.events)])
+        db.session.commit()
+
+    events = []
+    for i in range(args.events):
+        kind = "payment_failed" if i % 7 == 0 else "succeeded"
+        events.append({"id": f"evt_{i}", "type": f"payment_intent.{kind}", "created": 1_700_000_000 + i,
+                       "data": {"object": {"id": f"pi_{i}"}}})
+    events += rng.sample(events, int(len(events) * args.duplicates))
+    rng.shuffle(events)  # Stripe does not guarantee delivery order
+
+    c = app.test_client()
+    latencies = []
+    for evt in events:
+        body = json.dumps(evt)
+        headers = {"Stripe-Signature": stripe_signature(body)}
+        t0 = time.perf_counter()
+        c.post("/webhook/payments", data=body, content_type="application/json", headers=headers)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    with app.app_context():
+        t0 = time.perf_counter()
+        applied = payments.drain_inbox(args.batch_size)
+        elapsed = time.perf_counter() - t0
+        paid = Invoice.query.filter_by(status="paid").count()
+
+    print(f"deliveries        {len(events)}")
+    print(f"ingest p50 ms     {statistics.median(latencies) * 1000:.2f}")
+    print(f"ingest p99 ms     {latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}")
+    print(f"applied events    {applied}")
+    print(f"apply events/s    {applied / elapsed:.0f}")
+    print(f"paid invoices     {paid}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Deterministic synthetic data for benchmarks.
+
+    python -m benchmarks.seed --database /tmp/bench.db --users 5 --invoices 10000
+
+Every user gets the same password (`bench`) and usernames `bench0`, `bench1`, ...
+The same arguments and `--seed` always produce the same rows.
+"""
+import argparse, os, random, sys
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+
+PASSWORD = "bench"
+STATUSES = ("draft", "sent", "paid")
+GIG_STATUSES = ("draft", "draft", "published", "fiverr_sync")
+CHUNK = 5000
+
+
+@dataclass
+class Scale:
+    users: int = 2
+    clients: int = 20       # per user
+    invoices: int = 2000    # per user
+    items: int = 5          # per invoice
+    gigs: int = 50          # per user
+    seed: int = 42
+
+
+SCALES = {
+    "tiny": Scale(users=1, clients=3, invoices=20, items=3, gigs=5),
+    "small": Scale(),
+    "medium": Scale(users=5, clients=100, invoices=20000, items=5, gigs=200),
+    "large": Scale(users=10, clients=500, invoices=100000, items=10, gigs=1000),
+}
+
+
+def _insert(db, table, rows):
+    for i in range(0, len(rows), CHUNK):
+        db.session.execute(db.insert(table), rows[i:i + CHUNK])
+
+
+def seed(db, models, scale):
+    """Insert `scale` worth of rows into an empty database; returns the usernames.
+
+    Rows go in through Core bulk inserts, so the rollups are rebuilt once at the end.
+    """
+    rng = random.Random(scale.seed)
+    template = models.User(username="-", email="-")
+    template.set_password(PASSWORD)  # hash once: scrypt per user would dominate seeding
+    _insert(db, models.User, [
+        {"id": u + 1, "username": f"bench{u}", "username_key": f"bench{u}", "email": f"bench{u}@example.com",
+         "business_name": f"Bench {u}", "password_hash": template.password_hash}
+        for u in range(scale.users)])
+    start = datetime(2022, 1, 1)
+    client_id = invoice_id = 0
+    for u in range(scale.users):
+        user_id = u + 1
+        clients = [{"id": client_id + i + 1, "user_id": user_id, "name": f"Client {u}-{i}",
+                    "email": f"client{u}-{i}@example.com", "created_at": start + timedelta(days=i % 365)}
+                   for i in range(scale.clients)]
+        client_id += scale.clients
+        _insert(db, models.Client, clients)
+        _insert(db, models.Gig, [
+            {"user_id": user_id, "title": f"Gig {u}-{i}", "description": f"Service number {i}",
+             "price": float(rng.randrange(20, 500)), "status": GIG_STATUSES[i % len(GIG_STATUSES)],
+             "created_at": start + timedelta(hours=i)}
+            for i in range(scale.gigs)])
+        invoices, items = [], []
+        for i in range(scale.invoices):
+            invoice_id += 1
+            amounts = [rng.randrange(1000, 50000) / 100 for _ in range(scale.items)]
+            status = rng.choice(STATUSES)
+            created = start + timedelta(minutes=37 * i)
+            amount = round(sum(amounts), 2)
+            invoices.append({
+                "id": invoice_id, "user_id": user_id, "project": f"Project {i}",
+                "client_id": clients[i % len(clients)]["id"], "amount": amount,
+                "amount_cents": models.to_cents(amount), "status": status, "created_at": created,
+                "stripe_intent_id": f"pi_bench_{invoice_id}",
+                "paid_at": created + timedelta(days=rng.randrange(1, 30)) if status == "paid" else None})
+            items += [{"invoice_id": invoice_id, "description": f"Line {n} of project {i}", "amount": a}
+                      for n, a in enumerate(amounts)]
+            if len(items) >= CHUNK:
+                _insert(db, models.Invoice, invoices); _insert(db, models.InvoiceItem, items)
+                invoices, items = [], []
+        _insert(db, models.Invoice, invoices); _insert(db, models.InvoiceItem, items)
+    db.session.commit()
+    models.rebuild_rollups()
+    return [f"bench{u}" for u in range(scale.users)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", required=True, help="SQLite file to create")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for field, default in asdict(Scale()).items():
+        parser.add_argument(f"--{field}", type=int, default=None, help=f"override (small: {default})")
+    args = parser.parse_args(argv)
+    scale = Scale(**{**asdict(SCALES[args.scale]),
+                     **{k: v for k, v in vars(args).items() if k in Scale.__annotations__ and v is not None}})
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.database)}"
+    from app import app
+    from gigforge import models
+    with app.app_context():
+        models.db.create_all()
+        users = seed(models.db, models, scale)
+    print(f"seeded {args.database}: {asdict(scale)} ({len(users)} users, password {PASSWORD!r})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Offline stand-ins for Stripe, the Fiverr API and a completion API, so benchmarks never leave the machine.
+
+Stripe is replaced in-process (payments.get_stripe); Fiverr and completions are local HTTP
+servers, so the real `requests` session, pooling and retry code stay on the measured path.
+"""
+import contextlib, hashlib, hmac, itertools, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+
+WEBHOOK_SECRET = "whsec_bench"
+
+
+def stripe_signature(payload, secret=WEBHOOK_SECRET, timestamp=None):
+    """A Stripe-Signature header for `payload`, as Stripe computes it."""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode(), f"{timestamp}.{payload}".encode(), hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={digest}"
+
+
+class FakeStripe:
+    """Just enough of the stripe module for payment intents and signed webhooks."""
+    _ids = itertools.count(1)
+
+    class SignatureVerificationError(Exception):
+        pass
+
+    class Webhook:
+        @staticmethod
+        def construct_event(payload, sig_header, secret):
+            fields = dict(part.split("=", 1) for part in (sig_header or "").split(",") if "=" in part)
+            expected = stripe_signature(payload, secret, int(fields.get("t", 0) or 0))
+            if not hmac.compare_digest(expected, f"t={fields.get('t')},v1={fields.get('v1')}"):
+                raise FakeStripe.SignatureVerificationError("No signatures found matching the expected signature")
+            return json.loads(payload)
+
+    class PaymentIntent:
+        @staticmethod
+        def create(amount, currency, metadata=None, **kwargs):
+            n = next(FakeStripe._ids)
+            return SimpleNamespace(id=f"pi_fake_{n}", client_secret=f"pi_fake_{n}_secret", amount=amount,
+                                   currency=currency, metadata=metadata or {})
+
+
+class FakeFiverr(BaseHTTPRequestHandler):
+    """Accepts every create/update and answers listings with an empty page."""
+    latency = 0.0  # seconds added to every response, to model a remote API
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        if self.latency:
+            time.sleep(self.latency)
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+
+    def do_POST(self):
+        gig_id = f"fv-{abs(hash(self._body().get('title', ''))) % 10**8}"
+        self._reply(201, {"gig_id": gig_id, "url": f"https://fiverr.test/{gig_id}"})
+
+    def do_PUT(self):
+        self._body()
+        self._reply(200, {"url": f"https://fiverr.test{self.path}"})
+
+    def do_GET(self):
+        self._reply(200, {"gigs": []})
+
+
+class FakeCompletions(FakeFiverr):
+    """OpenAI-style POST /completions: a fixed round-trip latency plus a little per prompt."""
+    per_prompt = 0.0
+    stats = {"requests": 0, "prompts": 0}
+
+    def do_POST(self):
+        prompts = self._body().get("prompt", [])
+        prompts = [prompts] if isinstance(prompts, str) else prompts
+        FakeCompletions.stats["requests"] += 1
+        FakeCompletions.stats["prompts"] += len(prompts)
+        time.sleep(self.per_prompt * len(prompts))
+        self._reply(200, {"choices": [{"index": i, "text": f" Generated: {p[:60]}"} for i, p in enumerate(prompts)]})
+
+
+@contextlib.contextmanager
+def completions_server(latency=0.0, per_prompt=0.0):
+    """Run FakeCompletions locally; yields its base URL (for OpenAIBackend / AI_API_URL)."""
+    FakeCompletions.latency, FakeCompletions.per_prompt = latency, per_prompt
+    FakeCompletions.stats = {"requests": 0, "prompts": 0}
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCompletions)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def stand_ins(fiverr_latency=0.0):
+    """Point payments and fiverr_api at the stand-ins; restores the real settings on exit."""
+    from gigforge import fiverr_api, payments
+    FakeFiverr.latency = fiverr_latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeFiverr)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    saved = {(payments, "get_stripe"): payments.get_stripe, (payments, "WEBHOOK_SECRET"): payments.WEBHOOK_SECRET,
+             **{(fiverr_api, name): getattr(fiverr_api, name)
+                for name in ("FIVERR_API_URL", "FIVERR_API_KEY", "FIVERR_SELLER_ID")}}
+    payments.get_stripe, payments.WEBHOOK_SECRET = (lambda: FakeStripe), WEBHOOK_SECRET
+    fiverr_api.FIVERR_API_URL = f"http://127.0.0.1:{server.server_port}"
+    fiverr_api.FIVERR_API_KEY, fiverr_api.FIVERR_SELLER_ID = "bench-key", "bench-seller"
+    try:
+        yield
+    finally:
+        for (module, name), value in saved.items():
+            setattr(module, name, value)
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,259 @@
+"""Benchmark suite over the hot paths, with JSON results and a baseline check.
+
+    python -m benchmarks.suite --scale small --out bench.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.suite --only dashboard webhook_ingest --save-baseline benchmarks/baseline.json
+
+Runs offline: a seeded throwaway SQLite database, an in-process Stripe stand-in and a
+local Fiverr server (benchmarks/standins.py). Exits with status 1 when a case's median
+is slower than the baseline by more than the threshold.
+"""
+import argparse, itertools, json, os, platform, statistics, sys, tempfile, time
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+from benchmarks.seed import SCALES, Scale, PASSWORD, seed
+from benchmarks.standins import stand_ins, stripe_signature
+
+CASES = {}
+DEFAULT_THRESHOLD = 0.25
+
+
+def case(name, repeat=50):
+    """Register `fn(ctx) -> op`: fn does the setup, op() is one timed iteration."""
+    def register(fn):
+        CASES[name] = (fn, repeat)
+        return fn
+    return register
+
+
+class Context:
+    def __init__(self, app, scale, usernames):
+        self.app, self.scale, self.usernames = app, scale, usernames
+        self.counter = itertools.count(1)
+
+    def login(self, username=None):
+        client = self.app.test_client()
+        resp = client.post("/login", data={"username": username or self.usernames[0], "password": PASSWORD})
+        assert resp.status_code in (200, 302), resp.status_code
+        return client
+
+
+def _ok(resp, *statuses):
+    assert resp.status_code in (statuses or (200,)), (resp.status_code, resp.get_data(as_text=True)[:200])
+    return resp
+
+
+@case("invoice_pdf", repeat=20)
+def invoice_pdf(ctx):
+    from gigforge import utils
+    from gigforge.models import InvoiceItem
+    rows = [(i.description, i.amount) for i in InvoiceItem.query.order_by(InvoiceItem.id).limit(200)]
+    items = (rows * (200 // max(1, len(rows)) + 1))[:200]  # two full pages plus the totals page
+    return lambda: utils.generate_invoice_pdf_bytes(items, "Bench Client", "Bench Project")
+
+
+@case("promo_image", repeat=20)
+def promo_image(ctx):
+    from gigforge import utils
+    return lambda: utils.generate_promo_image(f"Gig {next(ctx.counter)}", "Professional services")
+
+
+@case("proposal_render", repeat=200)
+def proposal_render(ctx):
+    from gigforge import utils
+    payload = {"client": "Acme", "project": "Website", "hours": 40, "rate": 75,
+               "deliverables": [f"Deliverable {i}" for i in range(10)]}
+    return lambda: utils.render_template("proposal.md.j2", utils.build_proposal_context(payload))
+
+
+@case("documents_batch", repeat=20)
+def documents_batch(ctx):
+    """One op streams proposals and contracts for 100 payloads from the batch endpoint."""
+    client = ctx.login()
+    body = "\n".join(json.dumps({"client": f"Client {i}", "project": f"Project {i}", "hours": 10 + i, "rate": 50})
+                     for i in range(100))
+    return lambda: _ok(client.post("/api/documents/batch", data=body,
+                                   content_type="application/x-ndjson")).get_data()  # drain the stream
+
+
+@case("dashboard", repeat=50)
+def dashboard(ctx):
+    client = ctx.login()
+    return lambda: _ok(client.get("/dashboard"))
+
+
+@case("create_invoice_api", repeat=100)
+def create_invoice_api(ctx):
+    from gigforge.models import Client, User
+    client = ctx.login()
+    user = User.query.filter_by(username=ctx.usernames[0]).one()
+    client_id = Client.query.filter_by(user_id=user.id).first().id
+    body = {"client_id": client_id, "project": "Bench",
+            "items": [{"desc": f"Line {i}", "amount": 10.0 + i} for i in range(5)]}
+    return lambda: _ok(client.post("/api/invoices/new", json=body))
+
+
+@case("payment_intent", repeat=100)
+def payment_intent(ctx):
+    client = ctx.login()
+    body = {"amount": 12500, "client_name": "Acme", "project": "Bench", "invoice_id": 1}
+    return lambda: _ok(client.post("/api/create_payment_intent", json=body))
+
+
+@case("webhook_ingest", repeat=200)
+def webhook_ingest(ctx):
+    client = ctx.app.test_client()
+    n_invoices = ctx.scale.users * ctx.scale.invoices
+
+    def op():
+        n = next(ctx.counter)
+        evt = {"id": f"evt_bench_{n}", "type": "payment_intent.succeeded", "created": 1_700_000_000 + n,
+               "data": {"object": {"id": f"pi_bench_{n % n_invoices + 1}"}}}
+        body = json.dumps(evt)
+        _ok(client.post("/webhook/payments", data=body, content_type="application/json",
+                        headers={"Stripe-Signature": stripe_signature(body)}))
+    return op
+
+
+@case("webhook_apply", repeat=10)
+def webhook_apply(ctx):
+    """One op applies a batch of 100 pending events."""
+    from gigforge import payments
+    n_invoices = ctx.scale.users * ctx.scale.invoices
+    for n in range(100 * 12):  # repeat + warm-up batches
+        kind = "payment_failed" if n % 7 == 0 else "succeeded"
+        payments.ingest_event({"id": f"evt_apply_{n}", "type": f"payment_intent.{kind}",
+                               "created": 1_700_000_000 + n,
+                               "data": {"object": {"id": f"pi_bench_{n % n_invoices + 1}"}}})
+    return lambda: payments.process_inbox(100)
+
+
+@case("fiverr_sync", repeat=5)
+def fiverr_sync(ctx):
+    """One op pushes every gig of the first user to the local Fiverr stand-in."""
+    from gigforge import fiverr_sync
+    from gigforge.models import User
+    user_id = User.query.filter_by(username=ctx.usernames[0]).one().id
+    engine = fiverr_sync.SyncEngine(rate=0)
+    return lambda: fiverr_sync.sync_draft_gigs(user_id, force=True, engine=engine)
+
+
+def measure(op, repeat, warmup=1):
+    for _ in range(warmup):
+        op()
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        op()
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    median = statistics.median(timings)
+    return {"n": repeat, "median_ms": round(median * 1000, 4),
+            "p95_ms": round(timings[max(0, int(len(timings) * 0.95) - 1)] * 1000, 4),
+            "min_ms": round(timings[0] * 1000, 4),
+            "ops_per_s": round(1 / median, 2) if median else None}
+
+
+def run(app, scale, names=None, repeat=None, fiverr_latency=0.0):
+    """Seed a fresh schema on `app`'s database and run the selected cases; returns the results doc."""
+    from gigforge.models import db
+    from gigforge import auth, models
+    names = names or list(CASES)
+    unknown = set(names) - set(CASES)
+    if unknown:
+        raise ValueError(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    results = {}
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        t0 = time.perf_counter()
+        usernames = seed(db, models, scale)
+        seed_seconds = time.perf_counter() - t0
+        auth.user_cache.invalidate()  # user ids were reused by the fresh schema
+        ctx = Context(app, scale, usernames)
+        with stand_ins(fiverr_latency):
+            for name in names:
+                setup, default_repeat = CASES[name]
+                results[name] = measure(setup(ctx), repeat or default_repeat)
+                db.session.remove()
+    return {
+        "meta": {"created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "scale": asdict(scale), "seed_seconds": round(seed_seconds, 3)},
+        "results": results,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """[(name, baseline_ms, current_ms, ratio, verdict)] comparing medians; verdict is
+    'regression', 'improved', 'ok' or 'new' (not in the baseline)."""
+    rows = []
+    base = baseline.get("results", {})
+    for name, current in results["results"].items():
+        if name not in base or not base[name].get("median_ms"):
+            rows.append((name, None, current["median_ms"], None, "new"))
+            continue
+        ratio = current["median_ms"] / base[name]["median_ms"]
+        verdict = "regression" if ratio > 1 + threshold else "improved" if ratio < 1 - threshold else "ok"
+        rows.append((name, base[name]["median_ms"], current["median_ms"], ratio, verdict))
+    return rows
+
+
+def _print_table(results, rows=None):
+    print(f"{'case':<20} {'median ms':>10} {'p95 ms':>10} {'ops/s':>10}" + (f" {'base ms':>10} {'ratio':>7}" if rows else ""))
+    by_name = {r[0]: r for r in rows or ()}
+    for name, r in results["results"].items():
+        line = f"{name:<20} {r['median_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['ops_per_s'] or 0:>10.1f}"
+        if name in by_name:
+            _, base_ms, _, ratio, verdict = by_name[name]
+            line += f" {base_ms:>10.3f} {ratio:>6.2f}x {verdict}" if base_ms else f" {'-':>10} {'-':>7} {verdict}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=None, help="override the data generator seed")
+    parser.add_argument("--only", nargs="+", choices=sorted(CASES), default=None)
+    parser.add_argument("--repeat", type=int, default=None, help="iterations per case (default: per case)")
+    parser.add_argument("--fiverr-latency-ms", type=float, default=0.0)
+    parser.add_argument("--out", default=None, help="write results JSON here")
+    parser.add_argument("--baseline", default=None, help="results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown of the median, as a fraction (default 0.25)")
+    parser.add_argument("--save-baseline", default=None, help="also write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    scale = SCALES[args.scale]
+    if args.seed is not None:
+        scale = Scale(**{**asdict(scale), "seed": args.seed})
+    tmp = tempfile.mkdtemp(prefix="nightanvil-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault("PROMO_CACHE_DIR", "")
+    from app import app
+
+    results = run(app, scale, args.only, args.repeat, args.fiverr_latency_ms / 1000)
+    results["meta"]["scale_name"] = args.scale
+    rows = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            rows = compare(results, json.load(f), args.threshold)
+        results["comparison"] = {"baseline": args.baseline, "threshold": args.threshold,
+                                 "rows": [dict(zip(("case", "baseline_ms", "median_ms", "ratio", "verdict"), r))
+                                          for r in rows]}
+    _print_table(results, rows)
+    for path in filter(None, (args.out, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(results if path == args.out else {k: results[k] for k in ("meta", "results")},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+    regressions = [r[0] for r in rows or () if r[4] == "regression"]
+    if regressions:
+        print(f"regressions over {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
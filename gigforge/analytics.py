@@ -0,0 +1,173 @@
+"""Revenue analytics in integer cents.
+
+Time series read the daily InvoiceRollup rows that models.RollupDelta keeps up to date on
+every invoice write: 'paid_day' (revenue by payment date) and 'day' (amount invoiced by
+creation date). A multi-year chart is therefore one indexed range scan of at most one row
+per day, bucketed into weeks or months over NumPy arrays. Aging, client lifetime value and
+the status funnel are single grouped SQL queries over the invoice table.
+"""
+from datetime import date, datetime, timedelta
+
+from gigforge.models import db, Client, Invoice, InvoiceRollup
+
+INTERVALS = ("day", "week", "month")
+METRICS = {"revenue": "paid_day", "invoiced": "day"}  # metric -> rollup dimension
+MAX_POINTS = 5000  # with fill, day series longer than ~13 years are refused
+AGING_BUCKETS = ((0, 30), (31, 60), (61, 90), (91, None))  # days since the invoice was created
+RECEIVABLE_STATUSES = ("sent",)
+FUNNEL = ("draft", "sent", "paid")
+DEFAULT_CLIENTS, MAX_CLIENTS = 20, 500
+
+class AnalyticsError(ValueError):
+    pass
+
+def _parse_day(value, name):
+    if value is None or value == "":
+        return None
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        raise AnalyticsError(f"{name} must be an ISO date (YYYY-MM-DD)")
+
+def _period_starts(np, days, interval):
+    """Start day of the day/week (Monday)/month containing each of `days` (datetime64[D])."""
+    if interval == "day":
+        return days
+    if interval == "week":
+        return days - ((days.astype("int64") + 3) % 7)  # 1970-01-01 was a Thursday
+    return days.astype("datetime64[M]").astype("datetime64[D]")
+
+def _label(day, interval):
+    return str(day)[:7] if interval == "month" else str(day)
+
+def revenue_series(user_id, interval="month", start=None, end=None, metric="revenue", fill=True):
+    """{"interval", "metric", "points": [{"period", "count", "amount_cents"}], "total_cents", "count"}.
+
+    Periods are labelled by their first day ("2024-05-06"), or "2024-05" for months. With
+    `fill`, periods without invoices between start and end are included as zeros.
+    """
+    import numpy as np
+    if interval not in INTERVALS:
+        raise AnalyticsError(f"interval must be one of: {', '.join(INTERVALS)}")
+    if metric not in METRICS:
+        raise AnalyticsError(f"metric must be one of: {', '.join(METRICS)}")
+    start, end = _parse_day(start, "start"), _parse_day(end, "end")
+    if start and end and start > end:
+        raise AnalyticsError("start must not be after end")
+    query = (db.select(InvoiceRollup.bucket, InvoiceRollup.count, InvoiceRollup.amount_cents)
+             .where(InvoiceRollup.user_id == user_id, InvoiceRollup.dimension == METRICS[metric],
+                    InvoiceRollup.count != 0))
+    if start:
+        query = query.where(InvoiceRollup.bucket >= start.isoformat())  # ISO dates sort as strings
+    if end:
+        query = query.where(InvoiceRollup.bucket <= end.isoformat())
+    rows = db.session.execute(query).all()
+
+    days = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    counts = np.array([r[1] for r in rows], dtype=np.int64)
+    cents = np.array([r[2] for r in rows], dtype=np.int64)
+    periods = _period_starts(np, days, interval)
+    if fill and (len(days) or (start and end)):
+        lo = np.datetime64(start) if start else days.min()
+        hi = np.datetime64(end) if end else max(np.datetime64(date.today()), days.max())
+        first, last = _period_starts(np, np.array([lo, max(lo, hi)], dtype="datetime64[D]"), interval)
+        if interval == "month":
+            keys = np.arange(first.astype("datetime64[M]"), last.astype("datetime64[M]") + 1).astype("datetime64[D]")
+        else:
+            keys = np.arange(first, last + 1, 7 if interval == "week" else 1)
+        if len(keys) > MAX_POINTS:
+            raise AnalyticsError(f"at most {MAX_POINTS} points per series; use a wider interval or a shorter range")
+        index = np.searchsorted(keys, periods)
+    else:
+        keys, index = np.unique(periods, return_inverse=True)
+    period_counts = np.zeros(len(keys), dtype=np.int64)
+    period_cents = np.zeros(len(keys), dtype=np.int64)
+    np.add.at(period_counts, index, counts)
+    np.add.at(period_cents, index, cents)
+    return {
+        "interval": interval, "metric": metric,
+        "points": [{"period": _label(k, interval), "count": int(n), "amount_cents": int(c)}
+                   for k, n, c in zip(keys, period_counts.tolist(), period_cents.tolist())],
+        "total_cents": int(cents.sum()), "count": int(counts.sum()),
+    }
+
+def aging(user_id, as_of=None):
+    """Open receivables (sent, unpaid) by age in days: {"buckets": [...], "total_cents", "count"}."""
+    now = as_of or datetime.utcnow()
+    columns = []
+    for low, high in AGING_BUCKETS:
+        cond = [Invoice.created_at <= now - timedelta(days=low)]
+        if high is not None:
+            cond.append(Invoice.created_at > now - timedelta(days=high + 1))
+        in_bucket = db.and_(*cond)
+        columns += [db.func.sum(db.case((in_bucket, 1), else_=0)),
+                    db.func.sum(db.case((in_bucket, Invoice.amount_cents), else_=0))]
+    row = db.session.execute(
+        db.select(*columns).where(Invoice.user_id == user_id, Invoice.status.in_(RECEIVABLE_STATUSES))).one()
+    buckets = [{"days": f"{low}-{high}" if high is not None else f"{low}+",
+                "count": int(row[2 * i] or 0), "amount_cents": int(row[2 * i + 1] or 0)}
+               for i, (low, high) in enumerate(AGING_BUCKETS)]
+    return {"as_of": now.isoformat(timespec="seconds"), "buckets": buckets,
+            "total_cents": sum(b["amount_cents"] for b in buckets), "count": sum(b["count"] for b in buckets)}
+
+def client_lifetime_value(user_id, limit=DEFAULT_CLIENTS):
+    """Clients by paid revenue: [{"client_id", "name", "paid_cents", "invoiced_cents", ...}, ...]."""
+    if not 1 <= limit <= MAX_CLIENTS:
+        raise AnalyticsError(f"limit must be between 1 and {MAX_CLIENTS}")
+    paid = Invoice.status == "paid"
+    per_client = (db.select(Invoice.client_id, db.func.count(Invoice.id).label("invoices"),
+                            db.func.sum(db.case((paid, 1), else_=0)).label("paid_invoices"),
+                            db.func.sum(db.case((paid, Invoice.amount_cents), else_=0)).label("paid_cents"),
+                            db.func.sum(Invoice.amount_cents).label("invoiced_cents"),
+                            db.func.min(Invoice.created_at).label("first"), db.func.max(Invoice.paid_at).label("last"))
+                  .where(Invoice.user_id == user_id).group_by(Invoice.client_id).subquery())
+    paid_cents = db.func.coalesce(per_client.c.paid_cents, 0)
+    rows = db.session.execute(
+        db.select(Client.id, Client.name, db.func.coalesce(per_client.c.invoices, 0), per_client.c.paid_invoices,
+                  paid_cents, db.func.coalesce(per_client.c.invoiced_cents, 0),
+                  per_client.c.first, per_client.c.last)
+        .outerjoin(per_client, per_client.c.client_id == Client.id)
+        .where(Client.user_id == user_id)
+        .order_by(paid_cents.desc(), Client.id)
+        .limit(limit)).all()
+    out = []
+    for client_id, name, invoices, paid_invoices, paid_total, invoiced, first, last_paid in rows:
+        paid_invoices, paid_total = int(paid_invoices or 0), int(paid_total)
+        out.append({"client_id": client_id, "name": name, "invoices": invoices, "paid_invoices": paid_invoices,
+                    "paid_cents": paid_total, "invoiced_cents": int(invoiced),
+                    "average_paid_cents": paid_total // paid_invoices if paid_invoices else 0,
+                    "first_invoice_at": first.isoformat() if first else None,
+                    "last_paid_at": last_paid.isoformat() if last_paid else None})
+    return out
+
+def funnel(user_id, start=None, end=None):
+    """draft -> sent -> paid conversion for invoices created in [start, end].
+
+    Statuses only move forward, so an invoice now `paid` also counts as having been sent.
+    """
+    start, end = _parse_day(start, "start"), _parse_day(end, "end")
+    query = (db.select(Invoice.status, db.func.count(Invoice.id),
+                       db.func.coalesce(db.func.sum(Invoice.amount_cents), 0))
+             .where(Invoice.user_id == user_id).group_by(Invoice.status))
+    if start:
+        query = query.where(Invoice.created_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        query = query.where(Invoice.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    by_status = {}
+    for status, n, c in db.session.execute(query):
+        prev = by_status.get(status or "draft", (0, 0))
+        by_status[status or "draft"] = (prev[0] + int(n), prev[1] + int(c))
+    reached, count, cents = [], 0, 0
+    for status in reversed(FUNNEL):
+        n, c = by_status.get(status, (0, 0))
+        count, cents = count + n, cents + c
+        reached.append({"stage": status, "count": count, "amount_cents": cents})
+    stages = reached[::-1]
+    created = stages[0]
+    created["count"] += sum(n for s, (n, _) in by_status.items() if s not in FUNNEL)
+    created["amount_cents"] += sum(c for s, (_, c) in by_status.items() if s not in FUNNEL)
+    for prev, stage in zip(stages, stages[1:]):
+        stage["conversion"] = round(stage["count"] / prev["count"], 4) if prev["count"] else 0.0
+    return {"stages": stages, "by_status": {s: {"count": n, "amount_cents": c} for s, (n, c) in by_status.items()}}
@@ -0,0 +1,143 @@
+"""Fingerprinted, precompressed static assets.
+
+`flask assets-build` copies every file under static/ and assets/ to ASSET_BUILD_DIR with a
+content hash in its name (night_theme.css -> night_theme.3f2a9c1b7d04.css), writes .gz and
+.br variants of text files and records the mapping in manifest.json. Templates link files
+through `asset_url`; hashed names are served with a one-year immutable Cache-Control and
+the smallest variant the client accepts. Without a build (development) the original files
+are served, revalidated by ETag.
+"""
+import functools, gzip, hashlib, json, mimetypes, os, shutil
+
+from flask import abort, request, send_file
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCES = {"static": os.path.join(ROOT_DIR, "static"), "assets": os.path.join(ROOT_DIR, "assets")}
+ASSET_BUILD_DIR = os.getenv("ASSET_BUILD_DIR") or os.path.join(ROOT_DIR, "dist")
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".svg", ".html", ".json", ".txt", ".xml", ".map", ".ico"}
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))  # preferred first
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def _fingerprinted(path, digest):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest[:12]}{ext}"
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+def _compress(data):
+    """{suffix: bytes} of the encodings that actually shrink `data`; .br needs the Brotli package."""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+        variants[".br"] = brotli.compress(data, quality=11)
+    except ImportError:
+        pass
+    return {suffix: blob for suffix, blob in variants.items() if len(blob) < len(data)}
+
+def build(out_dir=None, sources=None):
+    """Fingerprint and precompress every source file; returns the manifest.
+
+    Hashed files from earlier builds are left in place so pages rendered by a previous
+    deploy keep resolving while it drains.
+    """
+    out_dir = out_dir or ASSET_BUILD_DIR
+    manifest = {}
+    for prefix, src in (sources or SOURCES).items():
+        for dirpath, _, filenames in os.walk(src):
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                logical = f"{prefix}/{os.path.relpath(path, src).replace(os.sep, '/')}"
+                with open(path, "rb") as f:
+                    data = f.read()
+                hashed = _fingerprinted(logical, hashlib.sha256(data).hexdigest())
+                target = os.path.join(out_dir, hashed)
+                entry = {"file": hashed, "bytes": len(data)}
+                if not os.path.exists(target):
+                    _write(target, data)
+                if os.path.splitext(name)[1].lower() in COMPRESSIBLE:
+                    for suffix, blob in _compress(data).items():
+                        if not os.path.exists(target + suffix):
+                            _write(target + suffix, blob)
+                        entry[suffix.lstrip(".")] = len(blob)
+                manifest[logical] = entry
+    os.makedirs(out_dir, exist_ok=True)
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=1, sort_keys=True).encode())
+    _reset()
+    return manifest
+
+def clean(out_dir=None):
+    shutil.rmtree(out_dir or ASSET_BUILD_DIR, ignore_errors=True)
+    _reset()
+
+def _reset():
+    load_manifest.cache_clear()
+    _hashed_files.cache_clear()
+
+@functools.lru_cache(maxsize=None)
+def load_manifest():
+    """The manifest of the last build in ASSET_BUILD_DIR, read once per process."""
+    try:
+        with open(os.path.join(ASSET_BUILD_DIR, MANIFEST)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+@functools.lru_cache(maxsize=None)
+def _hashed_files():
+    return {entry["file"]: (logical, entry) for logical, entry in load_manifest().items()}
+
+def asset_url(path):
+    """URL of `path` ("static/css/night_theme.css", "assets/logo.svg"), fingerprinted once built."""
+    path = path.lstrip("/")
+    entry = load_manifest().get(path)
+    return f"/{entry['file']}" if entry else f"/{path}"
+
+def serve(prefix, filename):
+    """Send a hashed build file (precompressed variant, immutable) or, failing that, the source file."""
+    logical = f"{prefix}/{filename}"
+    if load_manifest():
+        hit = _hashed_files().get(logical)
+        if hit:
+            return _send_built(hit[0], hit[1])
+    source = os.path.realpath(os.path.join(SOURCES[prefix], filename))
+    if not source.startswith(os.path.realpath(SOURCES[prefix]) + os.sep) or not os.path.isfile(source):
+        abort(404)
+    response = send_file(source, conditional=True, etag=True, max_age=0)
+    response.cache_control.no_cache = True
+    return response
+
+def _send_built(logical, entry):
+    path = os.path.join(ASSET_BUILD_DIR, entry["file"])
+    mimetype = mimetypes.guess_type(logical)[0] or "application/octet-stream"
+    encoding = next((name for name, suffix in ENCODINGS
+                     if suffix.lstrip(".") in entry and request.accept_encodings[name] > 0), None)
+    if encoding:
+        path += dict(ENCODINGS)[encoding]
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+    if encoding:
+        response.content_encoding = encoding
+    if "gz" in entry or "br" in entry:  # caches must key on Accept-Encoding
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = IMMUTABLE
+    return response
+
+def add_page_etag(response):
+    """after_request: ETag rendered HTML pages and answer If-None-Match with 304."""
+    if (request.method in ("GET", "HEAD") and response.status_code == 200 and response.mimetype == "text/html"
+            and not response.is_streamed and not response.direct_passthrough):
+        response.add_etag()
+        response.make_conditional(request)
+        if not response.cache_control.public:
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+    return response
+
+def init_app(app):
+    app.add_template_global(asset_url)
+    app.after_request(add_page_etag)
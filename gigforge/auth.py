@@ -0,0 +1,197 @@
+"""Authentication helpers: a per-process session-user cache, login throttling and API tokens."""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from gigforge import metrics
+from gigforge.models import db, User, ApiToken, hash_token, normalize_username
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "1024"))
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+LOGIN_MAX_FAILURES = int(os.getenv("LOGIN_MAX_FAILURES", "5"))
+LOGIN_MAX_FAILURES_PER_ADDRESS = int(os.getenv("LOGIN_MAX_FAILURES_PER_ADDRESS", "50"))
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+TOKEN_TOUCH_SECONDS = 300  # last_used_at is only written this often per token
+
+class UserCache:
+    """Bounded LRU of detached User rows with a TTL, keyed by user id (plus token hash -> user id).
+
+    Changes made through the ORM in this process evict the entry right away (see the
+    mapper listeners below); other processes pick them up within `ttl` seconds.
+    """
+
+    def __init__(self, max_items=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_items, self.ttl = max_items, ttl
+        self._users = OrderedDict()   # user_id -> (expires, detached User)
+        self._tokens = OrderedDict()  # token hash -> (expires, user_id, token_id)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _get(self, store, key):
+        with self._lock:
+            item = store.get(key)
+            if item is None or item[0] < time.monotonic():
+                store.pop(key, None)
+                self.counters["misses"] += 1
+                return None
+            store.move_to_end(key)
+            self.counters["hits"] += 1
+            return item[1:]
+
+    def _put(self, store, key, *value):
+        if self.ttl <= 0 or self.max_items <= 0:
+            return
+        with self._lock:
+            store[key] = (time.monotonic() + self.ttl, *value)
+            store.move_to_end(key)
+            while len(store) > self.max_items:
+                store.popitem(last=False)
+
+    def load(self, user_id):
+        """The user as an instance of the current session, from the cache when possible."""
+        cached = self._get(self._users, user_id)
+        if cached:
+            # load=False attaches a copy without a SELECT; relationships still lazy-load.
+            return db.session.merge(cached[0], load=False)
+        user = db.session.get(User, user_id)
+        if user is not None:
+            self._put(self._users, user_id, _detached_copy(user))
+        return user
+
+    def token_user(self, token_hash):
+        """(user_id, token_id) for a live API token, or None."""
+        cached = self._get(self._tokens, token_hash)
+        if cached:
+            return cached
+        row = db.session.execute(
+            db.select(ApiToken.id, ApiToken.user_id, ApiToken.last_used_at)
+            .where(ApiToken.token_hash == token_hash, ApiToken.revoked_at.is_(None))).first()
+        if row is None:
+            return None
+        _touch_token(row.id, row.last_used_at)
+        self._put(self._tokens, token_hash, row.user_id, row.id)
+        return row.user_id, row.id
+
+    def invalidate(self, user_id=None):
+        """Drop one user (and their tokens) or, with no argument, everything."""
+        with self._lock:
+            if user_id is None:
+                self._users.clear(); self._tokens.clear()
+                return
+            self._users.pop(user_id, None)
+            for key in [k for k, v in self._tokens.items() if v[1] == user_id]:
+                del self._tokens[key]
+
+    def stats(self):
+        return {"users": len(self._users), "tokens": len(self._tokens), **self.counters}
+
+def _detached_copy(user):
+    """A session-free User carrying only the column values (what merge(load=False) needs)."""
+    copy = User()
+    for attr in db.inspect(User).column_attrs:
+        copy.__dict__[attr.key] = getattr(user, attr.key)
+    db.orm.make_transient_to_detached(copy)
+    return copy
+
+def _touch_token(token_id, last_used_at):
+    now = datetime.utcnow()
+    if last_used_at is None or (now - last_used_at).total_seconds() > TOKEN_TOUCH_SECONDS:
+        # Core UPDATE on its own connection: no ORM state, and never part of the request's transaction.
+        with db.engine.begin() as conn:
+            conn.execute(db.update(ApiToken).where(ApiToken.id == token_id).values(last_used_at=now))
+
+user_cache = UserCache()
+metrics.register_cache("users", user_cache)
+
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def _evict_user(mapper, connection, target):
+    user_cache.invalidate(target.id)
+
+@db.event.listens_for(ApiToken, 'after_update')
+@db.event.listens_for(ApiToken, 'after_delete')
+def _evict_token(mapper, connection, target):
+    user_cache.invalidate(target.user_id)
+
+def find_user(username):
+    """Look a user up by normalized username (the indexed `username_key`)."""
+    key = normalize_username(username)
+    return User.query.filter_by(username_key=key).first() if key else None
+
+class LoginThrottle:
+    """Sliding-window failure counter per key; a key over the limit is refused before
+    any password hashing happens."""
+
+    def __init__(self, max_failures=LOGIN_MAX_FAILURES, window=LOGIN_WINDOW_SECONDS, max_keys=10000):
+        self.max_failures, self.window, self.max_keys = max_failures, window, max_keys
+        self._failures = OrderedDict()  # key -> deque of failure times
+        self._lock = threading.Lock()
+
+    def _recent(self, key, now):
+        times = self._failures.get(key)
+        while times and times[0] <= now - self.window:
+            times.popleft()
+        return times
+
+    def retry_after(self, *keys):
+        """Seconds until every key may try again (0 if allowed now)."""
+        now = time.monotonic()
+        with self._lock:
+            recent = [self._recent(key, now) for key in keys]
+            waits = [times[0] + self.window - now for times in recent
+                     if times and len(times) >= self.max_failures]
+        return max(waits, default=0)
+
+    def failed(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                times = self._failures.setdefault(key, deque(maxlen=self.max_failures))
+                times.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def succeeded(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._failures.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._failures.clear()
+
+# Failures per address+account, and a looser budget per address for sprays across accounts.
+# Neither locks an account out for everyone else.
+login_throttle = LoginThrottle()
+address_throttle = LoginThrottle(max_failures=LOGIN_MAX_FAILURES_PER_ADDRESS)
+
+def login_retry_after(username, remote_addr):
+    return max(login_throttle.retry_after(f"{remote_addr}:{normalize_username(username)}"),
+               address_throttle.retry_after(remote_addr))
+
+def record_login(username, remote_addr, ok):
+    key = f"{remote_addr}:{normalize_username(username)}"
+    if ok:
+        login_throttle.succeeded(key)
+    else:
+        login_throttle.failed(key)
+        address_throttle.failed(remote_addr)
+
+def issue_token(user, name=None):
+    """Create an API token for `user`; returns (ApiToken, plaintext). Only the hash is stored."""
+    plaintext = "na_" + secrets.token_urlsafe(32)
+    token = ApiToken(user_id=user.id, name=name, token_hash=hash_token(plaintext))
+    db.session.add(token)
+    db.session.commit()
+    return token, plaintext
+
+def load_user_from_request(request):
+    """Flask-Login request loader for `Authorization: Bearer <api token>`."""
+    header = request.headers.get("Authorization", "")
+    if not header.startswith("Bearer na_"):
+        return None
+    found = user_cache.token_user(hash_token(header[len("Bearer "):].strip()))
+    return user_cache.load(found[0]) if found else None
@@ -0,0 +1,240 @@
+"""Manifest-driven artifact builds for `gigforge build`.
+
+A manifest lists artifacts (proposal, contract, invoice, promo, gig); each is rendered in a process
+pool and skipped when its fingerprint -- inputs, template source, the source of the modules
+its renderer depends on and the renderer version -- matches the one recorded in the state
+file by the previous build, like make.
+"""
+import datetime, functools, hashlib, json, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from gigforge import pricing, promo, utils
+
+STATE_FILE = ".gigforge-build.json"
+RENDERERS = {}
+
+class ManifestError(ValueError):
+    pass
+
+@dataclass
+class Renderer:
+    fn: object
+    version: int
+    templates: tuple = ()
+    dated: str = None  # strftime of today's date that the output shows, unless the spec pins "date"
+    modules: tuple = ()  # module names whose source is fingerprinted, besides this one
+
+def renderer(kind, version=1, templates=(), dated=None, modules=()):
+    """Register `fn(spec) -> bytes` for artifacts of `kind`.
+
+    Edits to this module, to `modules` (gigforge modules the output depends on) and to
+    `templates` rebuild its artifacts by themselves; bump `version` for anything else, such
+    as a library upgrade that changes the output.
+    """
+    def register(fn):
+        deps = (fn.__module__, *(m.__name__ for m in modules))
+        RENDERERS[kind] = Renderer(fn, version, tuple(templates), dated, deps)
+        return fn
+    return register
+
+def _price(spec):
+    return utils.calc_price(hours=spec.get("hours", 0), rate=spec.get("rate", 0), fixed=spec.get("fixed"),
+                            margin=spec.get("margin", 0.2))
+
+@renderer("proposal", templates=("proposal.md.j2",), dated="%Y-%m-%d", modules=(utils, pricing))
+def render_proposal(spec):
+    ctx = utils.build_proposal_context({**spec, "price": spec.get("price", _price(spec))})
+    return utils.render_template(spec.get("template", "proposal.md.j2"), ctx).encode()
+
+@renderer("contract", templates=("contract.txt.j2",), dated="%Y-%m-%d", modules=(utils, pricing))
+def render_contract(spec):
+    payload = {**spec, "price": spec.get("price", _price(spec))}
+    return utils.render_template("contract.txt.j2", utils.build_contract_context(payload)).encode()
+
+@renderer("invoice", dated="%Y-%m-%d", modules=(utils,))
+def render_invoice(spec):
+    items = [(it["desc"], float(it["amount"])) if isinstance(it, dict) else (it[0], float(it[1]))
+             for it in spec.get("items", ())]
+    return utils.generate_invoice_pdf_bytes(items, spec.get("client", "Client"), spec.get("project", "Project"),
+                                            invoice_date=spec.get("date"), invoice_number=spec.get("number"))
+
+@renderer("promo", version=promo.RENDER_VERSION, dated="%Y", modules=(promo,))
+def render_promo(spec):
+    """PNG, WebP or JPEG by the `out` extension; `profile` is final (smallest) unless set to preview."""
+    width, height = spec.get("size", promo.BASE_SIZE)
+    fmt = os.path.splitext(spec["out"])[1].lstrip(".").lower()
+    return promo.render(spec["title"], spec.get("subtitle", ""), [promo.Variant("out", width, height)],
+                        fmt if fmt in ("webp", "jpg", "jpeg") else "png", spec.get("profile", "final"),
+                        year=int(spec["date"][:4]) if spec.get("date") else None)[0].data
+
+@renderer("gig", modules=(utils, pricing))
+def render_gig(spec):
+    return (f"{spec['title']}\n\nPrice: ${_price(spec)}\n\n"
+            f"Brief: I will deliver a high-quality {spec['title']}.\n").encode()
+
+def _read_manifest_records(path):
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8") as f:
+        if ext == ".jsonl":
+            return [json.loads(line) for line in f if line.strip()]
+        if ext in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError:
+                raise ManifestError("YAML manifests need PyYAML (pip install pyyaml); or use JSON/JSONL")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+def load_manifest(path):
+    """Artifact specs from a JSON, JSONL or YAML manifest.
+
+    Either a list of specs or {"defaults": {...}, "artifacts": [...]}; defaults are merged
+    into every spec. Each spec needs `type` and `out` (relative to the manifest).
+    """
+    data = _read_manifest_records(path)
+    defaults = {}
+    if isinstance(data, dict):
+        defaults, data = data.get("defaults") or {}, data.get("artifacts")
+    if not isinstance(data, list):
+        raise ManifestError("manifest must be a list of artifacts or have an `artifacts` list")
+    base = os.path.dirname(os.path.abspath(path))
+    specs, outs = [], set()
+    for n, item in enumerate(data, 1):
+        spec = {**defaults, **(item or {})}
+        kind, out = spec.get("type"), spec.get("out")
+        if kind not in RENDERERS:
+            raise ManifestError(f"artifact {n}: unknown type {kind!r} (expected one of {', '.join(sorted(RENDERERS))})")
+        if not out:
+            raise ManifestError(f"artifact {n}: missing `out`")
+        spec["out"] = os.path.normpath(os.path.join(base, out))
+        if spec["out"] in outs:
+            raise ManifestError(f"artifact {n}: {out} is produced twice")
+        outs.add(spec["out"])
+        specs.append(spec)
+    return specs
+
+def _file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def _template_digest(name):
+    return _file_digest(os.path.join(utils.TEMPLATES_DIR, name))
+
+@functools.lru_cache(maxsize=None)
+def _source_digest(module):
+    return _file_digest(sys.modules[module].__file__)
+
+def fingerprint(spec, today=None):
+    r = RENDERERS[spec["type"]]
+    inputs = {k: v for k, v in spec.items() if k != "out"}
+    if r.dated and not spec.get("date"):
+        inputs["date"] = (today or datetime.date.today()).strftime(r.dated)
+    templates = list(r.templates) + ([spec["template"]] if spec.get("template") else [])
+    doc = {"inputs": inputs, "version": r.version,
+           "templates": {name: _template_digest(name) for name in sorted(set(templates))},
+           "sources": {module: _source_digest(module) for module in sorted(set(r.modules))}}
+    return hashlib.sha256(json.dumps(doc, sort_keys=True, default=str).encode()).hexdigest()
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def save_state(path, state):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+def build_one(spec):
+    """Render one artifact to its `out` path; runs in a pool worker. Returns (seconds, bytes)."""
+    t0 = time.perf_counter()
+    data = RENDERERS[spec["type"]].fn(spec)
+    os.makedirs(os.path.dirname(spec["out"]) or ".", exist_ok=True)
+    tmp = f"{spec['out']}.part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, spec["out"])
+    return time.perf_counter() - t0, len(data)
+
+@dataclass
+class BuildReport:
+    built: list = field(default_factory=list)    # (spec, seconds, bytes)
+    skipped: list = field(default_factory=list)  # specs
+    failed: list = field(default_factory=list)   # (spec, error)
+    wall: float = 0.0
+
+def build(specs, state_path, jobs=None, force=False, on_result=None):
+    """Render every out-of-date artifact across `jobs` processes (0 = in this process).
+
+    The state file is rewritten after the build with the fingerprints of everything that
+    is now up to date, so an interrupted or partly failed build only redoes what is left.
+    """
+    t0 = time.perf_counter()
+    state, report = load_state(state_path), BuildReport()
+    today = datetime.date.today()
+    todo = []
+    for spec in specs:
+        digest = fingerprint(spec, today)
+        if not force and state.get(spec["out"], {}).get("hash") == digest and os.path.exists(spec["out"]):
+            report.skipped.append(spec)
+        else:
+            todo.append((spec, digest))
+
+    def done(spec, digest, result=None, error=None):
+        if error is None:
+            seconds, size = result
+            report.built.append((spec, seconds, size))
+            state[spec["out"]] = {"hash": digest, "type": spec["type"], "seconds": round(seconds, 4),
+                                  "bytes": size, "built_at": datetime.datetime.now().isoformat(timespec="seconds")}
+        else:
+            report.failed.append((spec, error))
+            state.pop(spec["out"], None)
+        if on_result:
+            on_result(spec, error)
+
+    jobs = os.cpu_count() if jobs is None else jobs
+    try:
+        if jobs == 0 or len(todo) <= 1:
+            for spec, digest in todo:
+                try:
+                    done(spec, digest, build_one(spec))
+                except Exception as e:
+                    done(spec, digest, error=f"{type(e).__name__}: {e}")
+        else:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(todo))) as pool:
+                futures = {pool.submit(build_one, spec): (spec, digest) for spec, digest in todo}
+                for future in as_completed(futures):
+                    spec, digest = futures[future]
+                    try:
+                        done(spec, digest, future.result())
+                    except Exception as e:
+                        done(spec, digest, error=f"{type(e).__name__}: {e}")
+    finally:
+        live = {spec["out"] for spec in specs}
+        save_state(state_path, {out: entry for out, entry in state.items() if out in live})
+    report.wall = time.perf_counter() - t0
+    return report
+
+def summary_lines(report, slowest=5):
+    """Human-readable timing summary of a BuildReport."""
+    lines = [f"built {len(report.built)}, skipped {len(report.skipped)} (up to date), "
+             f"failed {len(report.failed)} in {report.wall:.2f}s"]
+    by_kind = {}
+    for spec, seconds, size in report.built:
+        n, total, nbytes = by_kind.get(spec["type"], (0, 0.0, 0))
+        by_kind[spec["type"]] = (n + 1, total + seconds, nbytes + size)
+    for kind, (n, total, nbytes) in sorted(by_kind.items()):
+        lines.append(f"  {kind:<9} {n:>5} x {total / n * 1000:8.1f} ms avg  {total:7.2f}s render  {nbytes / 1024:9.1f} KiB")
+    if report.built:
+        render = sum(s for _, s, _ in report.built)
+        lines.append(f"  render time {render:.2f}s over {report.wall:.2f}s wall ({render / report.wall if report.wall else 0:.1f}x parallel)")
+        lines.append("  slowest: " + ", ".join(f"{os.path.basename(spec['out'])} {s * 1000:.0f} ms"
+                                              for spec, s, _ in sorted(report.built, key=lambda b: -b[1])[:slowest]))
+    for spec, error in report.failed:
+        lines.append(f"  FAILED {spec['out']}: {error}")
+    return lines
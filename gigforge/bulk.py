@@ -0,0 +1,122 @@
+"""Set-based bulk invoice creation for imports and recurring-billing runs.
+
+Records look like the body of POST /api/invoices/new:
+
+    {"client_id": 3, "project": "Site", "items": [{"desc": "Dev", "amount": 120.0}],
+     "status": "sent", "created_at": "2024-01-31T00:00:00"}
+
+Everything is validated before anything is written; valid invoices and their
+items are then inserted with one executemany per chunk.
+"""
+import itertools, json
+from datetime import datetime
+
+from gigforge.models import db, Client, Invoice, InvoiceItem, RollupDelta, to_cents
+
+DEFAULT_CHUNK_SIZE = 500
+INVOICE_STATUSES = ('draft', 'sent', 'paid')
+
+def iter_records(stream):
+    """Yield invoice dicts from a text stream holding either a JSON array or NDJSON.
+
+    NDJSON is parsed line by line, so large uploads are never held as one string.
+    """
+    first = stream.readline()
+    while first and not first.strip():
+        first = stream.readline()
+    if first.lstrip().startswith('['):
+        yield from json.loads(first + stream.read())
+        return
+    for line in itertools.chain([first], stream):
+        if line.strip():
+            yield json.loads(line)
+
+def _amount(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError
+    return float(value)
+
+def validate_invoice(record, client_ids):
+    """Return (row, items, errors) for one record; row/items are None when errors is non-empty."""
+    if not isinstance(record, dict):
+        return None, None, ["record must be an object"]
+    errors = []
+    if record.get('client_id') not in client_ids:
+        errors.append("unknown client_id")
+    project = record.get('project', 'Project')
+    if not isinstance(project, str) or not project.strip() or len(project) > 255:
+        errors.append("project must be a non-empty string of at most 255 characters")
+    status = record.get('status', 'draft')
+    if status not in INVOICE_STATUSES:
+        errors.append(f"status must be one of {', '.join(INVOICE_STATUSES)}")
+    created_at = record.get('created_at')
+    try:
+        created_at = datetime.fromisoformat(created_at) if created_at else datetime.utcnow()
+    except (TypeError, ValueError):
+        errors.append("created_at must be an ISO timestamp")
+    items = []
+    raw_items = record.get('items', [])
+    if not isinstance(raw_items, list):
+        errors.append("items must be a list")
+        raw_items = []
+    for n, item in enumerate(raw_items):
+        try:
+            desc = item['desc']
+            if not isinstance(desc, str) or not desc or len(desc) > 255:
+                raise ValueError
+            items.append({"description": desc, "amount": _amount(item['amount'])})
+        except (KeyError, TypeError, ValueError):
+            errors.append(f"items[{n}] needs a desc (string) and a numeric amount")
+    if errors:
+        return None, None, errors
+    amount = round(sum(i["amount"] for i in items), 2)
+    row = {"client_id": record['client_id'], "project": project, "status": status,
+           "amount": amount, "amount_cents": to_cents(amount), "created_at": created_at}
+    if status == 'paid':
+        row["paid_at"] = created_at
+    return row, items, []
+
+def bulk_create_invoices(user_id, records, chunk_size=DEFAULT_CHUNK_SIZE, atomic=False):
+    """Validate then insert `records` for `user_id`; returns one result dict per record, in order.
+
+    With atomic=True nothing is written unless every record is valid. Otherwise valid
+    records are inserted and committed chunk by chunk, and invalid ones are reported.
+    """
+    records = list(records)
+    client_ids = set(db.session.scalars(db.select(Client.id).where(Client.user_id == user_id)))
+    results, valid = [], []
+    for index, record in enumerate(records):
+        row, items, errors = validate_invoice(record, client_ids)
+        if errors:
+            results.append({"index": index, "status": "error", "errors": errors})
+        else:
+            row["user_id"] = user_id
+            results.append({"index": index, "status": "created"})
+            valid.append((index, row, items))
+    if atomic and len(valid) != len(records):
+        for result in results:
+            if result["status"] == "created":
+                result["status"] = "skipped"
+        return results
+
+    chunk_size = max(1, chunk_size)
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        ids = db.session.scalars(
+            db.insert(Invoice).returning(Invoice.id, sort_by_parameter_order=True),
+            [row for _, row, _ in chunk]).all()
+        item_rows = [dict(item, invoice_id=invoice_id)
+                     for invoice_id, (_, _, items) in zip(ids, chunk) for item in items]
+        if item_rows:
+            db.session.execute(db.insert(InvoiceItem), item_rows)
+        # Core inserts skip the ORM flush hooks, so feed the rollups directly.
+        delta = RollupDelta()
+        for _, row, _ in chunk:
+            delta.invoice(user_id, row["status"], row["amount"], row["created_at"], row.get("paid_at"))
+        delta.apply(db.session.connection())
+        if not atomic:
+            db.session.commit()
+        for invoice_id, (index, _, _) in zip(ids, chunk):
+            results[index]["invoice_id"] = invoice_id
+    db.session.commit()
+    return results
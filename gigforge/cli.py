@@ -1,21 +1,89 @@
+import csv
+import json
+import os
 import click
-from gigforge import utils
+from gigforge import build, pricing, utils
 
 @click.group()
 def cli():
     pass
 
 @cli.command()
-@click.option('--title', required=True)
+@click.option('--title', default=None)
 @click.option('--hours', type=float, default=0.0)
 @click.option('--rate', type=float, default=0.0)
 @click.option('--fixed', type=float, default=None)
 @click.option('--margin', type=float, default=0.2)
-def gig(title, hours, rate, fixed, margin):
-    price = utils.calc_price(hours=hours, rate=rate, fixed=fixed, margin=margin)
+@click.option('--batch', 'batch_path', type=click.File('r'), default=None,
+              help='Quote every row of a CSV or JSONL file (columns: title, hours, rate, fixed, quantity, margin)')
+@click.option('--rules', 'rules_path', type=click.File('r'), default=None, help='JSON pricing rules for --batch')
+@click.option('--out', type=click.File('w'), default=None, help='With --batch: write CSV (or JSONL for *.jsonl) here')
+def gig(title, hours, rate, fixed, margin, batch_path, rules_path, out):
+    if batch_path is not None:
+        return _gig_batch(batch_path, rules_path, margin, out)
+    if not title:
+        raise click.UsageError("--title is required (or use --batch FILE)")
+    try:
+        price = utils.calc_price(hours=hours, rate=rate, fixed=fixed, margin=margin)
+    except pricing.QuoteError as e:
+        raise click.BadParameter(str(e))
     outline = f"{title}\n\nPrice: ${price}\n\nBrief: I will deliver a high-quality {title}."
     click.echo(outline)
 
+def _read_rows(f):
+    if (f.name or "").endswith(".jsonl"):
+        return [json.loads(line) for line in f if line.strip()]
+    rows = []
+    for row in csv.DictReader(f):
+        rows.append({k: (v if k == "title" else float(v)) for k, v in row.items() if k and v not in (None, "")})
+    return rows
+
+def _gig_batch(f, rules_f, margin, out):
+    rules = json.load(rules_f) if rules_f else {}
+    rules.setdefault("margin", margin)
+    try:
+        rows = _read_rows(f)
+        result = pricing.quote(rows, pricing.PricingRules.from_dict(rules))
+    except (ValueError, pricing.QuoteError) as e:
+        raise click.ClickException(f"{f.name}: {e}")
+    quoted = [{"title": row.get("title", ""), **q} for row, q in zip(rows, result.rows())]
+    if out is None:
+        click.echo(f"{'title':<40} {'unit':>12} {'total':>12}")
+        for q in quoted:
+            click.echo(f"{q['title'][:40]:<40} {q['unit_cents'] / 100:>12,.2f} {q['total_cents'] / 100:>12,.2f}")
+    elif (out.name or "").endswith(".jsonl"):
+        for q in quoted:
+            out.write(json.dumps(q) + "\n")
+    else:
+        writer = csv.DictWriter(out, fieldnames=["title", "unit_cents", "subtotal_cents", "discount_cents", "total_cents"])
+        writer.writeheader()
+        writer.writerows(quoted)
+    click.echo(f"{len(quoted)} gigs, total ${int(result.total_cents.sum()) / 100:,.2f}", err=out is not None)
+
+@cli.command()
+@click.argument('titles', nargs=-1)
+@click.option('--batch', 'batch_path', type=click.File('r'), default=None,
+              help='Titles to describe: a text file (one per line), or CSV/JSONL with a title column')
+@click.option('--bullets', type=click.IntRange(1, 10), default=3)
+@click.option('--jsonl', is_flag=True, help='Print {"title", "description"} lines instead of text')
+def describe(titles, batch_path, bullets, jsonl):
+    """Generate gig descriptions; titles are cached and sent to the backend in batches."""
+    from gigforge import generation
+    titles = list(titles)
+    if batch_path is not None:
+        if (batch_path.name or "").endswith((".csv", ".jsonl")):
+            titles += [row.get("title", "") for row in _read_rows(batch_path)]
+        else:
+            titles += [line.strip() for line in batch_path if line.strip()]
+    if not titles:
+        raise click.UsageError("give one or more TITLES (or --batch FILE)")
+    try:
+        descriptions = generation.service().generate_many(titles, bullets)
+    except generation.GenerationError as e:
+        raise click.ClickException(str(e))
+    for title, text in zip(titles, descriptions):
+        click.echo(json.dumps({"title": title, "description": text}) if jsonl else f"{text}\n")
+
 @cli.command()
 @click.option('--client', required=True)
 @click.option('--project', required=True)
@@ -45,18 +113,54 @@ def invoice(client, project, items, out):
     for it in items:
         if ":" in it:
             d,a = it.split(":",1); parsed.append((d.strip(), float(a)))
-    pdf = utils.generate_invoice_pdf_bytes(parsed, client, project)
-    with open(out, "wb") as f: f.write(pdf)
+    with open(out, "wb") as f: utils.invoice_pdf(parsed, client, project, f)
     click.echo(f"Wrote invoice to {out}")
 
 @cli.command()
 @click.option('--title', required=True)
 @click.option('--subtitle', default="")
-@click.option('--out', default="promo.png")
-def promo(title, subtitle, out):
-    data = utils.generate_promo_image(title, subtitle)
-    with open(out,"wb") as f: f.write(data)
-    click.echo(f"Wrote promo image to {out}")
+@click.option('--out', default="promo.png", help='Output file; with several variants/formats, OUT-<variant>.<ext>')
+@click.option('--variants', default="og", help='Comma-separated: og, fiverr, twitter, square, story, thumb, '
+              'marketplaces, social, all or WIDTHxHEIGHT')
+@click.option('--formats', default=None, help='Comma-separated png, webp, jpeg (default: from --out)')
+@click.option('--profile', type=click.Choice(["final", "preview"]), default="final",
+              help='final: smallest files; preview: fastest encoding')
+def promo(title, subtitle, out, variants, formats, profile):
+    from gigforge import promo as promos
+    formats = formats or os.path.splitext(out)[1].lstrip(".") or "png"
+    try:
+        results = promos.render(title, subtitle, promos.parse_variants(variants), formats, profile)
+    except promos.PromoError as e:
+        raise click.UsageError(str(e))
+    stem = os.path.splitext(out)[0]
+    for r in results:
+        path = out if len(results) == 1 else promos.filename(r, stem)
+        with open(path, "wb") as f: f.write(r.data)
+        click.echo(f"Wrote promo image to {path} ({r.variant.width}x{r.variant.height}, {len(r.data):,} bytes)")
+
+@cli.command("build")
+@click.argument('manifest', type=click.Path(exists=True, dir_okay=False))
+@click.option('--jobs', '-j', type=int, default=None, help='Worker processes (default: CPU count, 0 = no pool)')
+@click.option('--state', 'state_path', default=None, help=f'State file (default: {build.STATE_FILE} next to the manifest)')
+@click.option('--force', is_flag=True, help='Rebuild everything, even if up to date')
+@click.option('--quiet', '-q', is_flag=True, help='Only print the summary')
+def build_command(manifest, jobs, state_path, force, quiet):
+    """Render every artifact in a JSON/JSONL/YAML manifest, skipping ones that are up to date."""
+    try:
+        specs = build.load_manifest(manifest)
+    except (build.ManifestError, ValueError) as e:
+        raise click.ClickException(f"{manifest}: {e}")
+    state_path = state_path or os.path.join(os.path.dirname(os.path.abspath(manifest)), build.STATE_FILE)
+
+    def progress(spec, error):
+        if not quiet or error:
+            click.echo(f"{'FAILED' if error else 'built '} {os.path.relpath(spec['out'])}", err=bool(error))
+
+    report = build.build(specs, state_path, jobs=jobs, force=force, on_result=progress)
+    for line in build.summary_lines(report):
+        click.echo(line)
+    if report.failed:
+        raise SystemExit(1)
 
 if __name__=="__main__":
     cli()
@@ -0,0 +1,130 @@
+"""Database engine profiles and read-replica routing.
+
+DB_PROFILE picks how engines are tuned: `auto` (default) by the URL's dialect, or
+`sqlite`, `postgres` or `off` (SQLAlchemy defaults). The sqlite profile puts the file in
+WAL mode with relaxed fsyncs, a memory map and a busy timeout, set on every new
+connection; the postgres profile sizes the pool and turns on pre-ping, recycling and
+statement caching. With DATABASE_REPLICA_URL set, views marked @read_only send their
+SELECTs to the replica; writes and flushes always go to the primary.
+"""
+import functools, os
+
+from flask import current_app, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Delete, Insert, Update, create_engine, event
+from sqlalchemy.engine import make_url
+
+DB_PROFILE = os.getenv("DB_PROFILE", "auto")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+REPLICA_EXTENSION = "gigforge.replica"
+READ_ONLY_KEY = "gigforge.db_read_only"
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")  # safe with WAL: no fsync per commit
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "32"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "1000"))
+DB_PREPARE_THRESHOLD = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))
+
+def profile_for(url, profile=None):
+    """Resolve `auto` to the profile matching the URL's dialect."""
+    profile = (profile or DB_PROFILE).lower()
+    if profile != "auto":
+        return profile
+    backend = make_url(url).get_backend_name()
+    return {"sqlite": "sqlite", "postgresql": "postgres"}.get(backend, "off")
+
+def _is_memory(url):
+    database = make_url(url).database
+    return not database or database == ":memory:" or "mode=memory" in database
+
+def engine_options(url, profile=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for `url` under `profile`."""
+    profile = profile_for(url, profile)
+    if profile == "sqlite":
+        # pysqlite waits this long on a locked database before raising "database is locked".
+        return {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    if profile == "postgres":
+        options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT,
+                   "pool_recycle": DB_POOL_RECYCLE, "pool_pre_ping": True, "pool_use_lifo": True,
+                   "query_cache_size": DB_STATEMENT_CACHE_SIZE}
+        if make_url(url).get_driver_name() == "psycopg":
+            # psycopg 3 prepares a statement server-side once it has run this many times on a connection.
+            options["connect_args"] = {"prepare_threshold": DB_PREPARE_THRESHOLD}
+        return options
+    return {}
+
+def sqlite_pragmas(url):
+    """PRAGMAs run on each new SQLite connection; in-memory databases only take the busy timeout."""
+    pragmas = [("busy_timeout", SQLITE_BUSY_TIMEOUT_MS)]
+    if not _is_memory(url):
+        pragmas += [("journal_mode", SQLITE_JOURNAL_MODE), ("synchronous", SQLITE_SYNCHRONOUS),
+                    ("mmap_size", SQLITE_MMAP_MB * 1024 * 1024), ("cache_size", -SQLITE_CACHE_MB * 1024),
+                    ("temp_store", "MEMORY")]
+    return pragmas
+
+def install_sqlite_hooks(engine):
+    pragmas = sqlite_pragmas(str(engine.url))
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def configure(app):
+    """Fill in engine options before db.init_app."""
+    url = app.config["SQLALCHEMY_DATABASE_URI"]
+    profile = app.config.setdefault("DB_PROFILE", DB_PROFILE)
+    options = app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {})
+    for key, value in engine_options(url, profile).items():
+        options.setdefault(key, value)
+
+def init_app(app, db):
+    """Create the replica engine, if any, and install connect hooks on this app's engines.
+
+    The replica is kept out of SQLALCHEMY_BINDS: binds would give every model a second
+    metadata and make create_all/migrations target the replica too.
+    """
+    profile = app.config["DB_PROFILE"]
+    replica = app.config.setdefault("DATABASE_REPLICA_URL", DATABASE_REPLICA_URL)
+    if replica:
+        app.extensions[REPLICA_EXTENSION] = create_engine(replica, **engine_options(replica, profile))
+    for engine in all_engines(app, db):
+        if engine.dialect.name == "sqlite" and profile_for(str(engine.url), profile) == "sqlite":
+            install_sqlite_hooks(engine)
+
+def replica_engine(app=None):
+    return (app or current_app).extensions.get(REPLICA_EXTENSION)
+
+def all_engines(app, db):
+    with app.app_context():
+        engines = list(db.engines.values())
+    replica = replica_engine(app)
+    return engines + ([replica] if replica is not None else [])
+
+def read_only(view):
+    """Route this view's queries to the read replica when one is configured."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        request.environ[READ_ONLY_KEY] = True  # per request, and still set while a streamed body runs
+        return view(*args, **kwargs)
+    return wrapper
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from the replica inside @read_only views."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_request_context() and request.environ.get(READ_ONLY_KEY)
+                and not isinstance(clause, (Insert, Update, Delete))):
+            replica = replica_engine()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
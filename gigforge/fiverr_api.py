@@ -1,17 +1,86 @@
-import requests
 import os
+import random
+import threading
+import time
 from typing import Dict, Optional
+from gigforge import metrics
 
-FIVERR_API_URL = "https://www.fiverr.com/api/v1"  # Placeholder - Fiverr's public API is limited
+# `requests` is imported on first use: it is slow to import and most workers never call Fiverr.
+
+FIVERR_API_URL = os.getenv("FIVERR_API_URL", "https://www.fiverr.com/api/v1")  # Placeholder - Fiverr's public API is limited
 FIVERR_API_KEY = os.getenv("FIVERR_API_KEY", "")
 FIVERR_SELLER_ID = os.getenv("FIVERR_SELLER_ID", "")
+FIVERR_TIMEOUT = float(os.getenv("FIVERR_TIMEOUT", "10"))
+FIVERR_MAX_RETRIES = int(os.getenv("FIVERR_MAX_RETRIES", "3"))
+FIVERR_POOL_SIZE = int(os.getenv("FIVERR_POOL_SIZE", "16"))
+MAX_RETRY_AFTER = 30.0  # seconds; a larger Retry-After is not waited out in full
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PUT", "DELETE"}
+
+_session = None
+_session_lock = threading.Lock()
+
+def warm():
+    import requests  # noqa: F401
+
+def get_session():
+    """Process-wide keep-alive session so calls (and sync threads) reuse pooled connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=FIVERR_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def _retry_delay(attempt: int, backoff: float, response=None) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return min(float(retry_after), MAX_RETRY_AFTER)
+    return backoff * (2 ** attempt) * (0.5 + random.random() / 2)
+
+@metrics.timed("http", "fiverr")
+def api_request(method: str, path: str, retries: Optional[int] = None, backoff: float = 0.5, **kwargs):
+    """Call the Fiverr API through the shared session.
+
+    Connection failures and 429/5xx responses are retried with jittered exponential
+    backoff (honouring Retry-After). Read timeouts are only retried for idempotent
+    methods, so a slow POST never creates the same gig twice.
+    """
+    import requests
+    retries = FIVERR_MAX_RETRIES if retries is None else retries
+    kwargs.setdefault("timeout", FIVERR_TIMEOUT)
+    headers = {"Authorization": f"Bearer {FIVERR_API_KEY}", **kwargs.pop("headers", {})}
+    method = method.upper()
+    for attempt in range(retries + 1):
+        response = None
+        try:
+            response = get_session().request(method, f"{FIVERR_API_URL}{path}", headers=headers, **kwargs)
+        except requests.ConnectionError:
+            if attempt == retries:
+                raise
+        except requests.Timeout:
+            if attempt == retries or method not in IDEMPOTENT_METHODS:
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+        time.sleep(_retry_delay(attempt, backoff, response))
+
+def _configured() -> bool:
+    return bool(FIVERR_API_KEY and FIVERR_SELLER_ID)
 
 def create_gig(title: str, description: str, price_in_cents: int, category: str = "writing") -> Optional[Dict]:
     """
     Create a gig on Fiverr (stub - Fiverr's public API is limited).
     In production, you'd use their GraphQL API or manual submission.
     """
-    if not FIVERR_API_KEY or not FIVERR_SELLER_ID:
+    if not _configured():
         return {"error": "Fiverr credentials not configured", "status": "error"}
     
     try:
@@ -26,12 +95,7 @@ def create_gig(title: str, description: str, price_in_cents: int, category: str
         
         # Note: Actual Fiverr API authentication and endpoint varies
         # This is a placeholder structure for later implementation
-        response = requests.post(
-            f"{FIVERR_API_URL}/gig/create",
-            json=payload,
-            headers={"Authorization": f"Bearer {FIVERR_API_KEY}"},
-            timeout=10
-        )
+        response = api_request("POST", "/gig/create", json=payload)
         
         if response.status_code == 201:
             data = response.json()
@@ -45,22 +109,37 @@ def create_gig(title: str, description: str, price_in_cents: int, category: str
     except Exception as e:
         return {"error": str(e), "status": "error"}
 
+def update_gig(fiverr_gig_id: str, title: str, description: str, price_in_cents: int) -> Dict:
+    """Push local edits to an already-synced gig (stub endpoint, same caveats as create_gig)."""
+    if not _configured():
+        return {"error": "Fiverr credentials not configured", "status": "error"}
+    try:
+        response = api_request("PUT", f"/gig/{fiverr_gig_id}", json={
+            "seller_id": FIVERR_SELLER_ID,
+            "title": title,
+            "description": description,
+            "price": price_in_cents / 100,
+        })
+        if response.status_code == 200:
+            data = response.json()
+            return {"status": "success", "gig_id": data.get("gig_id", fiverr_gig_id), "url": data.get("url")}
+        return {"error": response.text, "status": "error"}
+    except Exception as e:
+        return {"error": str(e), "status": "error"}
+
 def sync_gig_to_fiverr(gig_title: str, gig_description: str, price: float) -> Dict:
     """Sync a NightAnvil gig to Fiverr marketplace."""
-    price_cents = int(price * 100)
+    price_cents = int(round(price * 100))
     return create_gig(gig_title, gig_description, price_cents)
 
-def fetch_fiverr_gigs() -> Optional[list]:
-    """Fetch seller's gigs from Fiverr (stub)."""
-    if not FIVERR_API_KEY or not FIVERR_SELLER_ID:
+def fetch_fiverr_gigs(updated_since: Optional[str] = None) -> Optional[list]:
+    """Fetch seller's gigs from Fiverr (stub); `updated_since` (ISO timestamp) limits it to recent changes."""
+    if not _configured():
         return []
     
     try:
-        response = requests.get(
-            f"{FIVERR_API_URL}/seller/{FIVERR_SELLER_ID}/gigs",
-            headers={"Authorization": f"Bearer {FIVERR_API_KEY}"},
-            timeout=10
-        )
+        params = {"updated_since": updated_since} if updated_since else None
+        response = api_request("GET", f"/seller/{FIVERR_SELLER_ID}/gigs", params=params)
         if response.status_code == 200:
             return response.json().get("gigs", [])
     except Exception as e:
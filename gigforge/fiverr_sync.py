@@ -0,0 +1,139 @@
+"""Bulk Fiverr sync: push many gigs concurrently under a shared rate limit, and pull
+remote edits incrementally. HTTP goes through fiverr_api's pooled session and retries;
+database reads and writes stay on the calling thread."""
+import json, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from gigforge import fiverr_api, jobs
+from gigforge.models import db, Gig
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` calls per second with bursts up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+class SyncEngine:
+    def __init__(self, max_workers=None, rate=None, burst=None):
+        self.max_workers = max_workers or int(os.getenv("FIVERR_SYNC_WORKERS", "8"))
+        rate = float(os.getenv("FIVERR_RATE_LIMIT", "5")) if rate is None else rate
+        self.limiter = RateLimiter(rate, burst)
+
+    def _push_one(self, gig):
+        self.limiter.acquire()
+        price_cents = int(round(gig["price"] * 100))
+        if gig["fiverr_gig_id"]:
+            return fiverr_api.update_gig(gig["fiverr_gig_id"], gig["title"], gig["description"], price_cents)
+        return fiverr_api.create_gig(gig["title"], gig["description"], price_cents)
+
+    def push(self, gigs):
+        """Push plain gig dicts concurrently; returns [(gig, result)] in input order."""
+        if not gigs:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(gigs))) as pool:
+            return list(zip(gigs, pool.map(self._push_one, gigs)))
+
+    def fetch(self, updated_since=None):
+        self.limiter.acquire()
+        return fiverr_api.fetch_fiverr_gigs(updated_since)
+
+def gigs_to_push(user_id=None, force=False, gig_ids=None):
+    """Draft gigs that were never synced, plus synced gigs edited since their last sync."""
+    query = Gig.query
+    if user_id is not None:
+        query = query.filter(Gig.user_id == user_id)
+    if gig_ids is not None:
+        query = query.filter(Gig.id.in_(gig_ids))
+    if not force:
+        query = query.filter(db.or_(
+            db.and_(Gig.status == 'draft', Gig.fiverr_gig_id.is_(None)),
+            db.and_(Gig.fiverr_gig_id.isnot(None),
+                    db.or_(Gig.fiverr_synced_at.is_(None), Gig.updated_at > Gig.fiverr_synced_at)),
+        ))
+    return query.order_by(Gig.id).all()
+
+def mark_synced(gig, result, when=None):
+    when = when or datetime.utcnow()
+    gig.fiverr_gig_id = result.get('gig_id') or gig.fiverr_gig_id
+    gig.fiverr_url = result.get('url') or gig.fiverr_url
+    gig.status = 'fiverr_sync'
+    # Writing updated_at explicitly stops the onupdate hook from marking the gig dirty again.
+    gig.fiverr_synced_at = gig.updated_at = when
+
+def sync_draft_gigs(user_id=None, force=False, engine=None, gig_ids=None):
+    """Push every gig that needs it (or just `gig_ids`); returns a summary dict."""
+    engine = engine or SyncEngine()
+    gigs = {g.id: g for g in gigs_to_push(user_id, force, gig_ids)}
+    payload = [{"id": g.id, "title": g.title, "description": g.description or "", "price": g.price,
+                "fiverr_gig_id": g.fiverr_gig_id} for g in gigs.values()]
+    summary = {"synced": 0, "failed": 0, "errors": {}}
+    for data, result in engine.push(payload):
+        if result.get('status') == 'success':
+            mark_synced(gigs[data["id"]], result)
+            summary["synced"] += 1
+        else:
+            summary["failed"] += 1
+            summary["errors"][data["id"]] = result.get('error')
+    db.session.commit()
+    return summary
+
+def _parse_ts(value):
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+def pull_gigs(user_id=None, engine=None):
+    """Apply remote edits to linked local gigs, skipping anything unchanged since its last sync."""
+    engine = engine or SyncEngine()
+    query = Gig.query.filter(Gig.fiverr_gig_id.isnot(None))
+    if user_id is not None:
+        query = query.filter(Gig.user_id == user_id)
+    local = {g.fiverr_gig_id: g for g in query}
+    summary = {"updated": 0, "skipped": 0}
+    if not local:
+        return summary
+    synced = [g.fiverr_synced_at for g in local.values()]
+    since = None if None in synced else min(synced).isoformat()
+    for remote in engine.fetch(since):
+        gig = local.get(str(remote.get('gig_id')))
+        if gig is None:
+            continue
+        remote_updated = _parse_ts(remote.get('updated_at'))
+        if gig.fiverr_synced_at and remote_updated and remote_updated <= gig.fiverr_synced_at:
+            summary["skipped"] += 1
+            continue
+        for field in ('title', 'description', 'price'):
+            if remote.get(field) is not None:
+                setattr(gig, field, remote[field])
+        mark_synced(gig, {'url': remote.get('url')}, when=remote_updated)
+        summary["updated"] += 1
+    db.session.commit()
+    return summary
+
+@jobs.handler('fiverr_sync')
+def fiverr_sync_job(job, params, pool):
+    summary = sync_draft_gigs(job.user_id, force=params.get('force', False), gig_ids=params.get('gig_ids'))
+    if params.get('pull'):
+        summary["pull"] = pull_gigs(job.user_id)
+    job.result = json.dumps(summary)
+    db.session.commit()
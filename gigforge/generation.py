@@ -0,0 +1,306 @@
+"""Gig description generation: a cached, batched, concurrency-limited front for a completion backend.
+
+Responses are cached by prompt (in memory and, with AI_CACHE_DIR, on disk for every worker)
+and expire after AI_CACHE_TTL, so a title is generated once. A request for a prompt that is
+already being generated waits for that call instead of starting another one. Misses queue up
+and each backend round trip takes up to AI_BATCH_SIZE prompts, with at most
+AI_MAX_CONCURRENCY calls in flight per process; callers get futures, so a web request can
+wait briefly and fall back to the template text while the real description is filled in
+by the `gig_descriptions` job.
+
+A backend is any object with a `name`, a `model` and `complete(prompts) -> [str, ...]`.
+"template" (offline, the default without OPENAI_API_KEY) and "openai" are built in; set
+AI_BACKEND to another registered name or to "package.module:factory".
+"""
+import importlib, json, os, threading, time
+from collections import deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from gigforge import jobs, metrics
+from gigforge.models import db, Gig
+from gigforge.render_cache import RenderCache, cache_key
+
+# `requests` is imported on first use by the openai backend.
+
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+AI_BACKEND = os.getenv("AI_BACKEND", "")
+AI_API_URL = os.getenv("AI_API_URL", "https://api.openai.com/v1")
+AI_MODEL = os.getenv("AI_MODEL", "gpt-3.5-turbo-instruct")
+AI_MAX_TOKENS = int(os.getenv("AI_MAX_TOKENS", "300"))
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "30"))
+AI_MAX_RETRIES = int(os.getenv("AI_MAX_RETRIES", "2"))
+AI_BATCH_SIZE = int(os.getenv("AI_BATCH_SIZE", "20"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "4"))
+AI_FORM_TIMEOUT = float(os.getenv("AI_FORM_TIMEOUT", "2"))
+AI_CACHE_ITEMS = int(os.getenv("AI_CACHE_ITEMS", "1024"))
+AI_CACHE_DIR = os.getenv("AI_CACHE_DIR") or None
+AI_CACHE_DISK_MB = int(os.getenv("AI_CACHE_DISK_MB", "64"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BULLETS = 10
+
+PROMPT = ('Write a Fiverr gig description for "{title}". Open with one sentence pitching the service, '
+          'then list {bullets} short bullet points of what the buyer gets. Plain text, no heading.')
+TEMPLATE_POINTS = ("Fast delivery", "High-quality", "Revisions included", "Clear communication",
+                   "Source files included")
+
+Prompt = namedtuple("Prompt", "title bullets text")
+
+class GenerationError(RuntimeError):
+    pass
+
+def make_prompt(title, bullets=3):
+    title = " ".join(str(title).split())
+    if not title:
+        raise GenerationError("title is required")
+    if not 1 <= int(bullets) <= MAX_BULLETS:
+        raise GenerationError(f"bullets must be between 1 and {MAX_BULLETS}")
+    return Prompt(title, int(bullets), PROMPT.format(title=title, bullets=int(bullets)))
+
+def template_description(title, bullets=3):
+    title = " ".join(str(title).split())
+    points = [TEMPLATE_POINTS[i % len(TEMPLATE_POINTS)] for i in range(bullets)]
+    return f"{title}\n\nI will craft an elite {title}. Key points:\n" + "\n".join(f"- {p}" for p in points)
+
+# -- backends ----------------------------------------------------------------------
+
+class TemplateBackend:
+    """Offline descriptions from a fixed template; also the fallback while a real backend is slow."""
+    name, model = "template", "v1"
+
+    def complete(self, prompts):
+        return [template_description(p.title, p.bullets) for p in prompts]
+
+class OpenAIBackend:
+    """OpenAI-compatible /completions endpoint, which takes a list of prompts per request."""
+    name = "openai"
+
+    def __init__(self, api_url=None, api_key=None, model=None, timeout=None):
+        self.api_url = (api_url or AI_API_URL).rstrip("/")
+        self.api_key = OPENAI_API_KEY if api_key is None else api_key
+        self.model = model or AI_MODEL
+        self.timeout = AI_TIMEOUT if timeout is None else timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    session.mount("https://", HTTPAdapter(pool_maxsize=AI_MAX_CONCURRENCY))
+                    session.mount("http://", HTTPAdapter(pool_maxsize=AI_MAX_CONCURRENCY))
+                    self._session = session
+        return self._session
+
+    @metrics.timed("http", "openai")
+    def complete(self, prompts):
+        import requests
+        payload = {"model": self.model, "prompt": [p.text for p in prompts], "max_tokens": AI_MAX_TOKENS}
+        for attempt in range(AI_MAX_RETRIES + 1):
+            try:
+                response = self.session().post(f"{self.api_url}/completions", json=payload, timeout=self.timeout,
+                                               headers={"Authorization": f"Bearer {self.api_key}"})
+            except requests.RequestException as e:
+                if attempt == AI_MAX_RETRIES:
+                    raise GenerationError(f"completion backend unreachable: {e}")
+            else:
+                if response.status_code == 200:
+                    break
+                if response.status_code not in RETRY_STATUSES or attempt == AI_MAX_RETRIES:
+                    raise GenerationError(f"completion backend answered {response.status_code}: {response.text[:200]}")
+            time.sleep(0.5 * 2 ** attempt)
+        choices = sorted(response.json().get("choices", []), key=lambda c: c.get("index", 0))
+        if len(choices) != len(prompts):
+            raise GenerationError(f"expected {len(prompts)} completions, got {len(choices)}")
+        return [c.get("text", "").strip() for c in choices]
+
+BACKENDS = {"template": TemplateBackend, "openai": OpenAIBackend}
+
+def register_backend(name, factory):
+    BACKENDS[name] = factory
+
+def load_backend(name=None):
+    name = name or AI_BACKEND or ("openai" if OPENAI_API_KEY else "template")
+    if ":" in name:
+        module, attr = name.split(":", 1)
+        return getattr(importlib.import_module(module), attr)()
+    if name not in BACKENDS:
+        raise GenerationError(f"unknown AI backend {name!r} (known: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name]()
+
+# -- service -----------------------------------------------------------------------
+
+class GenerationService:
+    def __init__(self, backend, cache=None, batch_size=None, max_concurrency=None):
+        self.backend = backend
+        self.cache = cache or RenderCache(max_items=AI_CACHE_ITEMS, disk_dir=AI_CACHE_DIR,
+                                          disk_max_bytes=AI_CACHE_DISK_MB * 1024 * 1024,
+                                          suffix=".txt", ttl=AI_CACHE_TTL)
+        self.batch_size = batch_size or AI_BATCH_SIZE
+        self.max_concurrency = max_concurrency or AI_MAX_CONCURRENCY
+        self.counters = {"requests": 0, "coalesced": 0, "backend_calls": 0, "generated": 0, "errors": 0}
+        self._reset()
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._inflight = {}  # cache key -> Future of the call generating it
+        self._pending = deque()  # (key, prompt, future) waiting for a backend slot
+        self._executor = None
+
+    def key(self, prompt):
+        return cache_key(self.backend.name, self.backend.model, prompt.text)
+
+    def submit_many(self, titles, bullets=3):
+        """Futures for the descriptions of `titles`, in order; raises GenerationError for a bad title."""
+        prompts = [make_prompt(title, bullets) for title in titles]
+        futures, queued = [], []
+        for prompt in prompts:
+            key = self.key(prompt)
+            entry, _ = self.cache.get(key)
+            with self._lock:
+                self.counters["requests"] += 1
+                if entry is None and key not in self._inflight:
+                    # _drain caches a result before dropping it from _inflight, so a batch that
+                    # finished since the lookup above is in the cache by now.
+                    entry, _ = self.cache.get(key)
+                if entry is not None:
+                    future = Future()
+                    future.set_result(entry.data.decode("utf-8"))
+                elif key in self._inflight:
+                    self.counters["coalesced"] += 1
+                    future = self._inflight[key]
+                else:
+                    future = self._inflight[key] = Future()
+                    queued.append((key, prompt, future))
+            futures.append(future)
+        if queued:
+            self._dispatch(queued)
+        return futures
+
+    def submit(self, title, bullets=3):
+        return self.submit_many([title], bullets)[0]
+
+    def generate_many(self, titles, bullets=3, timeout=None):
+        """Descriptions for `titles`; raises TimeoutError if they are not all ready within `timeout`."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return [f.result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+                for f in self.submit_many(titles, bullets)]
+
+    def generate(self, title, bullets=3, timeout=None):
+        return self.generate_many([title], bullets, timeout)[0]
+
+    def stats(self):
+        with self._lock:
+            s = dict(self.counters, inflight=len(self._inflight), pending=len(self._pending))
+        return {**s, "cache": self.cache.stats()}
+
+    def _dispatch(self, queued):
+        with self._lock:
+            self._pending.extend(queued)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="gigforge-ai")
+            executor = self._executor
+        # One drain per batch; a drain that finds the queue emptied by another one exits,
+        # and one that starts late picks up whatever other callers queued in the meantime.
+        for _ in range(-(-len(queued) // self.batch_size)):
+            executor.submit(self._drain)
+
+    def _drain(self):
+        with self._lock:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            if batch:
+                self.counters["backend_calls"] += 1
+        if not batch:
+            return
+        keys, prompts, futures = zip(*batch)
+        try:
+            texts = self.backend.complete(list(prompts))
+            if len(texts) != len(prompts):
+                raise GenerationError(f"backend returned {len(texts)} results for {len(prompts)} prompts")
+        except Exception as e:
+            if not isinstance(e, GenerationError):
+                e = GenerationError(f"{self.backend.name} backend failed: {e!r}")
+            with self._lock:
+                self.counters["errors"] += len(batch)
+                for key in keys:
+                    self._inflight.pop(key, None)
+            for future in futures:
+                future.set_exception(e)
+            return
+        for key, text, future in zip(keys, texts, futures):
+            self.cache.put(key, text.encode("utf-8"))  # cached before it leaves _inflight
+            with self._lock:
+                self.counters["generated"] += 1
+                self._inflight.pop(key, None)
+            future.set_result(text)
+
+_service = None
+_service_lock = threading.Lock()
+
+def service():
+    """The process-wide service for the configured backend, created on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = GenerationService(load_backend())
+    return _service
+
+def configure(backend=None, **options):
+    """Replace the process-wide service (e.g. with a fake backend in tests); returns it."""
+    global _service
+    with _service_lock:
+        _service = GenerationService(backend or load_backend(), **options)
+    return _service
+
+def _after_fork():
+    # Threads and in-flight futures do not survive fork; the cache does.
+    if _service is not None:
+        _service._reset()
+
+def _collect():
+    if _service is None:
+        return {}
+    return {("render_cache_events_total", (("cache", name), ("event", event))): value
+            for name, counters in (("ai", _service.counters), ("ai_responses", _service.cache.counters))
+            for event, value in counters.items()}
+
+os.register_at_fork(after_in_child=_after_fork)
+metrics.registry.collectors.append(_collect)
+
+def describe(title, bullets=3, timeout=None):
+    """(description, ready) for a form: waits up to AI_FORM_TIMEOUT, then returns the template text.
+
+    The backend call keeps running when the wait gives up, so the result still lands in the cache.
+    """
+    try:
+        return service().generate(title, bullets, AI_FORM_TIMEOUT if timeout is None else timeout), True
+    except (FutureTimeout, GenerationError):
+        return template_description(title, bullets), False
+
+def describe_gigs(user_id, gig_ids=None, bullets=3, overwrite=False):
+    """Generate descriptions for a user's gigs (`gig_ids`, or all of them) in batched backend calls.
+
+    Only gigs without a description, or still showing the template fallback, are changed
+    unless `overwrite` is set.
+    """
+    query = db.select(Gig).where(Gig.user_id == user_id)
+    if gig_ids is not None:
+        query = query.where(Gig.id.in_(gig_ids))
+    gigs = db.session.scalars(query.order_by(Gig.id)).all()
+    targets = [gig for gig in gigs if gig.title.strip() and (
+        overwrite or not gig.description or gig.description == template_description(gig.title, bullets))]
+    for gig, text in zip(targets, service().generate_many([gig.title for gig in targets], bullets)):
+        gig.description = text
+    db.session.commit()
+    return {"updated": len(targets), "skipped": len(gigs) - len(targets)}
+
+@jobs.handler('gig_descriptions')
+def describe_gigs_job(job, params, pool):
+    summary = describe_gigs(job.user_id, params.get('gig_ids'), params.get('bullets', 3),
+                            params.get('overwrite', False))
+    job.result = json.dumps(summary)
+    db.session.commit()
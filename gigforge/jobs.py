@@ -0,0 +1,173 @@
+"""Database-backed job queue. Jobs live in the `job` table; `run_worker` polls it,
+so nothing beyond the app database is needed (SQLite works)."""
+import json, os, re, time, zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from gigforge import utils
+from gigforge.models import db, Job, Invoice, Client
+
+HANDLERS = {}
+# A running job whose worker hasn't finished it within this many seconds is assumed dead
+# (killed, crashed, redeployed) and goes back on the queue.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "3600"))
+
+def handler(kind):
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+def enqueue(kind, user_id, **params):
+    job = Job(kind=kind, user_id=user_id, params=json.dumps(params))
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+def requeue_stale(lease=None):
+    """Put running jobs started more than `lease` seconds ago back on the queue; returns how many."""
+    lease = JOB_LEASE_SECONDS if lease is None else lease
+    cutoff = datetime.utcnow() - timedelta(seconds=lease)
+    count = db.session.execute(
+        db.update(Job).where(Job.status == 'running', Job.started_at < cutoff)
+        .values(status='queued', started_at=None, progress=0)).rowcount
+    db.session.commit()
+    return count
+
+def claim_next():
+    """Atomically move the oldest queued job to running; returns None when the queue is empty.
+
+    Jobs whose lease has expired are requeued first, so a crashed worker's job is picked up again.
+    """
+    requeue_stale()
+    while True:
+        job_id = db.session.scalar(
+            db.select(Job.id).where(Job.status == 'queued').order_by(Job.created_at, Job.id).limit(1))
+        if job_id is None:
+            return None
+        claimed = db.session.execute(
+            db.update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', started_at=datetime.utcnow())).rowcount
+        db.session.commit()
+        if claimed:  # another worker may have won the race; try the next one
+            return db.session.get(Job, job_id)
+
+class RenderPool(ProcessPoolExecutor):
+    """The worker's process pool; `workers` is the size it was started with."""
+
+    def __init__(self, processes=None):
+        self.workers = processes or os.cpu_count() or 1
+        super().__init__(self.workers)
+
+def run_job(job, pool=None):
+    job_id = job.id
+    try:
+        HANDLERS[job.kind](job, json.loads(job.params or '{}'), pool)
+        status, error = 'done', None
+    except Exception as e:
+        db.session.rollback()
+        status, error = 'failed', str(e)
+    job = db.session.get(Job, job_id)
+    job.status, job.error, job.finished_at = status, error, datetime.utcnow()
+    db.session.commit()
+    return job
+
+def run_worker(once=False, poll_interval=1.0, processes=None, idle_hooks=()):
+    """Process jobs until interrupted (or until the queue is empty with once=True).
+
+    Rendering runs in a process pool of `processes` workers; processes=0 renders inline.
+    `idle_hooks` are called between polls so other queues can share the loop; the
+    worker only sleeps once every hook reports it had nothing to do.
+    """
+    pool = RenderPool(processes) if processes != 0 else None
+    try:
+        while True:
+            job = claim_next()
+            if job is not None:
+                run_job(job, pool)
+                continue
+            if any([hook() for hook in idle_hooks]):
+                continue
+            if once:
+                return
+            time.sleep(poll_interval)
+    finally:
+        if pool:
+            pool.shutdown()
+
+def _render_invoice(args):
+    name, items, client_name, project, invoice_date, invoice_number = args
+    return name, utils.generate_invoice_pdf_bytes(items, client_name, project, invoice_date=invoice_date,
+                                                  invoice_number=invoice_number)
+
+def _ordered_map(pool, fn, iterable, window):
+    """Like pool.map but with at most `window` tasks in flight, so memory stays bounded."""
+    if pool is None:
+        yield from map(fn, iterable)
+        return
+    pending = deque()
+    for arg in iterable:
+        pending.append(pool.submit(fn, arg))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+def export_dir():
+    from flask import current_app
+    path = current_app.config.get('EXPORT_DIR') or os.path.join(current_app.instance_path, 'exports')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def _slug(text):
+    return re.sub(r'[^A-Za-z0-9]+', '-', text or '').strip('-')[:40] or 'invoice'
+
+EXPORT_CHUNK = 200
+
+@handler('invoice_export')
+def export_invoices(job, params, pool):
+    """Render every invoice of the job's user in [start, end) and write them into a ZIP on disk."""
+    job_id = job.id
+    where = [Invoice.user_id == job.user_id]
+    if params.get('start'):
+        where.append(Invoice.created_at >= datetime.fromisoformat(params['start']))
+    if params.get('end'):
+        where.append(Invoice.created_at < datetime.fromisoformat(params['end']))
+    ids = db.session.scalars(db.select(Invoice.id).where(*where).order_by(Invoice.id)).all()
+    job.total = len(ids)
+    db.session.commit()
+
+    def tasks():
+        # Load a chunk at a time so progress can be committed between chunks.
+        for i in range(0, len(ids), EXPORT_CHUNK):
+            rows = db.session.execute(
+                db.select(Invoice, Client.name)
+                .outerjoin(Client, Invoice.client_id == Client.id)
+                .where(Invoice.id.in_(ids[i:i + EXPORT_CHUNK]))
+                .options(db.selectinload(Invoice.items))
+                .order_by(Invoice.id)).all()
+            for inv, client_name in rows:
+                items = [(it.description, it.amount) for it in inv.items]
+                # Dated and numbered like the single-invoice download.
+                yield (f"invoice-{inv.id}-{_slug(inv.project)}.pdf", items, client_name or 'Client', inv.project,
+                       inv.created_at.date().isoformat() if inv.created_at else None, inv.id)
+                db.session.expunge(inv)  # cascades to its items; keeps the identity map small
+            db.session.get(Job, job_id).progress = min(i + EXPORT_CHUNK, len(ids))
+            db.session.commit()
+
+    path = os.path.join(export_dir(), f"invoices-{job_id}.zip")
+    tmp = path + '.part'
+    window = (pool.workers if pool else 1) * 4
+    try:
+        with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, pdf in _ordered_map(pool, _render_invoice, tasks(), window):
+                zf.writestr(name, pdf)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)  # the job is marked failed; don't leave a partial archive behind
+        raise
+    job = db.session.get(Job, job_id)
+    job.progress, job.result_path = len(ids), path
+    db.session.commit()
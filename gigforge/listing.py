@@ -0,0 +1,150 @@
+"""Keyset-paginated JSON listings and streaming NDJSON/CSV exports.
+
+Rows are ordered newest first on (created_at, id). The cursor is an opaque token
+for the last row of a page, so fetching page N costs the same as page 1.
+"""
+import base64, csv, io, json
+from datetime import datetime
+
+from flask import Response, jsonify, stream_with_context
+
+from gigforge.models import db, Client, Gig, Invoice
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+EXPORT_BATCH = 1000
+
+class Resource:
+    def __init__(self, model, columns, joins=(), statuses=None):
+        self.model = model
+        self.columns = columns        # {output name: column expression}
+        self.joins = joins            # [(target, onclause)] outer joins
+        self.statuses = statuses      # None when the model has no status filter
+
+RESOURCES = {
+    "invoices": Resource(Invoice, {
+        "id": Invoice.id, "client_id": Invoice.client_id, "client_name": Client.name,
+        "project": Invoice.project, "amount": Invoice.amount, "status": Invoice.status,
+        "created_at": Invoice.created_at, "paid_at": Invoice.paid_at,
+    }, joins=[(Client, Invoice.client_id == Client.id)], statuses=("draft", "sent", "paid")),
+    "gigs": Resource(Gig, {
+        "id": Gig.id, "title": Gig.title, "price": Gig.price, "status": Gig.status,
+        "fiverr_url": Gig.fiverr_url, "created_at": Gig.created_at, "updated_at": Gig.updated_at,
+    }, statuses=("draft", "published", "fiverr_sync")),
+    "clients": Resource(Client, {
+        "id": Client.id, "name": Client.name, "email": Client.email, "phone": Client.phone,
+        "created_at": Client.created_at,
+    }),
+}
+
+class ListingError(ValueError):
+    pass
+
+def encode_cursor(created_at, row_id):
+    raw = f"{created_at.isoformat() if created_at else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        created, row_id = raw.rsplit("|", 1)
+        return (datetime.fromisoformat(created) if created else None), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ListingError("invalid cursor")
+
+def _parse_date(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ListingError(f"{name} must be an ISO date or timestamp")
+
+def build_query(resource, user_id, args):
+    """Filtered, ordered select for `resource` (no cursor/limit applied)."""
+    model = resource.model
+    query = db.select(*(col.label(name) for name, col in resource.columns.items()))
+    query = query.select_from(model)
+    for target, onclause in resource.joins:
+        query = query.outerjoin(target, onclause)
+    query = query.where(model.user_id == user_id)
+    status = args.get("status")
+    if status:
+        if resource.statuses is None or status not in resource.statuses:
+            raise ListingError("unsupported status filter")
+        query = query.where(model.status == status)
+    since, until = _parse_date(args, "since"), _parse_date(args, "until")
+    if since:
+        query = query.where(model.created_at >= since)
+    if until:
+        query = query.where(model.created_at < until)
+    return query.order_by(model.created_at.desc(), model.id.desc())
+
+def _plain(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _jsonable(row):
+    return {k: _plain(v) for k, v in row._mapping.items()}
+
+def page(resource, user_id, args):
+    query = build_query(resource, user_id, args)
+    limit = min(max(args.get("limit", DEFAULT_LIMIT, type=int) or DEFAULT_LIMIT, 1), MAX_LIMIT)
+    if args.get("cursor"):
+        created, row_id = decode_cursor(args["cursor"])
+        model = resource.model
+        query = query.where(db.or_(
+            model.created_at < created,
+            db.and_(model.created_at == created, model.id < row_id)))
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if more else None
+    return {"data": [_jsonable(r) for r in rows], "next_cursor": next_cursor}
+
+def _stream_rows(query):
+    # yield_per turns on server-side cursors where the driver has them (psycopg2 named cursors).
+    result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH))
+    try:
+        for partition in result.partitions():
+            yield partition
+    finally:
+        result.close()
+
+def export(resource, user_id, args, fmt):
+    """Streamed response with every matching row; memory use is bounded by EXPORT_BATCH."""
+    query = build_query(resource, user_id, args)
+    names = list(resource.columns)
+    if fmt == "ndjson":
+        def generate():
+            for rows in _stream_rows(query):
+                yield "".join(json.dumps(_jsonable(r)) + "\n" for r in rows)
+        mimetype = "application/x-ndjson"
+    else:
+        def generate():
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            writer.writerow(names)
+            for rows in _stream_rows(query):
+                writer.writerows([_plain(v) for v in r] for r in rows)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+            if buf.tell():
+                yield buf.getvalue()
+        mimetype = "text/csv"
+    resp = Response(stream_with_context(generate()), mimetype=mimetype)
+    resp.headers["Content-Disposition"] = f"attachment; filename={resource.model.__tablename__}s.{fmt}"
+    return resp
+
+def respond(name, user_id, args):
+    resource = RESOURCES[name]
+    fmt = args.get("format", "json")
+    try:
+        if fmt in ("ndjson", "csv"):
+            return export(resource, user_id, args, fmt)
+        if fmt != "json":
+            raise ListingError("format must be json, ndjson or csv")
+        return jsonify(page(resource, user_id, args))
+    except ListingError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
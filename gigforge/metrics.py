@@ -0,0 +1,260 @@
+"""Low-overhead request instrumentation with a Prometheus text endpoint.
+
+Each process keeps counters and histograms in memory. When METRICS_DIR is set,
+every process also dumps a snapshot there (at most every METRICS_FLUSH_SECONDS),
+and /metrics merges the snapshots so the numbers cover all gunicorn workers.
+Clear the directory when the server starts.
+"""
+import functools, glob, ipaddress, json, logging, os, tempfile, threading, time
+from collections import Counter
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger("nightanvil.metrics")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "0.5"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+HELP = {
+    "http_request_duration_seconds": ("histogram", "Request latency by route"),
+    "db_queries_per_request": ("histogram", "SQL statements executed per request"),
+    "db_query_duration_seconds": ("histogram", "SQL statement latency"),
+    "phase_duration_seconds": ("histogram", "Time spent in instrumented rendering and outbound calls"),
+    "n_plus_one_requests_total": ("counter", "Requests that repeated one SQL statement N_PLUS_ONE_THRESHOLD+ times"),
+    "slow_requests_total": ("counter", "Requests slower than SLOW_REQUEST_SECONDS"),
+    "render_cache_events_total": ("counter", "Render cache hits, misses and evictions"),
+}
+
+def _key(name, labels):
+    return name + json.dumps(labels, sort_keys=True, separators=(",", ":")) if labels else name + "{}"
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}    # key -> value
+        self.histograms = {}  # key -> [bucket counts..., sum, count]
+        self.buckets = {}     # histogram name -> bucket bounds
+        self.collectors = []  # callables returning {(name, frozen labels): value} counters
+
+    def inc(self, name, labels=None, value=1):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=None, buckets=LATENCY_BUCKETS):
+        key = _key(name, labels)
+        with self._lock:
+            self.buckets.setdefault(name, buckets)
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = [0] * (len(buckets) + 2)
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h[i] += 1
+                    break
+            h[-2] += value
+            h[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            snap = {"counters": dict(self.counters),
+                    "histograms": {k: list(v) for k, v in self.histograms.items()},
+                    "buckets": {k: list(v) for k, v in self.buckets.items()}}
+        for collect in self.collectors:
+            for (name, labels), value in collect().items():
+                snap["counters"][_key(name, dict(labels))] = value
+        return snap
+
+registry = Registry()
+
+def register_cache(name, cache):
+    """Export a cache's `counters` (hits, misses, ...) as render_cache_events_total{cache=name}."""
+    registry.collectors.append(lambda: {
+        ("render_cache_events_total", (("cache", name), ("event", event))): value
+        for event, value in cache.counters.items()})
+_last_flush = [0.0]
+
+def _snapshot_path(pid=None):
+    return os.path.join(METRICS_DIR, f"metrics-{pid or os.getpid()}.json")
+
+def flush(force=False):
+    """Write this process's snapshot to METRICS_DIR (rate limited unless force=True)."""
+    if not METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _last_flush[0] < METRICS_FLUSH_SECONDS:
+        return
+    _last_flush[0] = now
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=METRICS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp, _snapshot_path())
+
+def merged_snapshot():
+    """This process's live numbers plus the latest snapshot of every other worker."""
+    snaps = [registry.snapshot()]
+    if METRICS_DIR:
+        own = _snapshot_path()
+        for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    snaps.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+    merged = {"counters": Counter(), "histograms": {}, "buckets": {}}
+    for snap in snaps:
+        merged["counters"].update(snap["counters"])
+        merged["buckets"].update(snap["buckets"])
+        for key, values in snap["histograms"].items():
+            acc = merged["histograms"].setdefault(key, [0] * len(values))
+            for i, v in enumerate(values):
+                acc[i] += v
+    return merged
+
+def _split(key):
+    name, _, labels = key.partition("{")
+    return name, json.loads("{" + labels)
+
+def _escape(value):
+    """A label value as the exposition format wants it: backslash, quote and newline escaped."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+def render_prometheus(snap):
+    lines, seen = [], set()
+    def header(name, default_type):
+        if name not in seen:
+            seen.add(name)
+            kind, text = HELP.get(name, (default_type, name))
+            lines.append(f"# HELP {name} {text}")
+            lines.append(f"# TYPE {name} {kind}")
+    for key in sorted(snap["counters"]):
+        name, labels = _split(key)
+        header(name, "counter")
+        lines.append(f"{name}{_fmt_labels(labels)} {snap['counters'][key]}")
+    for key in sorted(snap["histograms"]):
+        name, labels = _split(key)
+        header(name, "histogram")
+        values, cumulative = snap["histograms"][key], 0
+        for bound, n in zip(snap["buckets"][name], values[:-2]):
+            cumulative += n
+            lines.append(f"{name}_bucket{_fmt_labels(dict(labels, le=bound))} {cumulative}")
+        lines.append(f"{name}_bucket{_fmt_labels(dict(labels, le='+Inf'))} {values[-1]}")
+        lines.append(f"{name}_sum{_fmt_labels(labels)} {values[-2]}")
+        lines.append(f"{name}_count{_fmt_labels(labels)} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+# -- per-request accounting ---------------------------------------------------------
+
+class RequestStats:
+    __slots__ = ("start", "queries", "statements", "phases")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.statements = Counter()
+        self.phases = Counter()
+
+def _current():
+    return g.get("_metrics") if has_request_context() else None
+
+def add_phase(phase, seconds):
+    stats = _current()
+    if stats is not None:
+        stats.phases[phase] += seconds
+
+def timed(phase, name=None):
+    """Decorator: record the call in phase_duration_seconds and the current request's phase breakdown."""
+    def wrap(fn):
+        label = name or fn.__name__
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - t0
+                registry.observe("phase_duration_seconds", elapsed, {"phase": phase, "name": label})
+                add_phase(f"{phase}.{label}", elapsed)
+        return inner
+    return wrap
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("_metrics_t0")
+    if not stack:
+        return
+    elapsed = time.perf_counter() - stack.pop()
+    registry.observe("db_query_duration_seconds", elapsed)
+    stats = _current()
+    if stats is not None:
+        stats.queries += 1
+        stats.statements[statement] += 1
+        stats.phases["db"] += elapsed
+
+def _route():
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+def _before_request():
+    g._metrics = RequestStats()
+
+def _after_request(response):
+    stats = g.pop("_metrics", None)
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats.start
+    route = _route()
+    registry.observe("http_request_duration_seconds", elapsed,
+                     {"route": route, "method": request.method, "status": response.status_code})
+    registry.observe("db_queries_per_request", stats.queries, {"route": route}, buckets=COUNT_BUCKETS)
+    repeated = stats.statements.most_common(1)
+    if repeated and repeated[0][1] >= N_PLUS_ONE_THRESHOLD:
+        registry.inc("n_plus_one_requests_total", {"route": route})
+        log.warning("possible N+1 on %s %s: %d x %s", request.method, route, repeated[0][1], repeated[0][0][:200])
+    if elapsed >= SLOW_REQUEST_SECONDS:
+        registry.inc("slow_requests_total", {"route": route})
+        phases = dict(stats.phases)
+        phases["other"] = max(0.0, elapsed - sum(v for k, v in phases.items()))
+        breakdown = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in sorted(phases.items(), key=lambda kv: -kv[1]))
+        log.warning("slow request %s %s %.1fms queries=%d %s",
+                    request.method, request.path, elapsed * 1000, stats.queries, breakdown)
+    flush()
+    return response
+
+def _local_request():
+    try:
+        addr = ipaddress.ip_address(request.remote_addr or "")
+    except ValueError:
+        return False
+    return addr.is_loopback or addr.is_private
+
+def metrics_view():
+    if METRICS_TOKEN:
+        if request.headers.get("Authorization") != f"Bearer {METRICS_TOKEN}":
+            return Response("unauthorized\n", status=401, mimetype="text/plain")
+    elif not _local_request():  # without a token, only scrapers on the local network
+        return Response("forbidden\n", status=403, mimetype="text/plain")
+    return Response(render_prometheus(merged_snapshot()), mimetype="text/plain; version=0.0.4")
+
+def init_app(app):
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
@@ -1,13 +1,22 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from gigforge.engines import RoutingSession
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
+import hashlib
+import json
+import unicodedata
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+def normalize_username(username):
+    """Login key: NFKC-normalized, trimmed and case-folded, so `Alice ` and `alice` are one account."""
+    return unicodedata.normalize("NFKC", username or "").strip().casefold()
 
 class User(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
+    username_key = db.Column(db.String(120), unique=True, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(255), nullable=False)
     business_name = db.Column(db.String(255))
@@ -23,6 +32,30 @@ class User(db.Model, UserMixin):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+@db.event.listens_for(User.username, 'set')
+def _set_username_key(target, value, oldvalue, initiator):
+    target.username_key = normalize_username(value)
+
+def hash_token(token):
+    """API tokens are random, so a plain SHA-256 is enough (and cheap on every request)."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class ApiToken(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(120))
+    token_hash = db.Column(db.String(64), unique=True, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime)
+    revoked_at = db.Column(db.DateTime)
+
+    user = db.relationship('User', backref=db.backref('api_tokens', lazy=True, cascade='all, delete-orphan'))
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "created_at": self.created_at.isoformat() if self.created_at else None,
+                "last_used_at": self.last_used_at.isoformat() if self.last_used_at else None,
+                "revoked": self.revoked_at is not None}
+
 class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -33,22 +66,32 @@ class Client(db.Model):
     
     invoices = db.relationship('Invoice', backref='client', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (db.Index('ix_client_user_created', 'user_id', 'created_at'),)
+
 class Invoice(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.mapped_column(db.Integer, db.ForeignKey('user.id'), nullable=False, active_history=True)
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
     project = db.Column(db.String(255), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(50), default='draft')  # draft, sent, paid
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    paid_at = db.Column(db.DateTime)
-    stripe_intent_id = db.Column(db.String(255))
+    # active_history keeps the old value around so rollups can subtract it on change.
+    amount = db.mapped_column(db.Float, nullable=False, active_history=True)
+    amount_cents = db.Column(db.BigInteger, nullable=False)  # set from `amount`; what analytics sums
+    status = db.mapped_column(db.String(50), default='draft', active_history=True)  # draft, sent, paid
+    created_at = db.mapped_column(db.DateTime, default=datetime.utcnow, active_history=True)
+    paid_at = db.mapped_column(db.DateTime, active_history=True)
+    stripe_intent_id = db.Column(db.String(255), index=True)
     
     items = db.relationship('InvoiceItem', backref='invoice', lazy=True, cascade='all, delete-orphan')
 
+    __table_args__ = (
+        db.Index('ix_invoice_user_created', 'user_id', 'created_at'),
+        db.Index('ix_invoice_user_status_created', 'user_id', 'status', 'created_at'),
+        db.Index('ix_invoice_client', 'client_id'),
+    )
+
 class InvoiceItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False)
+    invoice_id = db.Column(db.Integer, db.ForeignKey('invoice.id'), nullable=False, index=True)
     description = db.Column(db.String(255), nullable=False)
     amount = db.Column(db.Float, nullable=False)
 
@@ -58,7 +101,225 @@ class Gig(db.Model):
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
+    # Pricing inputs for the quote engine (gigforge.pricing); price is derived from them on repricing.
+    hours = db.Column(db.Float)
+    hourly_rate = db.Column(db.Float)
+    fixed_price = db.Column(db.Float)
     fiverr_gig_id = db.Column(db.String(255))  # Fiverr gig ID if synced
     fiverr_url = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    fiverr_synced_at = db.Column(db.DateTime)  # set together with updated_at on each successful sync
     status = db.Column(db.String(50), default='draft')  # draft, published, fiverr_sync
+
+    __table_args__ = (
+        db.Index('ix_gig_user_created', 'user_id', 'created_at'),
+        db.Index('ix_gig_user_status_created', 'user_id', 'status', 'created_at'),
+    )
+
+class Job(db.Model):
+    """Background job row; the worker (`flask jobs-worker`) claims queued jobs and fills in the result."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer)
+    result_path = db.Column(db.String(500))
+    result = db.Column(db.Text)  # JSON summary written by the handler
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_job_status_created', 'status', 'created_at'),)
+
+    def to_dict(self):
+        return {
+            "id": self.id, "kind": self.kind, "status": self.status,
+            "progress": self.progress, "total": self.total, "error": self.error,
+            "result": json.loads(self.result) if self.result else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+class WebhookEvent(db.Model):
+    """Inbox of received Stripe events, deduplicated on the Stripe event id and applied by the worker."""
+    id = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(255), unique=True, nullable=False)
+    type = db.Column(db.String(100), nullable=False)
+    intent_id = db.Column(db.String(255))
+    payload = db.Column(db.Text, nullable=False)
+    event_created = db.Column(db.DateTime)  # Stripe's `created`, used to order deliveries
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, applied, ignored, unmatched
+    processed_at = db.Column(db.DateTime)
+
+    __table_args__ = (db.Index('ix_webhook_event_status_created', 'status', 'event_created'),)
+
+def to_cents(amount):
+    """Convert a dollar amount to integer cents (rollups never store floats)."""
+    return int(round((amount or 0) * 100))
+
+class UserStats(db.Model):
+    """Per-user counters kept in step with writes so the dashboard never has to scan."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    invoice_count = db.Column(db.Integer, nullable=False, default=0)
+    client_count = db.Column(db.Integer, nullable=False, default=0)
+    gig_count = db.Column(db.Integer, nullable=False, default=0)
+    paid_revenue_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+    @property
+    def paid_revenue(self):
+        return self.paid_revenue_cents / 100
+
+class InvoiceRollup(db.Model):
+    """Invoice count/amount per (user, dimension, bucket), e.g. ('status', 'paid') or ('month', '2024-05')."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    dimension = db.Column(db.String(20), nullable=False)
+    bucket = db.Column(db.String(50), nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount_cents = db.Column(db.BigInteger, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('user_id', 'dimension', 'bucket', name='uq_invoice_rollup_bucket'),)
+
+@db.event.listens_for(Invoice.amount, 'set')
+def _set_amount_cents(target, value, oldvalue, initiator):
+    target.amount_cents = to_cents(value)
+
+def _invoice_buckets(user_id, status, amount, created_at, paid_at=None):
+    """Rollup contributions of one invoice state: {(user_id, dimension, bucket): amount_cents}.
+
+    'day' is the amount invoiced per creation date and 'paid_day' the revenue per payment
+    date (creation date if paid_at is unset); gigforge.analytics charts are built from them.
+    """
+    cents = to_cents(amount)
+    created = created_at or datetime.utcnow()
+    buckets = {
+        (user_id, 'status', status or 'draft'): cents,
+        (user_id, 'month', created.strftime('%Y-%m')): cents,
+        (user_id, 'day', created.strftime('%Y-%m-%d')): cents,
+    }
+    if status == 'paid':
+        buckets[user_id, 'paid_day', (paid_at or created).strftime('%Y-%m-%d')] = cents
+    return buckets
+
+def _old_value(state, key):
+    hist = state.attrs[key].history
+    if hist.deleted:
+        return hist.deleted[0]
+    if hist.unchanged:
+        return hist.unchanged[0]
+    return getattr(state.obj(), key)
+
+_INVOICE_ROLLUP_FIELDS = ('user_id', 'status', 'amount', 'created_at', 'paid_at')
+
+class RollupDelta:
+    """Accumulates rollup changes so one flush issues one statement per touched row."""
+
+    def __init__(self):
+        self.stats = {}     # user_id -> {column: delta}
+        self.buckets = {}   # (user_id, dimension, bucket) -> [count, cents]
+
+    def stat(self, user_id, column, delta):
+        cols = self.stats.setdefault(user_id, {})
+        cols[column] = cols.get(column, 0) + delta
+
+    def invoice(self, user_id, status, amount, created_at, paid_at=None, sign=1):
+        self.stat(user_id, 'invoice_count', sign)
+        if status == 'paid':
+            self.stat(user_id, 'paid_revenue_cents', sign * to_cents(amount))
+        for key, cents in _invoice_buckets(user_id, status, amount, created_at, paid_at).items():
+            acc = self.buckets.setdefault(key, [0, 0])
+            acc[0] += sign
+            acc[1] += sign * cents
+
+    def __bool__(self):
+        return bool(self.stats or self.buckets)
+
+    def apply(self, connection):
+        """Write the accumulated deltas as in-place increments on `connection`."""
+        stats = UserStats.__table__
+        for user_id, cols in self.stats.items():
+            cols = {k: v for k, v in cols.items() if v}
+            if not cols:
+                continue
+            res = connection.execute(
+                stats.update().where(stats.c.user_id == user_id)
+                .values({k: stats.c[k] + v for k, v in cols.items()}))
+            if res.rowcount == 0:
+                row = dict.fromkeys(('invoice_count', 'client_count', 'gig_count', 'paid_revenue_cents'), 0)
+                row.update(cols, user_id=user_id)
+                connection.execute(stats.insert().values(**row))
+        rollup = InvoiceRollup.__table__
+        for (user_id, dimension, bucket), (count, cents) in self.buckets.items():
+            if not count and not cents:
+                continue
+            res = connection.execute(
+                rollup.update()
+                .where(rollup.c.user_id == user_id, rollup.c.dimension == dimension, rollup.c.bucket == bucket)
+                .values(count=rollup.c.count + count, amount_cents=rollup.c.amount_cents + cents))
+            if res.rowcount == 0:
+                connection.execute(rollup.insert().values(
+                    user_id=user_id, dimension=dimension, bucket=bucket, count=count, amount_cents=cents))
+
+def collect_rollup_delta(session):
+    """Build the rollup delta for everything pending in `session` (call before the flush state is reset)."""
+    delta = RollupDelta()
+    for obj in session.new:
+        if isinstance(obj, Invoice):
+            delta.invoice(obj.user_id, obj.status, obj.amount, obj.created_at, obj.paid_at)
+        elif isinstance(obj, Client):
+            delta.stat(obj.user_id, 'client_count', 1)
+        elif isinstance(obj, Gig):
+            delta.stat(obj.user_id, 'gig_count', 1)
+    for obj in session.deleted:
+        state = db.inspect(obj)
+        if isinstance(obj, Invoice):
+            delta.invoice(*(_old_value(state, k) for k in _INVOICE_ROLLUP_FIELDS), sign=-1)
+        elif isinstance(obj, Client):
+            delta.stat(_old_value(state, 'user_id'), 'client_count', -1)
+        elif isinstance(obj, Gig):
+            delta.stat(_old_value(state, 'user_id'), 'gig_count', -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Invoice):
+            continue
+        state = db.inspect(obj)
+        if not any(state.attrs[k].history.has_changes() for k in _INVOICE_ROLLUP_FIELDS):
+            continue
+        delta.invoice(*(_old_value(state, k) for k in _INVOICE_ROLLUP_FIELDS), sign=-1)
+        delta.invoice(obj.user_id, obj.status, obj.amount, obj.created_at, obj.paid_at)
+    return delta
+
+@db.event.listens_for(db.orm.Session, 'before_flush')
+def _load_deleted_invoices(session, flush_context, instances):
+    # Deleted rows can't be lazy-loaded once the flush has run; pull their rollup fields in now.
+    for obj in session.deleted:
+        if isinstance(obj, Invoice):
+            for key in _INVOICE_ROLLUP_FIELDS:
+                getattr(obj, key)
+
+@db.event.listens_for(db.orm.Session, 'after_flush')
+def _maintain_rollups(session, flush_context):
+    # Runs inside the flush transaction, so rollups commit or roll back with the rows they describe.
+    delta = collect_rollup_delta(session)
+    if delta:
+        delta.apply(session.connection())
+
+def rebuild_rollups(user_id=None):
+    """Recompute UserStats/InvoiceRollup from the base tables (backfill or repair)."""
+    users = [user_id] if user_id is not None else [uid for (uid,) in db.session.query(User.id)]
+    for uid in users:
+        UserStats.query.filter_by(user_id=uid).delete()
+        InvoiceRollup.query.filter_by(user_id=uid).delete()
+        delta = RollupDelta()
+        delta.stat(uid, 'client_count', Client.query.filter_by(user_id=uid).count())
+        delta.stat(uid, 'gig_count', Gig.query.filter_by(user_id=uid).count())
+        rows = (db.session.query(Invoice.status, Invoice.amount, Invoice.created_at, Invoice.paid_at)
+                .filter_by(user_id=uid))
+        for status, amount, created_at, paid_at in rows.yield_per(1000):
+            delta.invoice(uid, status, amount, created_at, paid_at)
+        delta.apply(db.session.connection())
+    db.session.commit()
@@ -1,48 +1,164 @@
 from flask import Response
+import functools
 import json
-import stripe
+import logging
 import os
-from datetime import datetime
+from datetime import datetime, timezone
+from sqlalchemy.exc import IntegrityError
+from gigforge import metrics
+from gigforge.models import db, Invoice, WebhookEvent
 
-stripe.api_key = os.getenv("STRIPE_SECRET_KEY", "sk_test_dummy")
-WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "whsec_test_dummy")
+STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "sk_test_dummy")
+WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")  # webhooks are refused (503) until it is set
+INBOX_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "500"))
 
-def create_payment_intent(amount_cents, client_name, project):
+log = logging.getLogger("nightanvil.payments")
+
+@functools.lru_cache(maxsize=None)
+def get_stripe():
+    """The configured stripe module; imported on first use since the SDK is slow to import."""
+    import stripe
+    stripe.api_key = STRIPE_SECRET_KEY
+    return stripe
+
+def warm():
+    get_stripe()
+
+@metrics.timed("http", "stripe.create_payment_intent")
+def create_payment_intent(amount_cents, client_name, project, invoice_id=None):
     """Create a Stripe payment intent for an invoice."""
     try:
-        intent = stripe.PaymentIntent.create(
+        metadata = {
+            "client_name": client_name,
+            "project": project,
+            "timestamp": datetime.now().isoformat()
+        }
+        if invoice_id is not None:
+            metadata["invoice_id"] = str(invoice_id)
+        intent = get_stripe().PaymentIntent.create(
             amount=amount_cents,
             currency="usd",
-            metadata={
-                "client_name": client_name,
-                "project": project,
-                "timestamp": datetime.now().isoformat()
-            }
+            metadata=metadata
         )
         return {"status": "success", "client_secret": intent.client_secret, "intent_id": intent.id}
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+def _insert_ignore(values):
+    """INSERT the inbox row unless the event id is already there; returns True if it was new."""
+    table = WebhookEvent.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        from sqlalchemy.dialects import postgresql, sqlite
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(table).values(**values).on_conflict_do_nothing(index_elements=["event_id"])
+        return db.session.execute(stmt).rowcount == 1
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**values))
+        return True
+    except IntegrityError:
+        return False
+
+def ingest_event(evt, raw=None):
+    """Record a Stripe event in the inbox (no invoice work happens here). Returns True if new."""
+    obj = (evt.get("data") or {}).get("object") or {}
+    created = evt.get("created")
+    inserted = _insert_ignore({
+        "event_id": evt["id"],
+        "type": evt.get("type") or "",
+        "intent_id": obj.get("id") if str(evt.get("type", "")).startswith("payment_intent.") else None,
+        "payload": raw if raw is not None else json.dumps(evt),
+        "event_created": datetime.fromtimestamp(created, timezone.utc).replace(tzinfo=None) if created else None,
+        "received_at": datetime.utcnow(),
+        "status": "pending",
+    })
+    db.session.commit()
+    return inserted
+
 def handle_webhook(request):
-    """Handle Stripe webhook events (charge.succeeded, charge.failed, etc)."""
+    """Handle Stripe webhook events (charge.succeeded, charge.failed, etc).
+
+    Only events signed with STRIPE_WEBHOOK_SECRET are accepted. They are written to the
+    inbox here so Stripe gets its 2xx quickly; `process_inbox` (run by the jobs worker)
+    applies them to invoices.
+    """
+    if not WEBHOOK_SECRET:
+        log.error("webhook refused: STRIPE_WEBHOOK_SECRET is not set")
+        return Response(status=503)
+    payload = request.get_data(as_text=True)
+    stripe = get_stripe()
+    # Newer SDKs export it at the top level; older ones only under stripe.error.
+    signature_error = getattr(stripe, "SignatureVerificationError", None) or stripe.error.SignatureVerificationError
+    try:
+        stripe.Webhook.construct_event(payload, request.headers.get("Stripe-Signature"), WEBHOOK_SECRET)
+    except (ValueError, signature_error) as e:
+        log.warning("webhook rejected: %s", e)
+        return Response(status=400)
     try:
-        payload = request.get_data(as_text=True)
-        sig_header = request.headers.get("Stripe-Signature")
-        
-        # Verify webhook signature (disabled for test)
-        # event = stripe.Webhook.construct_event(payload, sig_header, WEBHOOK_SECRET)
-        
         evt = json.loads(payload)
-        evt_type = evt.get("type")
-        
-        if evt_type == "payment_intent.succeeded":
-            intent_id = evt["data"]["object"]["id"]
-            print(f"Payment succeeded: {intent_id}")
-        elif evt_type == "payment_intent.payment_failed":
-            intent_id = evt["data"]["object"]["id"]
-            print(f"Payment failed: {intent_id}")
-        
-        return Response(json.dumps({"received": True}), status=200, content_type="application/json")
-    except Exception as e:
-        print(f"Webhook error: {e}")
+        if not evt.get("id"):
+            return Response(status=400)
+        new = ingest_event(evt, raw=payload)
+        return Response(json.dumps({"received": True, "duplicate": not new}), status=200, content_type="application/json")
+    except Exception:
+        db.session.rollback()
+        log.exception("webhook error")
         return Response(status=400)
+
+def _apply(evt, invoice):
+    """Apply one event to its invoice; returns the inbox status. Safe to call in any order or twice."""
+    if evt.type == "payment_intent.succeeded":
+        if invoice.status != "paid":
+            invoice.status = "paid"
+            invoice.paid_at = evt.event_created or datetime.utcnow()
+        return "applied"
+    if evt.type == "payment_intent.payment_failed":
+        # A failure that arrives after (or is older than) a success must not un-pay the invoice.
+        if invoice.status != "paid":
+            invoice.status = "sent"
+        return "applied"
+    return "ignored"
+
+def process_inbox(batch_size=None):
+    """Apply one batch of pending inbox events to invoices; returns how many events were handled."""
+    batch_size = batch_size or INBOX_BATCH_SIZE
+    events = (WebhookEvent.query.filter_by(status="pending")
+              .order_by(WebhookEvent.event_created, WebhookEvent.id)
+              .limit(batch_size).all())
+    if not events:
+        return 0
+    intent_ids = {e.intent_id for e in events if e.intent_id}
+    invoices = {}
+    if intent_ids:
+        invoices = {inv.stripe_intent_id: inv
+                    for inv in Invoice.query.filter(Invoice.stripe_intent_id.in_(intent_ids))}
+    now = datetime.utcnow()
+    for evt in events:
+        invoice = invoices.get(evt.intent_id)
+        if not evt.intent_id:
+            evt.status = "ignored"
+        elif invoice is None:
+            evt.status = "unmatched"  # kept for `flask webhooks-replay` once the invoice is linked
+        else:
+            evt.status = _apply(evt, invoice)
+        evt.processed_at = now
+    db.session.commit()
+    return len(events)
+
+def drain_inbox(batch_size=None):
+    total = 0
+    while True:
+        n = process_inbox(batch_size)
+        if not n:
+            return total
+        total += n
+
+def requeue_events(statuses=("unmatched",), since=None):
+    """Mark stored events pending again so the worker re-applies them; returns the count."""
+    query = WebhookEvent.query.filter(WebhookEvent.status.in_(statuses))
+    if since is not None:
+        query = query.filter(WebhookEvent.received_at >= since)
+    n = query.update({"status": "pending", "processed_at": None}, synchronize_session=False)
+    db.session.commit()
+    return n
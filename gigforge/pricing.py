@@ -0,0 +1,225 @@
+"""Quote engine: prices many gigs/lines at once in exact integer cents.
+
+Money and rates are converted to integer cents, hours to hundredths of an hour and
+percentages to basis points, so every step is integer arithmetic with round-half-up
+at the two points where a fraction of a cent can appear (hourly base, margin/discount).
+Batches are priced with NumPy; `calc_price_cents` is the same formula for one line.
+"""
+from dataclasses import dataclass
+from decimal import Decimal, ROUND_HALF_UP
+import math
+
+BP = 10000  # basis points in 100%
+# Upper bound of each input (hours, dollars, quantity, or a ratio for margin and tier
+# factors), so `quote` cannot overflow int64: the hourly base is at most 1e6 centi-hours x
+# 1e5 bp x 1e7 cents (1e18), the unit price 11x a base of 1e12 cents, the subtotal that
+# times 1e5.
+MAX_VALUES = {"hours": 10_000, "rate": 100_000, "fixed": 1_000_000_000, "minimum": 1_000_000_000,
+              "quantity": 100_000, "margin": 10, "factor": 10}
+
+class QuoteError(ValueError):
+    pass
+
+def _to_units(value, scale, what, limit=None):
+    """Exact integer units (cents, centi-hours, basis points) of a number or numeric string."""
+    try:
+        d = Decimal(str(value))
+    except Exception:
+        raise QuoteError(f"{what} must be a number")
+    if not d.is_finite() or d < 0:
+        raise QuoteError(f"{what} must be a non-negative number")
+    if limit is not None and d > MAX_VALUES[limit]:
+        raise QuoteError(f"{what} must be at most {MAX_VALUES[limit]:,}")
+    return int((d * scale).to_integral_value(ROUND_HALF_UP))
+
+def _div_half_up(num, den):
+    return (num + den // 2) // den
+
+@dataclass(frozen=True)
+class PricingRules:
+    """margin_bp: markup on the base price. tiers: graduated ((up_to_centihours|None, factor_bp), ...)
+    applied to the hourly rate. volume: ((min_quantity, discount_bp), ...), the highest reached
+    threshold discounts the whole line. minimum_cents: floor for the unit price."""
+    margin_bp: int = 2000
+    tiers: tuple = ()
+    volume: tuple = ()
+    minimum_cents: int = 0
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rules from JSON: {"margin": 0.2, "minimum": 25,
+        "tiers": [{"up_to": 10, "factor": 1}, {"up_to": 40, "factor": 0.9}, {"factor": 0.8}],
+        "volume": [{"min_quantity": 5, "discount": 0.05}]}"""
+        data = data or {}
+        if not isinstance(data, dict):
+            raise QuoteError("rules must be an object")
+        tiers, last = [], 0
+        for n, tier in enumerate(data.get("tiers") or (), 1):
+            up_to = tier.get("up_to")
+            up_to = None if up_to is None else _to_units(up_to, 100, f"tier {n} up_to")
+            if up_to is not None and (up_to <= last or (tiers and tiers[-1][0] is None)):
+                raise QuoteError("tiers must have increasing up_to values, with only the last one open-ended")
+            tiers.append((up_to, _to_units(tier.get("factor", 1), BP, f"tier {n} factor", "factor")))
+            last = up_to or last
+        volume = sorted((int(_to_units(v.get("min_quantity", 0), 1, f"volume {n} min_quantity")),
+                         _to_units(v.get("discount", 0), BP, f"volume {n} discount"))
+                        for n, v in enumerate(data.get("volume") or (), 1))
+        if any(d > BP for _, d in volume):
+            raise QuoteError("volume discounts cannot exceed 100%")
+        return cls(margin_bp=_to_units(data.get("margin", 0.2), BP, "margin", "margin"), tiers=tuple(tiers),
+                   volume=tuple(volume), minimum_cents=_to_units(data.get("minimum", 0), 100, "minimum", "minimum"))
+
+    def tier_bounds(self):
+        """[(start, end, factor_bp)] in centi-hours; end is None for the open-ended tier."""
+        if not self.tiers:
+            return [(0, None, BP)]
+        bounds, start = [], 0
+        for up_to, factor in self.tiers:
+            bounds.append((start, up_to, factor))
+            start = up_to
+        if bounds[-1][1] is not None:
+            bounds.append((start, None, BP))  # beyond the last tier: the plain rate
+        return bounds
+
+def calc_price_cents(hours=0, rate=0, fixed=None, margin=0.2, quantity=1, rules=None):
+    """Price of one line in cents, by the same rules as `quote`."""
+    rules = rules or PricingRules(margin_bp=_to_units(margin, BP, "margin", "margin"))
+    quantity = _to_units(quantity, 1, "quantity", "quantity")
+    if fixed is not None:
+        base = _to_units(fixed, 100, "fixed", "fixed")
+    else:
+        h, r = _to_units(hours or 0, 100, "hours", "hours"), _to_units(rate or 0, 100, "rate", "rate")
+        num = sum(max(0, min(h, end if end is not None else h) - start) * factor
+                  for start, end, factor in rules.tier_bounds())
+        base = _div_half_up(num * r, 100 * BP)
+    unit = max(_div_half_up(base * (BP + rules.margin_bp), BP), rules.minimum_cents)
+    subtotal = unit * quantity
+    discount_bp = max((d for q, d in rules.volume if quantity >= q), default=0)
+    return subtotal - _div_half_up(subtotal * discount_bp, BP)
+
+@dataclass
+class QuoteResult:
+    unit_cents: object      # int64 arrays, one entry per line
+    subtotal_cents: object
+    discount_cents: object
+    total_cents: object
+
+    def __len__(self):
+        return len(self.total_cents)
+
+    def rows(self):
+        return [{"unit_cents": u, "subtotal_cents": s, "discount_cents": d, "total_cents": t}
+                for u, s, d, t in zip(self.unit_cents.tolist(), self.subtotal_cents.tolist(),
+                                      self.discount_cents.tolist(), self.total_cents.tolist())]
+
+def _column(np, lines, key, scale, default):
+    """Column `key` of `lines` (list of dicts, or a dict of sequences) as exact int64 units;
+    -1 marks a missing value."""
+    if isinstance(lines, dict):
+        values = lines.get(key)
+        if values is None:
+            return np.full(len(next(iter(lines.values()), ())), default, dtype=np.int64)
+        arr = np.asarray(values, dtype=np.float64)
+    else:
+        arr = np.fromiter((math.nan if line.get(key) is None else line.get(key) for line in lines),
+                          dtype=np.float64, count=len(lines))
+    missing = np.isnan(arr)
+    bad = ~missing & (~np.isfinite(arr) | (arr < 0))
+    if bad.any():
+        raise QuoteError(f"line {int(np.argmax(bad))}: {key} must be a non-negative number")
+    too_big = ~missing & (arr > MAX_VALUES[key])
+    if too_big.any():  # checked before the int64 cast, which would wrap silently
+        raise QuoteError(f"line {int(np.argmax(too_big))}: {key} must be at most {MAX_VALUES[key]:,}")
+    # x*scale is within 1 ulp of an integer for decimal inputs, so rint recovers it exactly.
+    out = np.rint(np.where(missing, 0, arr) * scale).astype(np.int64)
+    out[missing] = default
+    return out
+
+def quote(lines, rules=None):
+    """Price a batch of lines; returns a QuoteResult of int64 cent arrays.
+
+    `lines` is a list of dicts or a dict of equal-length columns with keys hours, rate,
+    fixed (overrides hours*rate when present), quantity (default 1) and margin (default
+    from `rules`).
+    """
+    import numpy as np
+    rules = rules or PricingRules()
+    try:
+        hours = _column(np, lines, "hours", 100, 0)
+        rate = _column(np, lines, "rate", 100, 0)
+        fixed = _column(np, lines, "fixed", 100, -1)
+        quantity = _column(np, lines, "quantity", 1, 1)
+        margin = _column(np, lines, "margin", BP, rules.margin_bp)
+    except (TypeError, ValueError) as e:
+        if isinstance(e, QuoteError):
+            raise
+        raise QuoteError(f"lines must hold numbers: {e}")
+    num = np.zeros_like(hours)
+    for start, end, factor in rules.tier_bounds():
+        span = hours - start if end is None else np.minimum(hours, end) - start
+        num += np.maximum(span, 0) * factor
+    base = np.where(fixed >= 0, fixed, (num * rate + 100 * BP // 2) // (100 * BP))
+    unit = np.maximum((base * (BP + margin) + BP // 2) // BP, rules.minimum_cents)
+    subtotal = unit * quantity
+    discount_bp = np.zeros_like(quantity)
+    if rules.volume:
+        thresholds = np.array([q for q, _ in rules.volume], dtype=np.int64)
+        discounts = np.maximum.accumulate(np.array([d for _, d in rules.volume], dtype=np.int64))
+        idx = np.searchsorted(thresholds, quantity, side="right") - 1
+        discount_bp = np.where(idx >= 0, discounts[np.maximum(idx, 0)], 0)
+    # split so subtotal * discount_bp cannot overflow; equal to (subtotal * bp + BP/2) // BP
+    discount = (subtotal // BP) * discount_bp + ((subtotal % BP) * discount_bp + BP // 2) // BP
+    return QuoteResult(unit, subtotal, discount, subtotal - discount)
+
+def warm():
+    import numpy  # noqa: F401
+
+def catalogue_lines(user_id, overrides=None):
+    """(gig ids, current price cents, quote columns) for a user's gigs that have pricing inputs.
+
+    `overrides` sets rate/hours/fixed/margin for every gig (what-if scenarios); a
+    `rate_factor` scales each gig's own hourly rate instead.
+    """
+    import numpy as np
+    from gigforge.models import db, Gig
+    overrides = overrides or {}
+    rows = db.session.execute(
+        db.select(Gig.id, Gig.price, Gig.hours, Gig.hourly_rate, Gig.fixed_price)
+        .where(Gig.user_id == user_id,
+               db.or_(Gig.fixed_price.isnot(None), db.and_(Gig.hours.isnot(None), Gig.hourly_rate.isnot(None))))
+        .order_by(Gig.id)).all()
+    ids = np.array([r.id for r in rows], dtype=np.int64)
+    current = np.rint(np.array([r.price or 0 for r in rows], dtype=np.float64) * 100).astype(np.int64)
+    nan = lambda v: math.nan if v is None else v
+    columns = {"hours": [nan(r.hours) for r in rows], "rate": [nan(r.hourly_rate) for r in rows],
+               "fixed": [nan(r.fixed_price) for r in rows]}
+    if overrides.get("rate_factor") is not None:
+        columns["rate"] = np.asarray(columns["rate"], dtype=np.float64) * float(overrides["rate_factor"])
+    for key in ("hours", "rate", "fixed", "margin"):
+        if overrides.get(key) is not None:
+            columns[key] = [overrides[key]] * len(rows)
+    return ids, current, columns
+
+def reprice_gigs(user_id, rules=None, overrides=None, apply=False, chunk_size=1000):
+    """Quote a user's whole catalogue; with apply=True write the new prices to Gig.price.
+
+    Returns a summary with per-gig old/new cents for the gigs whose price changes.
+    """
+    import numpy as np
+    from gigforge.models import db, Gig
+    ids, current, columns = catalogue_lines(user_id, overrides)
+    if not len(ids):
+        return {"gigs": 0, "changed": 0, "old_total_cents": 0, "new_total_cents": 0, "applied": apply, "changes": []}
+    result = quote(columns, rules)
+    new = result.unit_cents
+    changed = np.flatnonzero(new != current)
+    changes = [{"gig_id": int(ids[i]), "old_cents": int(current[i]), "new_cents": int(new[i])} for i in changed]
+    if apply and changes:
+        for i in range(0, len(changes), chunk_size):
+            # ORM bulk UPDATE by primary key: one executemany per chunk (and updated_at is
+            # bumped, so the Fiverr sync picks up the new prices).
+            db.session.execute(db.update(Gig), [{"id": c["gig_id"], "price": c["new_cents"] / 100}
+                                                for c in changes[i:i + chunk_size]])
+        db.session.commit()
+    return {"gigs": len(ids), "changed": len(changes), "old_total_cents": int(current.sum()),
+            "new_total_cents": int(new.sum()), "applied": apply, "changes": changes}
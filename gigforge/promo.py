@@ -0,0 +1,242 @@
+"""Promo images in several marketplace sizes and formats from one layout pass.
+
+The title and subtitle are measured once, word by word, at the base font sizes; each target
+size then only re-wraps those widths (long titles wrap to MAX_TITLE_LINES and shrink before
+being cut with an ellipsis), draws once and encodes to every requested format. Encoder
+settings come from a profile: "preview" favours speed, "final" favours bytes (palette PNG,
+lossless WebP, optimized progressive JPEG).
+"""
+import datetime, functools, io, os
+from collections import namedtuple
+
+from gigforge import metrics
+from gigforge.render_cache import RenderCache, cache_key
+
+# Pillow is imported inside the functions that use it (see utils).
+
+BASE_SIZE = (1200, 630)  # font sizes are for this canvas and scale with the target
+FONTS = (("DejaVuSans-Bold.ttf", 72), ("DejaVuSans.ttf", 36))  # title, subtitle and footer
+TITLE_COLOR = (234, 246, 255)
+SUBTITLE_COLOR = (139, 92, 246)
+FOOTER_COLOR = (153, 163, 179)
+BG_COLOR = (6, 4, 10)
+RENDER_VERSION = 2  # bump when the drawing code changes so cached renders are invalidated
+
+MARGIN = 0.07  # of the width, on each side
+MAX_TITLE_LINES, MAX_SUBTITLE_LINES = 3, 2
+MIN_TEXT_SCALE = 0.55  # long text shrinks to this fraction of its size before it is cut
+LINE_HEIGHT = 1.2
+TEXT_CENTER = 0.35  # vertical centre of the title + subtitle block, as a fraction of the height
+MAX_DIMENSION = 4096
+
+VARIANTS = {
+    "og": (1200, 630),       # Open Graph / link previews
+    "fiverr": (1280, 769),   # Fiverr gig gallery
+    "twitter": (1600, 900),
+    "square": (1080, 1080),  # Instagram / LinkedIn feed
+    "story": (1080, 1920),
+    "thumb": (400, 210),
+}
+VARIANT_SETS = {
+    "marketplaces": ("fiverr", "og", "square"),
+    "social": ("og", "twitter", "square", "story"),
+    "all": tuple(VARIANTS),
+}
+FORMATS = {"png": ("PNG", "image/png"), "webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+PROFILES = {
+    "preview": {"png": {"compress_level": 1},
+                "webp": {"quality": 80, "method": 0},
+                "jpeg": {"quality": 80}},
+    "final": {"png": {"palette": 256, "optimize": True},
+              "webp": {"lossless": True, "quality": 50, "method": 3},
+              "jpeg": {"quality": 85, "optimize": True, "progressive": True}},
+}
+
+Variant = namedtuple("Variant", "name width height")
+Rendered = namedtuple("Rendered", "variant format mimetype data")
+Measured = namedtuple("Measured", "words widths space")
+
+class PromoError(ValueError):
+    pass
+
+def parse_variants(spec):
+    """Variants from names, set names or "WIDTHxHEIGHT", given as a list or a comma-separated string."""
+    names = spec.split(",") if isinstance(spec, str) else list(spec or ())
+    out = {}
+    for name in (str(n).strip().lower() for n in names):
+        for sub in VARIANT_SETS.get(name, (name,) if name else ()):
+            if sub in VARIANTS:
+                out[sub] = Variant(sub, *VARIANTS[sub])
+                continue
+            w, x, h = sub.partition("x")
+            if not (x and w.isdigit() and h.isdigit()):
+                raise PromoError(f"unknown variant {sub!r} (use {', '.join([*VARIANTS, *VARIANT_SETS])} or WxH)")
+            if not (16 <= int(w) <= MAX_DIMENSION and 16 <= int(h) <= MAX_DIMENSION):
+                raise PromoError(f"variant {sub!r}: sides must be 16-{MAX_DIMENSION} px")
+            out[sub] = Variant(sub, int(w), int(h))
+    if not out:
+        raise PromoError("no variants requested")
+    return list(out.values())
+
+def _variants(spec):
+    if not isinstance(spec, str) and spec and all(isinstance(v, Variant) for v in spec):
+        return list(spec)
+    return parse_variants(spec)
+
+def parse_formats(spec):
+    names = spec.split(",") if isinstance(spec, str) else list(spec or ())
+    out = []
+    for name in (str(n).strip().lower() for n in names):
+        name = "jpeg" if name == "jpg" else name
+        if name and name not in FORMATS:
+            raise PromoError(f"unknown format {name!r} (use {', '.join(FORMATS)})")
+        if name and name not in out:
+            out.append(name)
+    if not out:
+        raise PromoError("no formats requested")
+    return out
+
+def check_profile(profile):
+    if profile not in PROFILES:
+        raise PromoError(f"unknown profile {profile!r} (use {', '.join(PROFILES)})")
+    return profile
+
+def filename(rendered, stem="promo"):
+    return f"{stem}-{rendered.variant.name}.{EXTENSIONS[rendered.format]}"
+
+# -- layout ------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def font(index, size):
+    """FONTS[index] at `size` px, loaded once per process and size."""
+    from PIL import ImageFont
+    try:
+        return ImageFont.truetype(FONTS[index][0], size)
+    except OSError:
+        return ImageFont.load_default(size)
+
+def measure(text, index):
+    f = font(index, FONTS[index][1])
+    words = text.split()
+    return Measured(words, [f.getlength(w) for w in words], f.getlength(" "))
+
+def wrap(measured, max_width):
+    """Greedy line breaks over base-size widths; returns [(first_word, end_word, width), ...]."""
+    lines, start, width = [], 0, 0.0
+    for i, w in enumerate(measured.widths):
+        if i > start and width + measured.space + w > max_width:
+            lines.append((start, i, width))
+            start, width = i, w
+        else:
+            width += (measured.space if i > start else 0) + w
+    if measured.words:
+        lines.append((start, len(measured.words), width))
+    return lines
+
+def fit(measured, index, max_width, max_lines, scale):
+    """(lines, font size) for text in `max_width` px and `max_lines`: shrink first, then cut with "…"."""
+    s, floor = scale, scale * MIN_TEXT_SCALE
+    while True:
+        lines = wrap(measured, max_width / s)
+        fits = len(lines) <= max_lines and all(w * s <= max_width for _, _, w in lines)
+        if fits or s <= floor:
+            break
+        s = max(s * 0.9, floor)
+    size = max(6, round(FONTS[index][1] * s))
+    texts = [" ".join(measured.words[a:b]) for a, b, _ in lines[:max_lines]]
+    if not fits:
+        f = font(index, size)
+        for i, text in enumerate(texts):
+            cut = i == len(texts) - 1 and len(lines) > max_lines
+            if cut or f.getlength(text) > max_width:
+                while text and f.getlength(text + "…") > max_width:
+                    text = text[:-1]
+                texts[i] = text.rstrip() + "…"
+    return texts, size
+
+def draw(title, subtitle, variant, bg_color, footer):
+    """Draw one variant from Measured title/subtitle; returns an RGB image."""
+    from PIL import Image, ImageDraw
+    W, H = variant.width, variant.height
+    scale = min(W / BASE_SIZE[0], H / BASE_SIZE[1])
+    max_width = W * (1 - 2 * MARGIN)
+    title_lines, title_size = fit(title, 0, max_width, MAX_TITLE_LINES, scale)
+    sub_lines, sub_size = fit(subtitle, 1, max_width, MAX_SUBTITLE_LINES, scale)
+    gap = sub_size * 0.6 if sub_lines else 0
+    block = len(title_lines) * title_size * LINE_HEIGHT + gap + len(sub_lines) * sub_size * LINE_HEIGHT
+    y = max(H * TEXT_CENTER - block / 2, H * 0.05)
+
+    img = Image.new("RGB", (W, H), bg_color)
+    d = ImageDraw.Draw(img)
+    for lines, index, size, color in ((title_lines, 0, title_size, TITLE_COLOR),
+                                      (sub_lines, 1, sub_size, SUBTITLE_COLOR)):
+        f = font(index, size)
+        for line in lines:
+            d.text((W / 2, y), line, fill=color, font=f, anchor="ma")
+            y += size * LINE_HEIGHT
+        y += gap
+    d.text((round(20 * scale), H - round(40 * scale)), footer, fill=FOOTER_COLOR,
+           font=font(1, max(6, round(FONTS[1][1] * scale))))
+    return img
+
+def encode(img, fmt, profile="final"):
+    options = dict(PROFILES[profile][fmt])
+    colors = options.pop("palette", None)
+    if colors:  # flat artwork: an adaptive palette keeps it sharp at a third of the bytes
+        from PIL import Image
+        img = img.quantize(colors, method=Image.Quantize.FASTOCTREE)
+    out = io.BytesIO()
+    img.save(out, format=FORMATS[fmt][0], **options)
+    return out.getvalue()
+
+@metrics.timed("render", "promo")
+def render(title, subtitle, variants=("og",), formats=("png",), profile="final", bg_color=BG_COLOR, year=None):
+    """Render every variant x format; returns [Rendered, ...] variant by variant."""
+    variants, formats, profile = _variants(variants), parse_formats(formats), check_profile(profile)
+    measured = measure(title, 0), measure(subtitle, 1)
+    footer = f"NightAnvil • {year or datetime.date.today().year}"
+    out = []
+    for variant in variants:
+        img = draw(*measured, variant, tuple(bg_color), footer)
+        out += [Rendered(variant, fmt, FORMATS[fmt][1], encode(img, fmt, profile)) for fmt in formats]
+    return out
+
+# -- cache -------------------------------------------------------------------------
+
+cache = RenderCache(
+    max_items=int(os.getenv("PROMO_CACHE_ITEMS", "256")),
+    disk_dir=os.getenv("PROMO_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("PROMO_CACHE_DISK_MB", "256")) * 1024 * 1024,
+    suffix=".bin",  # PNG, WebP and JPEG share the cache; the format is part of the key
+)
+metrics.register_cache("promo", cache)
+
+def _key(title, subtitle, variant, fmt, profile, bg_color, year):
+    # Everything that changes the bytes, including the footer year, so a cached image is
+    # never served once its inputs would draw something different.
+    return cache_key("promo", RENDER_VERSION, title, subtitle, bg_color, (variant.width, variant.height), year,
+                     fmt, PROFILES[profile][fmt], FONTS, TITLE_COLOR, SUBTITLE_COLOR, FOOTER_COLOR)
+
+def cached_render(title, subtitle, variants=("og",), formats=("png",), profile="final", bg_color=BG_COLOR):
+    """render() through `cache`; returns [(Rendered, Entry, hit), ...]. Only variants with a miss are drawn."""
+    variants, formats, profile = _variants(variants), parse_formats(formats), check_profile(profile)
+    bg_color, year = tuple(bg_color), datetime.date.today().year
+    found = {}
+    for variant in variants:
+        for fmt in formats:
+            key = _key(title, subtitle, variant, fmt, profile, bg_color, year)
+            found[variant, fmt] = (key, *cache.get(key))
+    missing = [v for v in variants if any(found[v, fmt][1] is None for fmt in formats)]
+    if missing:
+        for r in render(title, subtitle, missing, formats, profile, bg_color, year):
+            key, entry, hit = found[r.variant, r.format]
+            if entry is None:
+                found[r.variant, r.format] = (key, cache.put(key, r.data), None)
+    return [(Rendered(v, fmt, FORMATS[fmt][1], found[v, fmt][1].data), found[v, fmt][1], found[v, fmt][2])
+            for v in variants for fmt in formats]
+
+def warm():
+    from PIL import Image, ImageDraw  # noqa: F401
+    for index, (_, size) in enumerate(FONTS):
+        font(index, size)
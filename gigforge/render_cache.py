@@ -0,0 +1,156 @@
+"""Content-addressed cache for rendered artifacts (promo images, generated text, ...).
+
+Two tiers: a bounded in-process LRU and an optional directory on disk shared by
+all workers, trimmed oldest-first once it grows past `disk_max_bytes`. With `ttl`
+(seconds) entries expire that long after they were created, in both tiers.
+"""
+import hashlib, json, os, tempfile, threading, time
+from collections import OrderedDict, namedtuple
+
+Entry = namedtuple("Entry", "key data created")
+
+def cache_key(*parts):
+    """Stable hex digest of JSON-serialisable render inputs."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class RenderCache:
+    def __init__(self, max_items=256, disk_dir=None, disk_max_bytes=256 * 1024 * 1024, suffix=".bin", ttl=None):
+        self.max_items = max_items
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.suffix = suffix
+        self.ttl = ttl
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None  # computed lazily on first disk write
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "disk_evictions": 0,
+                         "expired": 0}
+
+    def stats(self):
+        with self._lock:
+            s = dict(self.counters, items=len(self._mem))
+        lookups = s["memory_hits"] + s["disk_hits"] + s["misses"]
+        s["hit_ratio"] = round((s["memory_hits"] + s["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return s
+
+    def get(self, key):
+        """Return (Entry, hit) with hit 'memory' or 'disk', or (None, None) on a miss."""
+        with self._lock:
+            entry = self._mem.get(key)
+            if entry is not None and self._expired(entry):
+                del self._mem[key]
+                self.counters["expired"] += 1
+                entry = None
+            if entry is not None:
+                self._mem.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry, "memory"
+        entry = self._disk_get(key)
+        with self._lock:
+            self.counters["disk_hits" if entry else "misses"] += 1
+            if entry:
+                self._remember(entry)
+        return entry, "disk" if entry else None
+
+    def put(self, key, data):
+        entry = Entry(key, data, time.time())
+        self._disk_put(entry)
+        with self._lock:
+            self._remember(entry)
+        return entry
+
+    def get_or_render(self, key, render):
+        """Return (Entry, hit) where hit is 'memory', 'disk' or None; `render()` runs only on a miss."""
+        entry, hit = self.get(key)
+        if entry is None:
+            entry = self.put(key, render())
+        return entry, hit
+
+    def _remember(self, entry):
+        self._mem[entry.key] = entry
+        self._mem.move_to_end(entry.key)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def _expired(self, entry):
+        return self.ttl is not None and time.time() - entry.created >= self.ttl
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+
+    # -- disk tier -----------------------------------------------------------------
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + self.suffix)
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            created = os.path.getmtime(path)
+            if self.ttl is not None and time.time() - created >= self.ttl:
+                os.remove(path)
+                with self._lock:
+                    self.counters["expired"] += 1
+                return None
+            if self.ttl is None:
+                os.utime(path, None)  # touch so eviction is least-recently-used
+        except OSError:
+            return None
+        return Entry(key, data, created)
+
+    def _disk_put(self, entry):
+        if not self.disk_dir:
+            return
+        path = self._path(entry.key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so concurrent workers never read a partial file.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(entry.data)
+        os.utime(tmp, (entry.created, entry.created))  # mtime is the creation time the TTL runs from
+        os.replace(tmp, path)
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += len(entry.data)
+            over = self._disk_bytes > self.disk_max_bytes
+        if over:
+            self._disk_evict()
+
+    def _disk_files(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(self.suffix):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, st.st_size, st.st_mtime
+
+    def _disk_evict(self):
+        """Drop least recently used files until the tier is back under 90% of its budget."""
+        files = sorted(self._disk_files(), key=lambda f: f[2])
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * 0.9
+        evicted = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.counters["disk_evictions"] += evicted
@@ -0,0 +1,262 @@
+"""Full-text search over gigs, clients and invoices (project and line items).
+
+SQLite keeps one FTS5 table, `search_fts`, filled by triggers on the base tables, so ORM
+writes and Core bulk inserts are indexed alike. Document rowids start with the owner's
+user id, so a user's search is a rowid range that FTS5 seeks to instead of decoding
+every user's postings for the terms. PostgreSQL gets a generated tsvector column with a GIN
+index on each table instead. As in search-as-you-type, every word must match and the last
+one is a prefix; results are ranked (title matches first) and offset-paginated.
+"""
+import logging, re
+
+from sqlalchemy import text
+
+from gigforge.models import db, Client, Gig, Invoice
+
+log = logging.getLogger("nightanvil.search")
+
+KINDS = ("gig", "client", "invoice")
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+MAX_OFFSET = 1000
+MAX_CANDIDATES = 2000  # newest matches ranked per query; short prefixes can match most of a catalogue
+MAX_TERMS = 8
+TITLE_WEIGHT = 10
+PREFIX_INDEX = (2, 3, 4)  # FTS5 prefix index lengths; longer prefixes are narrowed through the 4-char one
+FTS_TABLE = "search_fts"
+TS_CONFIG = "simple"  # no stemming, like FTS5's unicode61 tokenizer
+
+class SearchError(ValueError):
+    pass
+
+# (table, rowid code, kind, ref id, owner user id, title, body, columns that change the document)
+# search_fts rowid = user_id << 34 | id << 2 | code (ids below 2**32); invoice items are
+# indexed as hits on their invoice.
+USER_SHIFT = 34
+_SOURCES = (
+    ("gig", 1, "gig", "{r}.id", "{r}.user_id", "{r}.title", "coalesce({r}.description, '')",
+     "title, description, user_id"),
+    ("client", 2, "client", "{r}.id", "{r}.user_id", "{r}.name", "coalesce({r}.email, '')", "name, email, user_id"),
+    ("invoice", 0, "invoice", "{r}.id", "{r}.user_id", "{r}.project", "''", "project, user_id"),
+    ("invoice_item", 3, "invoice", "{r}.invoice_id", "(SELECT user_id FROM invoice WHERE id = {r}.invoice_id)",
+     "''", "{r}.description", "description, invoice_id"),
+)
+
+# (table, weighted tsvector expression) for PostgreSQL.
+_PG_VECTORS = (
+    ("gig", "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"),
+    ("client", "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+               "setweight(to_tsvector('simple', coalesce(email, '')), 'B')"),
+    ("invoice", "setweight(to_tsvector('simple', coalesce(project, '')), 'A')"),
+    ("invoice_item", "setweight(to_tsvector('simple', coalesce(description, '')), 'B')"),
+)
+
+_FTS_INSERT = f"INSERT INTO {FTS_TABLE}(rowid, title, body, kind, ref_id)"
+
+def _rowid(owner, row, code):
+    return f"(({owner}) << {USER_SHIFT}) + ({row}.id << 2) + {code}"
+
+def _sqlite_values(row, code, kind, ref, owner, title, body):
+    """Document columns for the source row named `row` (new/old in a trigger, the table in a rebuild)."""
+    f = lambda expr: expr.format(r=row)
+    return f"{_rowid(f(owner), row, code)}, {f(title)}, {f(body)}, '{kind}', {f(ref)}"
+
+def _sqlite_ddl():
+    yield (f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(title, body, "
+           "kind UNINDEXED, ref_id UNINDEXED, tokenize='unicode61 remove_diacritics 2', "
+           f"prefix='{' '.join(map(str, PREFIX_INDEX))}')")
+    for table, code, kind, ref, owner, title, body, watched in _SOURCES:
+        insert_new = f"{_FTS_INSERT} VALUES ({_sqlite_values('new', code, kind, ref, owner, title, body)})"
+        delete_old = f"DELETE FROM {FTS_TABLE} WHERE rowid = {_rowid(owner.format(r='old'), 'old', code)}"
+        extra_update = extra_delete = ""
+        if table == "invoice":
+            # Item documents are keyed by the invoice owner: move them along with it.
+            moved = "new.user_id IS NOT old.user_id"
+            item_rowid = lambda owner: _rowid(owner, "invoice_item", 3)
+            old_items = f"DELETE FROM {FTS_TABLE} WHERE rowid IN (SELECT {item_rowid('old.user_id')} " \
+                        "FROM invoice_item WHERE invoice_id = old.id"
+            extra_delete = f"{old_items}); "
+            extra_update = (f"{old_items} AND {moved}); {_FTS_INSERT} SELECT {item_rowid('new.user_id')}, '', "
+                            f"description, 'invoice', invoice_id FROM invoice_item WHERE invoice_id = new.id AND {moved}; ")
+        yield f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_{table}_ai AFTER INSERT ON {table} BEGIN {insert_new}; END"
+        yield (f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_{table}_au AFTER UPDATE OF {watched} ON {table} "
+               f"BEGIN {delete_old}; {insert_new}; {extra_update}END")
+        yield (f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_{table}_ad AFTER DELETE ON {table} "
+               f"BEGIN {delete_old}; {extra_delete}END")
+
+def _postgres_ddl():
+    for table, vector in _PG_VECTORS:
+        yield (f'ALTER TABLE "{table}" ADD COLUMN IF NOT EXISTS search_vector tsvector '
+               f"GENERATED ALWAYS AS ({vector}) STORED")
+        yield f'CREATE INDEX IF NOT EXISTS ix_{table}_search ON "{table}" USING gin (search_vector)'
+
+def install(connection):
+    """Create the search index and its sync triggers/columns (idempotent)."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        try:
+            statements = list(_sqlite_ddl())
+            connection.exec_driver_sql(statements[0])
+        except Exception as e:  # sqlite3 built without FTS5
+            log.warning("search disabled: %s", e)
+            return False
+        for statement in statements[1:]:
+            connection.exec_driver_sql(statement)
+        return True
+    if dialect == "postgresql":
+        for statement in _postgres_ddl():
+            connection.exec_driver_sql(statement)
+        return True
+    log.warning("search is not supported on %s", dialect)
+    return False
+
+def uninstall(connection):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for table, *_ in _SOURCES:
+            for suffix in ("ai", "au", "ad"):
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{table}_{suffix}")
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif dialect == "postgresql":
+        for table, _ in _PG_VECTORS:
+            connection.exec_driver_sql(f'DROP INDEX IF EXISTS ix_{table}_search')
+            connection.exec_driver_sql(f'ALTER TABLE "{table}" DROP COLUMN IF EXISTS search_vector')
+
+@db.event.listens_for(db.metadata, "after_create")
+def _install_after_create(target, connection, **kw):
+    install(connection)
+
+@db.event.listens_for(db.metadata, "before_drop")
+def _uninstall_before_drop(target, connection, **kw):
+    uninstall(connection)
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """Alembic filter: the search index lives outside the models, so autogenerate ignores it."""
+    if type_ == "table" and name.startswith(FTS_TABLE):
+        return False
+    if (type_ == "column" and name == "search_vector") or (type_ == "index" and str(name).endswith("_search")):
+        return False
+    return True
+
+def rebuild(connection=None):
+    """Re-index every row (for data that predates the index); returns the number of documents."""
+    connection = connection or db.session.connection()
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        install(connection)
+        connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+        for table, code, kind, ref, owner, title, body, _ in _SOURCES:
+            values = _sqlite_values(table, code, kind, ref, owner, title, body)
+            connection.exec_driver_sql(f"{_FTS_INSERT} SELECT {values} FROM {table}")
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+        return connection.exec_driver_sql(f"SELECT count(*) FROM {FTS_TABLE}").scalar()
+    if dialect == "postgresql":
+        # Generated columns are always current; rebuild the GIN indexes and refresh planner stats.
+        install(connection)
+        total = 0
+        for table, _ in _PG_VECTORS:
+            connection.exec_driver_sql(f"REINDEX INDEX ix_{table}_search")
+            connection.exec_driver_sql(f'ANALYZE "{table}"')
+            total += connection.exec_driver_sql(f'SELECT count(*) FROM "{table}"').scalar()
+        return total
+    raise SearchError(f"search is not supported on {dialect}")
+
+def terms(query):
+    """Lower-cased word tokens of a user query (at most MAX_TERMS)."""
+    return re.findall(r"\w+", (query or "").lower())[:MAX_TERMS]
+
+def _sqlite_hits(user_id, words, kinds):
+    """Matching (kind, ref_id, score) rows for one user.
+
+    FTS5's bm25() is avoided on purpose: it takes each term's document frequency from the
+    whole table, a scan of every user's postings. Instead each word found in the title
+    scores TITLE_WEIGHT and in the body 1, computed over this user's newest MAX_CANDIDATES
+    matches only.
+    """
+    *complete, last = words
+    params, verify = {}, ""
+    patterns = [f"*[^a-z0-9]{w}[^a-z0-9]*" for w in complete] + [f"*[^a-z0-9]{last}*"]
+    if len(last) > PREFIX_INDEX[-1] and last.isascii():
+        # A prefix longer than the prefix index would merge that prefix's postings across all
+        # users; match the indexed prefix within the user's rowid range and check the rest per row.
+        verify = f"AND lower(' ' || title || ' ' || body) GLOB :p{len(words) - 1} "
+        last = last[:PREFIX_INDEX[-1]]
+    params = {f"p{i}": pattern for i, pattern in enumerate(patterns)}
+    params["match"] = " AND ".join([f'"{w}"' for w in complete] + [f'"{last}"*'])
+    score = " + ".join(f"(t GLOB :p{i}) * {TITLE_WEIGHT} + (b GLOB :p{i})" for i in range(len(patterns)))
+    # Grouping folds line item hits into their invoice.
+    sql = (f"SELECT kind, ref_id, max({score}) AS score FROM ("
+           f"SELECT kind, ref_id, lower(' ' || title || ' ') AS t, lower(' ' || body || ' ') AS b "
+           f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND rowid BETWEEN :low AND :high {verify}"
+           f"AND kind IN ({_in(kinds)}) ORDER BY rowid DESC LIMIT {MAX_CANDIDATES}) GROUP BY kind, ref_id "
+           "ORDER BY score DESC, kind, ref_id DESC LIMIT :limit OFFSET :offset")
+    low = int(user_id) << USER_SHIFT
+    return sql, {**params, "low": low, "high": low + (1 << USER_SHIFT) - 1}
+
+def _postgres_hits(user_id, words, kinds):
+    units = {
+        "gig": "SELECT 'gig' AS kind, id AS ref_id, ts_rank(search_vector, q) AS score FROM gig, q "
+               "WHERE user_id = :user_id AND search_vector @@ q",
+        "client": "SELECT 'client', id, ts_rank(search_vector, q) FROM client, q "
+                  "WHERE user_id = :user_id AND search_vector @@ q",
+        "invoice": "SELECT 'invoice', id, ts_rank(search_vector, q) FROM invoice, q "
+                   "WHERE user_id = :user_id AND search_vector @@ q "
+                   "UNION ALL SELECT 'invoice', i.invoice_id, ts_rank(i.search_vector, q) "
+                   "FROM invoice_item i JOIN invoice v ON v.id = i.invoice_id, q "
+                   "WHERE v.user_id = :user_id AND i.search_vector @@ q",
+    }
+    sql = (f"WITH q AS (SELECT to_tsquery('{TS_CONFIG}', :tsquery) AS q) "
+           f"SELECT kind, ref_id, max(score) AS score FROM ({' UNION ALL '.join(units[k] for k in kinds)}) hits "
+           "GROUP BY kind, ref_id ORDER BY score DESC, kind, ref_id LIMIT :limit OFFSET :offset")
+    return sql, {"tsquery": " & ".join(words[:-1] + [f"{words[-1]}:*"]), "user_id": user_id}
+
+def _in(kinds):
+    return ", ".join(f"'{k}'" for k in kinds)
+
+def _hydrate(hits):
+    """Display fields for each (kind, id) hit, in hit order; rows deleted meanwhile drop out."""
+    ids = {kind: [ref for k, ref, _ in hits if k == kind] for kind in KINDS}
+    rows = {}
+    if ids["gig"]:
+        for r in db.session.execute(db.select(Gig.id, Gig.title, Gig.status, Gig.price).where(Gig.id.in_(ids["gig"]))):
+            rows["gig", r.id] = {"title": r.title, "status": r.status, "price": r.price}
+    if ids["client"]:
+        for r in db.session.execute(db.select(Client.id, Client.name, Client.email)
+                                    .where(Client.id.in_(ids["client"]))):
+            rows["client", r.id] = {"title": r.name, "email": r.email}
+    if ids["invoice"]:
+        for r in db.session.execute(db.select(Invoice.id, Invoice.project, Invoice.amount, Invoice.status,
+                                              Client.name.label("client_name"))
+                                    .outerjoin(Client, Invoice.client_id == Client.id)
+                                    .where(Invoice.id.in_(ids["invoice"]))):
+            rows["invoice", r.id] = {"title": r.project, "amount": r.amount, "status": r.status,
+                                     "client_name": r.client_name}
+    return [{"type": kind, "id": ref, "score": float(f"{score:.6g}"), **rows[kind, ref]}
+            for kind, ref, score in hits if (kind, ref) in rows]
+
+def search(user_id, query, kinds=None, limit=DEFAULT_LIMIT, offset=0):
+    """Ranked page of a user's gigs/clients/invoices matching every word of `query`, the last as a prefix.
+
+    Returns {"data": [...], "next_offset": int | None}.
+    """
+    kinds = tuple(kinds or KINDS)
+    unknown = set(kinds) - set(KINDS)
+    if unknown:
+        raise SearchError(f"unknown type {sorted(unknown)[0]!r} (expected {', '.join(KINDS)})")
+    limit, offset = min(max(limit or DEFAULT_LIMIT, 1), MAX_LIMIT), max(offset or 0, 0)
+    if offset > MAX_OFFSET:
+        raise SearchError(f"offset is limited to {MAX_OFFSET}; refine the query instead")
+    words = terms(query)
+    if not words:
+        return {"data": [], "next_offset": None}
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        sql, params = _sqlite_hits(user_id, words, kinds)
+    elif dialect == "postgresql":
+        sql, params = _postgres_hits(user_id, words, kinds)
+    else:
+        raise SearchError(f"search is not supported on {dialect}")
+    hits = db.session.execute(text(sql), {**params, "limit": limit + 1, "offset": offset}).all()
+    more = len(hits) > limit
+    return {"data": _hydrate([tuple(h) for h in hits[:limit]]), "next_offset": offset + limit if more else None}
@@ -1,23 +1,49 @@
-import io, datetime, os
-from jinja2 import Environment, FileSystemLoader
+import io, datetime, os, functools, math, tempfile
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from reportlab.lib.units import mm
-from PIL import Image, ImageDraw, ImageFont
+from gigforge import metrics, pricing, promo
+
+# reportlab.pdfgen/pdfbase and Pillow are imported inside the functions that use them:
+# they cost a noticeable slice of worker boot time and most requests never render.
 
 PKG_DIR = os.path.dirname(__file__)
 TEMPLATES_DIR = os.path.join(PKG_DIR, "templates")
-env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR") or None  # None: a per-user temp directory
+TEMPLATES_AUTO_RELOAD = os.getenv("TEMPLATES_AUTO_RELOAD", "").lower() in ("1", "true", "yes")
+
+@functools.lru_cache(maxsize=None)
+def get_env():
+    """Shared Jinja environment for document templates.
+
+    Compiled templates stay in memory and their bytecode is cached on disk, so a new
+    process (CLI run, pool worker) skips parsing. Template files are only re-checked
+    for edits when auto_reload is on (see set_template_auto_reload).
+    """
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+    return Environment(loader=FileSystemLoader(TEMPLATES_DIR), auto_reload=TEMPLATES_AUTO_RELOAD,
+                       bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR))
+
+def set_template_auto_reload(enabled):
+    """Re-check template files on every render (development) or never (production)."""
+    get_env().auto_reload = bool(enabled)
+
+def precompile_templates():
+    """Compile every template now (filling the bytecode cache); returns their names."""
+    env = get_env()
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return names
 
 def calc_price(hours=None, rate=None, fixed=None, margin=0.2):
-    if fixed is not None:
-        base = fixed
-    else:
-        base = (hours or 0) * (rate or 0)
-    return round(base * (1 + margin), 2)
+    """Price in dollars: hours*rate (or fixed) plus margin, computed in exact cents."""
+    return pricing.calc_price_cents(hours or 0, rate or 0, fixed, margin) / 100
 
+@metrics.timed("render")
 def render_template(tmpl_name, ctx):
-    tmpl = env.get_template(tmpl_name)
+    tmpl = get_env().get_template(tmpl_name)
     return tmpl.render(**ctx)
 
 def build_proposal_context(payload):
@@ -26,7 +52,7 @@ def build_proposal_context(payload):
         "client": payload.get("client","Client"),
         "project": payload.get("project","Project"),
         "author": payload.get("author","Freelancer"),
-        "date": now,
+        "date": payload.get("date", now),
         "summary": payload.get("summary", f"Work to deliver {payload.get('project','Project')}"),
         "deliverables": payload.get("deliverables", ["Design","Dev","Test"]),
         "start_date": payload.get("start_date", now),
@@ -35,56 +61,178 @@ def build_proposal_context(payload):
         "revisions": payload.get("revisions", 2)
     }
 
-def invoice_pdf(items, client_name, project, out_stream):
-    c=canvas.Canvas(out_stream, pagesize=A4)
-    w,h = A4
-    c.setFont("Helvetica-Bold",16)
-    c.drawString(30*mm, h-30*mm, "INVOICE")
-    c.setFont("Helvetica",10)
-    c.drawString(30*mm,h-40*mm, f"To: {client_name}")
-    c.drawString(30*mm,h-46*mm, f"Project: {project}")
-    c.drawString(30*mm,h-52*mm, f"Date: {datetime.date.today().isoformat()}")
-    y = h - 70*mm
-    total = 0.0
-    c.setFont("Helvetica-Bold",11)
-    c.drawString(30*mm,y, "Description")
-    c.drawString(140*mm,y, "Amount")
-    c.setFont("Helvetica",10)
-    y -= 8*mm
+def build_contract_context(payload, proposal_ctx=None):
+    """Context for contract.txt.j2; reuses an already built proposal context when given."""
+    ctx = dict(proposal_ctx or build_proposal_context(payload))
+    deliverables = ctx["deliverables"]
+    ctx.update(
+        scope=payload.get("scope", ctx["summary"]),
+        payment_terms=payload.get("payment_terms", "50% upfront, 50% on delivery"),
+        deliverables=deliverables if isinstance(deliverables, str) else ", ".join(map(str, deliverables)),
+    )
+    return ctx
+
+DOCUMENTS = {"proposal": "proposal.md.j2", "contract": "contract.txt.j2"}
+
+def render_documents(payloads, documents=("proposal", "contract")):
+    """Yield (index, {document: text}) for each payload, rendering lazily as it is consumed.
+
+    Templates are looked up once per batch and the proposal context is shared with the
+    contract, so a batch costs little more than the template rendering itself.
+    """
+    unknown = set(documents) - set(DOCUMENTS)
+    if unknown:
+        raise ValueError(f"unknown document(s): {', '.join(sorted(unknown))}")
+    env = get_env()
+    templates = {name: env.get_template(DOCUMENTS[name]) for name in documents}
+    for i, payload in enumerate(payloads):
+        ctx = build_proposal_context(payload)
+        yield i, {name: tmpl.render(**(build_contract_context(payload, ctx) if name == "contract" else ctx))
+                  for name, tmpl in templates.items()}
+
+INVOICE_ROW_HEIGHT = 8*mm
+INVOICE_TABLE_TOP = 70*mm     # distance of the column headings from the top edge
+INVOICE_BOTTOM_MARGIN = 30*mm  # room for the per-page subtotal lines
+INVOICE_DESC_WIDTH = 105*mm
+MAX_LINE_AMOUNT = 1_000_000_000  # dollars; larger (or non-finite) line amounts are refused
+
+def valid_amount(amount):
+    return math.isfinite(amount) and abs(amount) <= MAX_LINE_AMOUNT
+
+@functools.lru_cache(maxsize=4096)
+def _char_width(ch, font, size):
+    from reportlab.pdfbase import pdfmetrics
+    return pdfmetrics.stringWidth(ch, font, size)
+
+def _fit(c, text, width, font="Helvetica", size=10):
+    """Truncate `text` with an ellipsis so it fits `width` points.
+
+    Sums cached per-character widths (the standard fonts have no kerning), which
+    is far cheaper than measuring every candidate prefix.
+    """
+    text = str(text)
+    widths = [_char_width(ch, font, size) for ch in text]
+    if sum(widths) <= width:
+        return text
+    budget, used = width - _char_width("…", font, size), 0
+    for n, w in enumerate(widths):
+        used += w
+        if used > budget:
+            return text[:n] + "…"
+    return text
+
+def _money(cents):
+    return f"${cents / 100:,.2f}"
+
+class _InvoiceCanvas:
+    """Draws invoice pages: header and column headings on every page, subtotals at each page break."""
+
+    def __init__(self, out_stream, client_name, project, invoice_date, invoice_number):
+        from reportlab.pdfgen import canvas
+        self.c = canvas.Canvas(out_stream, pagesize=A4, pageCompression=1)
+        self.w, self.h = A4
+        self.client_name, self.project = client_name, project
+        self.invoice_date, self.invoice_number = invoice_date, invoice_number
+        self.page = 0
+
+    def start_page(self, table=True):
+        c, h = self.c, self.h
+        self.page += 1
+        c.setFont("Helvetica-Bold",16)
+        c.drawString(30*mm, h-30*mm, "INVOICE" + (f" #{self.invoice_number}" if self.invoice_number else ""))
+        c.setFont("Helvetica",10)
+        c.drawRightString(200*mm, h-30*mm, f"Page {self.page}")
+        c.drawString(30*mm,h-40*mm, f"To: {_fit(c, self.client_name, 160*mm)}")
+        c.drawString(30*mm,h-46*mm, f"Project: {_fit(c, self.project, 150*mm)}")
+        c.drawString(30*mm,h-52*mm, f"Date: {self.invoice_date}")
+        if table:
+            c.setFont("Helvetica-Bold",11)
+            c.drawString(30*mm,h-INVOICE_TABLE_TOP, "Description")
+            c.drawString(140*mm,h-INVOICE_TABLE_TOP, "Amount")
+            c.setFont("Helvetica",10)
+        return h - INVOICE_TABLE_TOP - INVOICE_ROW_HEIGHT
+
+    def end_page(self, page_cents, carried_cents):
+        c = self.c
+        c.setFont("Helvetica",9)
+        c.drawString(30*mm, 22*mm, "Page subtotal:")
+        c.drawRightString(200*mm, 22*mm, _money(page_cents))
+        c.drawString(30*mm, 17*mm, "Carried forward:")
+        c.drawRightString(200*mm, 17*mm, _money(carried_cents))
+        c.showPage()
+
+@metrics.timed("render")
+def invoice_pdf(items, client_name, project, out_stream, invoice_date=None, invoice_number=None):
+    """Render an invoice PDF to `out_stream`; returns the total.
+
+    `items` may be any iterable of (description, amount), including a lazy database
+    cursor: rows are drawn as they arrive and only the running totals are kept.
+    Long invoices flow onto further pages with repeated headings, a subtotal at each
+    page break and a separate totals page.
+    """
+    invoice_date = invoice_date or datetime.date.today().isoformat()
+    doc = _InvoiceCanvas(out_stream, client_name, project, invoice_date, invoice_number)
+    c = doc.c
+    y = doc.start_page()
+    total_cents = page_cents = count = 0
     for desc, amt in items:
-        c.drawString(30*mm,y, desc)
-        c.drawRightString(200*mm,y, f"${amt:.2f}")
-        total += amt; y -= 8*mm
+        if y < INVOICE_BOTTOM_MARGIN:
+            doc.end_page(page_cents, total_cents)
+            y, page_cents = doc.start_page(), 0
+        if not valid_amount(amt):
+            raise ValueError(f"line amount must be a finite number up to {MAX_LINE_AMOUNT:,}")
+        cents = int(round(amt * 100))
+        c.drawString(30*mm,y, _fit(c, desc, INVOICE_DESC_WIDTH))
+        c.drawRightString(200*mm,y, _money(cents))
+        total_cents += cents; page_cents += cents; count += 1
+        y -= INVOICE_ROW_HEIGHT
+    if doc.page > 1:
+        doc.end_page(page_cents, total_cents)
+        y = doc.start_page(table=False)
+        c.setFont("Helvetica",11)
+        c.drawString(30*mm, y, f"Line items: {count:,}")
+        c.drawString(30*mm, y-INVOICE_ROW_HEIGHT, f"Item pages: {doc.page - 1}")
+        y -= 2*INVOICE_ROW_HEIGHT
     c.setFont("Helvetica-Bold",12)
     c.drawString(30*mm,y-5*mm, "Total:")
-    c.drawRightString(200*mm,y-5*mm, f"${total:.2f}")
+    c.drawRightString(200*mm,y-5*mm, _money(total_cents))
     c.showPage(); c.save()
-    return total
+    return total_cents / 100
 
-def generate_invoice_pdf_bytes(items, client_name, project):
+def generate_invoice_pdf_bytes(items, client_name, project, **kwargs):
     buf = io.BytesIO()
-    invoice_pdf(items, client_name, project, buf)
+    invoice_pdf(items, client_name, project, buf, **kwargs)
     buf.seek(0); return buf.read()
 
-def generate_promo_image(title, subtitle, bg_color=(6,4,10), size=(1200,630)):
-    img = Image.new("RGB", size, bg_color)
-    draw = ImageDraw.Draw(img)
-    try:
-        font_title = ImageFont.truetype("DejaVuSans-Bold.ttf", 72)
-        font_sub = ImageFont.truetype("DejaVuSans.ttf", 36)
-    except Exception:
-        font_title = ImageFont.load_default()
-        font_sub = ImageFont.load_default()
-    w,h = draw.textsize(title, font=font_title)
-    draw.text(((size[0]-w)/2, size[1]*0.22), title, fill=(234,246,255), font=font_title)
-    w2,h2 = draw.textsize(subtitle, font=font_sub)
-    draw.text(((size[0]-w2)/2, size[1]*0.42), subtitle, fill=(139,92,246), font=font_sub)
-    footer = f"NightAnvil • {datetime.date.today().year}"
-    draw.text((20, size[1]-40), footer, fill=(153,163,179), font=font_sub)
-    out = io.BytesIO(); img.save(out, format="PNG"); out.seek(0); return out.read()
-def calc_price(hours=0, rate=0, fixed=None, margin=0.2):
-    if fixed is not None:
-        base = fixed
-    else:
-        base = hours * rate
-    return round(base * (1+margin),2)
+INVOICE_SPOOL_BYTES = 8 * 1024 * 1024
+
+def invoice_pdf_file(items, client_name, project, **kwargs):
+    """Render into a temporary file (kept in memory up to INVOICE_SPOOL_BYTES, then on disk)
+    rewound and ready to stream, e.g. with send_file."""
+    out = tempfile.SpooledTemporaryFile(max_size=INVOICE_SPOOL_BYTES)
+    invoice_pdf(items, client_name, project, out, **kwargs)
+    out.seek(0)
+    return out
+
+PROMO_RENDER_VERSION = promo.RENDER_VERSION
+promo_cache = promo.cache
+
+def generate_promo_image(title, subtitle, bg_color=promo.BG_COLOR, size=promo.BASE_SIZE, year=None, profile="final"):
+    """One PNG at `size`; gigforge.promo renders whole sets of sizes and formats in one pass."""
+    variant = promo.Variant(f"{size[0]}x{size[1]}", *size)
+    return promo.render(title, subtitle, [variant], ("png",), profile, bg_color, year)[0].data
+
+def cached_promo_image(title, subtitle, bg_color=promo.BG_COLOR, size=promo.BASE_SIZE):
+    """generate_promo_image through the promo cache; returns (Entry, hit)."""
+    variant = promo.Variant(f"{size[0]}x{size[1]}", *size)
+    _, entry, hit = promo.cached_render(title, subtitle, [variant], ("png",), "final", bg_color)[0]
+    return entry, hit
+
+def warm():
+    """Load the PDF/imaging libraries, fonts and templates now rather than on first use."""
+    from reportlab.pdfgen import canvas  # noqa: F401
+    promo.warm()
+    pricing.warm()
+    for ch in map(chr, range(32, 127)):
+        _char_width(ch, "Helvetica", 10)
+    precompile_templates()
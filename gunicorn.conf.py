@@ -0,0 +1,41 @@
+"""Gunicorn settings, picked up automatically when gunicorn starts from the repo root.
+
+With preload (the default), the master imports the app, calls app.warm() to load
+reportlab, Pillow, stripe and requests plus fonts and templates, and then forks.
+Workers share those pages copy-on-write instead of each loading them again.
+Set GUNICORN_PRELOAD=0 to load the app in each worker, e.g. for --reload in development.
+"""
+import gc
+import os
+
+preload_app = os.getenv("GUNICORN_PRELOAD", "1") == "1"
+
+def on_starting(server):
+    # Fingerprinted, precompressed static files for asset_url(); milliseconds for this tree.
+    if os.getenv("ASSET_BUILD_ON_START", "1") == "1":
+        from gigforge import assets
+        assets.build()
+    # Metric snapshots left by a previous run's workers would otherwise be merged into /metrics.
+    metrics_dir = os.getenv("METRICS_DIR")
+    if metrics_dir and os.path.isdir(metrics_dir):
+        for name in os.listdir(metrics_dir):
+            if name.startswith("metrics-"):
+                os.remove(os.path.join(metrics_dir, name))
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+        app.warm()
+        # Move everything loaded so far out of the GC's reach so collections in the
+        # workers don't write to (and un-share) those pages.
+        gc.collect()
+        gc.freeze()
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        # Never share pooled DB connections across processes.
+        from app import app as flask_app
+        from gigforge.engines import all_engines
+        from gigforge.models import db
+        for engine in all_engines(flask_app, db):
+            engine.dispose(close=False)
@@ -0,0 +1,61 @@
+"""normalized usernames and api tokens
+
+Revision ID: 0003_auth_tokens
+Revises: 0002_listing_indexes
+Create Date: 2026-10-18 12:05:41.118230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from gigforge.models import normalize_username
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_auth_tokens'
+down_revision = '0002_listing_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('api_token',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=120), nullable=True),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_used_at', sa.DateTime(), nullable=True),
+    sa.Column('revoked_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    with op.batch_alter_table('api_token', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_api_token_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('username_key', sa.String(length=120), nullable=True))
+
+    # Backfill with the same normalization the app uses. Usernames that only differ by
+    # case/width make the unique index below fail: rename one of them first.
+    conn = op.get_bind()
+    user = sa.table('user', sa.column('id', sa.Integer), sa.column('username', sa.String),
+                    sa.column('username_key', sa.String))
+    rows = conn.execute(sa.select(user.c.id, user.c.username)).all()
+    for user_id, username in rows:
+        conn.execute(user.update().where(user.c.id == user_id).values(username_key=normalize_username(username)))
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_username_key'), ['username_key'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_username_key'))
+        batch_op.drop_column('username_key')
+
+    with op.batch_alter_table('api_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_api_token_user_id'))
+
+    op.drop_table('api_token')
@@ -0,0 +1,31 @@
+"""full-text search index
+
+Revision ID: 0005_search_index
+Revises: 0004_gig_pricing_inputs
+Create Date: 2026-10-18 15:02:27.631904
+
+"""
+from alembic import op
+
+from gigforge import search
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_search_index'
+down_revision = '0004_gig_pricing_inputs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 table + triggers on SQLite, generated tsvector columns + GIN indexes on
+    # PostgreSQL; existing rows are indexed here. SQLite batch_alter_table recreates a
+    # table without its triggers: later migrations touching gig/client/invoice/invoice_item
+    # must call search.install() again.
+    conn = op.get_bind()
+    if search.install(conn):
+        search.rebuild(conn)
+
+
+def downgrade():
+    search.uninstall(op.get_bind())
@@ -0,0 +1,35 @@
+"""invoice amount in cents
+
+Revision ID: 0006_invoice_amount_cents
+Revises: 0005_search_index
+Create Date: 2026-10-18 17:40:12.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from gigforge import search
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_invoice_amount_cents'
+down_revision = '0005_search_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch_alter_table so SQLite keeps the search triggers.
+    # The daily revenue rollups are not backfilled here: run `flask rebuild-rollups`.
+    op.add_column('invoice', sa.Column('amount_cents', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE invoice SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT) WHERE amount IS NOT NULL")
+
+
+def downgrade():
+    # SQLite recreates the table, which its search triggers would block; re-index afterwards.
+    conn = op.get_bind()
+    search.uninstall(conn)
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.drop_column('amount_cents')
+    if search.install(conn):
+        search.rebuild(conn)
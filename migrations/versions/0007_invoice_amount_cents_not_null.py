@@ -0,0 +1,40 @@
+"""invoice amount_cents not null
+
+Revision ID: 0007_amount_cents_not_null
+Revises: 0006_invoice_amount_cents
+Create Date: 2026-10-18 21:05:44.530127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from gigforge import search
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_amount_cents_not_null'
+down_revision = '0006_invoice_amount_cents'
+branch_labels = None
+depends_on = None
+
+
+def _alter_invoice(nullable):
+    # SQLite recreates the table, which its search triggers would block; re-index afterwards.
+    conn = op.get_bind()
+    sqlite = conn.dialect.name == 'sqlite'
+    if sqlite:
+        search.uninstall(conn)
+    with op.batch_alter_table('invoice', schema=None) as batch_op:
+        batch_op.alter_column('amount_cents', existing_type=sa.BigInteger(), nullable=nullable)
+    if sqlite and search.install(conn):
+        search.rebuild(conn)
+
+
+def upgrade():
+    # Rows written since 0006 by code that skipped the ORM listener.
+    op.execute("UPDATE invoice SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT) WHERE amount_cents IS NULL")
+    _alter_invoice(nullable=False)
+
+
+def downgrade():
+    _alter_invoice(nullable=True)
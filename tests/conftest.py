@@ -0,0 +1,38 @@
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("STRIPE_WEBHOOK_SECRET", "whsec_test")
+
+import pytest
+
+from app import app as flask_app
+from gigforge import auth
+from gigforge.models import db, User
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True)
+    auth.user_cache.invalidate()
+    auth.login_throttle.clear(); auth.address_throttle.clear()
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def user(app):
+    u = User(username="alice", email="alice@example.com", business_name="Alice Co")
+    u.set_password("pw")
+    db.session.add(u)
+    db.session.commit()
+    return u
+
+
+@pytest.fixture
+def client(app, user):
+    c = app.test_client()
+    c.post("/login", data={"username": "alice", "password": "pw"})
+    return c
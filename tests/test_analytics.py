@@ -0,0 +1,86 @@
+from datetime import datetime
+
+import pytest
+
+from gigforge import analytics
+from gigforge.models import db, Client, Invoice, User
+
+
+def _invoice(user, client, amount, status, created, paid=None):
+    inv = Invoice(user_id=user.id, client_id=client.id, project="P", amount=amount, status=status,
+                  created_at=created, paid_at=paid)
+    db.session.add(inv)
+    return inv
+
+
+@pytest.fixture
+def book(user):
+    acme, beta, idle = (Client(user_id=user.id, name=n) for n in ("Acme", "Beta", "Idle"))
+    db.session.add_all([acme, beta, idle])
+    db.session.commit()
+    _invoice(user, acme, 100.10, "paid", datetime(2024, 1, 30), datetime(2024, 2, 5))
+    _invoice(user, acme, 50, "paid", datetime(2024, 2, 1), datetime(2024, 2, 6))
+    _invoice(user, beta, 20, "paid", datetime(2024, 4, 2), datetime(2024, 4, 3))
+    _invoice(user, beta, 70, "sent", datetime(2024, 4, 10))
+    _invoice(user, acme, 30, "sent", datetime(2024, 1, 1))
+    _invoice(user, beta, 5, "draft", datetime(2024, 4, 11))
+    db.session.commit()
+    return acme, beta, idle
+
+
+def test_revenue_series_buckets_and_fills(book, user):
+    month = analytics.revenue_series(user.id, "month", "2024-01-01", "2024-05-31")
+    assert [(p["period"], p["amount_cents"]) for p in month["points"]] == [
+        ("2024-01", 0), ("2024-02", 15010), ("2024-03", 0), ("2024-04", 2000), ("2024-05", 0)]
+    assert (month["total_cents"], month["count"]) == (17010, 3)
+
+    week = analytics.revenue_series(user.id, "week", "2024-02-01", "2024-02-29", fill=False)
+    assert week["points"] == [{"period": "2024-02-05", "count": 2, "amount_cents": 15010}]  # Monday
+    invoiced = analytics.revenue_series(user.id, "day", "2024-04-01", "2024-04-30", "invoiced", fill=False)
+    assert [p["period"] for p in invoiced["points"]] == ["2024-04-02", "2024-04-10", "2024-04-11"]
+
+    # rollups follow edits: un-paying an invoice removes it from revenue
+    inv = Invoice.query.filter_by(amount=20).one()
+    inv.status = "sent"
+    db.session.commit()
+    assert analytics.revenue_series(user.id, "month", "2024-04-01", "2024-04-30")["total_cents"] == 0
+
+    with pytest.raises(analytics.AnalyticsError):
+        analytics.revenue_series(user.id, "year")
+    with pytest.raises(analytics.AnalyticsError):
+        analytics.revenue_series(user.id, "day", "1900-01-01", "2024-01-01")
+
+
+def test_aging_lifetime_value_and_funnel(book, user):
+    acme, beta, idle = book
+    aging = analytics.aging(user.id, as_of=datetime(2024, 4, 20))
+    assert [(b["days"], b["count"], b["amount_cents"]) for b in aging["buckets"]] == [
+        ("0-30", 1, 7000), ("31-60", 0, 0), ("61-90", 0, 0), ("91+", 1, 3000)]
+
+    clients = analytics.client_lifetime_value(user.id)
+    assert [(c["name"], c["paid_cents"], c["invoiced_cents"]) for c in clients] == [
+        ("Acme", 15010, 18010), ("Beta", 2000, 9500), ("Idle", 0, 0)]
+    assert clients[0]["average_paid_cents"] == 7505
+
+    stages = analytics.funnel(user.id)["stages"]
+    assert [(s["stage"], s["count"]) for s in stages] == [("draft", 6), ("sent", 5), ("paid", 3)]
+    assert stages[2]["conversion"] == 0.6
+    assert analytics.funnel(user.id, "2024-04-01", "2024-04-30")["stages"][0]["count"] == 3
+
+
+def test_analytics_api(book, client, user):
+    other = User(username="bob", email="bob@example.com")
+    other.set_password("pw")
+    db.session.add(other)
+    db.session.commit()
+    _invoice(other, Client.query.first(), 999, "paid", datetime(2024, 2, 1), datetime(2024, 2, 1))
+    db.session.commit()
+
+    resp = client.get("/api/analytics/revenue?interval=month&start=2024-02-01&end=2024-02-29")
+    assert resp.get_json()["points"] == [{"period": "2024-02", "count": 2, "amount_cents": 15010}]
+    assert client.get("/api/analytics/revenue?interval=hour").status_code == 400
+    assert client.get("/api/analytics/revenue?start=soon").status_code == 400
+    assert client.get("/api/analytics/aging").get_json()["count"] == 2
+    assert client.get("/api/analytics/clients?limit=1").get_json()[0]["name"] == "Acme"
+    assert client.get("/api/analytics/clients?limit=0").status_code == 400
+    assert client.get("/api/analytics/funnel").get_json()["stages"][-1]["count"] == 3
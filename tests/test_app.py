@@ -0,0 +1,75 @@
+import json
+from gigforge.models import db, Client, Invoice
+
+
+def test_dashboard_shows_rollups_and_recent_invoices(client, user):
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add(c)
+    db.session.commit()
+    for i in range(8):
+        db.session.add(Invoice(user_id=user.id, client_id=c.id, project=f"Proj{i}", amount=10, status="paid"))
+    db.session.commit()
+
+    html = client.get("/dashboard").get_data(as_text=True)
+    assert "$80.00" in html
+    assert html.count("Acme") == 5
+
+
+def test_promo_conditional_get(app):
+    c = app.test_client()
+    first = c.get("/api/generate_promo?title=Etag")
+    assert first.status_code == 200 and first.headers["ETag"]
+    again = c.get("/api/generate_promo?title=Etag", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304 and again.headers["X-Cache"] == "MEMORY"
+
+
+def test_stored_invoice_pdf(client, user):
+    from gigforge.models import InvoiceItem
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add(c)
+    db.session.commit()
+    inv = Invoice(user_id=user.id, client_id=c.id, project="Big", amount=0)
+    inv.items = [InvoiceItem(description=f"Item {i}", amount=1) for i in range(60)]
+    db.session.add(inv)
+    db.session.commit()
+    resp = client.get(f"/invoices/{inv.id}/pdf")
+    assert resp.status_code == 200 and resp.data.startswith(b"%PDF") and b"/Count 4" in resp.data
+    assert client.get(f"/invoices/{inv.id + 1}/pdf").status_code == 404
+
+
+def test_create_app_builds_independent_apps():
+    from app import create_app
+    a, b = create_app({"TESTING": True}), create_app()
+    assert a is not b and a.config["TESTING"] and "main.dashboard" in a.view_functions
+
+
+def test_heavy_libraries_load_lazily():
+    import subprocess, sys
+    code = ("import sys, app; "
+            "print([m for m in ('reportlab.pdfgen', 'PIL.Image', 'stripe', 'requests', 'alembic') if m in sys.modules])")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env={**__import__("os").environ, "DATABASE_URL": "sqlite://"})
+    assert out.stdout.strip() == "[]"
+
+
+def test_documents_batch_streams_ndjson(client):
+    body = "\n".join(json.dumps({"client": f"C{i}", "project": "Site"}) for i in range(3)) + "\n[oops\n"
+    resp = client.post("/api/documents/batch?documents=contract", data=body,
+                       content_type="application/x-ndjson")
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert resp.mimetype == "application/x-ndjson"
+    assert [set(line) for line in lines[:3]] == [{"index", "contract"}] * 3
+    assert "FREELANCE SERVICE AGREEMENT" in lines[0]["contract"]
+    assert lines[3]["index"] == 3 and "error" in lines[3]
+    assert client.post("/api/documents/batch?documents=brochure", json=[]).status_code == 400
+
+
+def test_invoice_form_skips_non_finite_and_huge_amounts(app):
+    import pytest
+    from gigforge import utils
+    resp = app.test_client().post("/generate_invoice", data={
+        "client": "Acme", "project": "Site", "items": "Web:nan,Ops:inf,Neg:-inf,Big:1e308,Dev:120.5"})
+    assert resp.status_code == 200 and resp.data.startswith(b"%PDF")
+    for amount in (float("nan"), float("inf"), 1e308):
+        with pytest.raises(ValueError):
+            utils.invoice_pdf_file([("Web", amount)], "Acme", "Site")
@@ -0,0 +1,47 @@
+import gzip, re
+
+import pytest
+
+from gigforge import assets
+
+
+@pytest.fixture
+def built(tmp_path, monkeypatch):
+    monkeypatch.setattr(assets, "ASSET_BUILD_DIR", str(tmp_path / "dist"))
+    manifest = assets.build()
+    yield manifest
+    assets.clean()
+
+
+def test_build_fingerprints_and_precompresses(built, tmp_path):
+    entry = built["static/css/night_theme.css"]
+    assert re.fullmatch(r"static/css/night_theme\.[0-9a-f]{12}\.css", entry["file"])
+    out = tmp_path / "dist" / entry["file"]
+    assert gzip.decompress((tmp_path / "dist" / (entry["file"] + ".gz")).read_bytes()) == out.read_bytes()
+    assert entry["gz"] < entry["bytes"]
+    assert assets.build() == built
+    assert assets.asset_url("/assets/nightanvil.svg") == "/" + built["assets/nightanvil.svg"]["file"]
+
+
+def test_serves_hashed_assets_by_accept_encoding(app, built):
+    brotli = pytest.importorskip("brotli")
+    c = app.test_client()
+    url = re.search(r'href="(/static/css/[^"]+)"', c.get("/").get_data(as_text=True)).group(1)
+    assert url == "/" + built["static/css/night_theme.css"]["file"]
+    br = c.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert br.content_encoding == "br" and br.mimetype == "text/css"
+    assert "immutable" in br.headers["Cache-Control"] and "Accept-Encoding" in br.headers["Vary"]
+    plain = c.get(url, headers={"Accept-Encoding": "identity"})
+    assert plain.content_encoding is None and brotli.decompress(br.data) == plain.data
+    assert c.get(url, headers={"Accept-Encoding": "gzip"}).content_encoding == "gzip"
+
+
+def test_source_fallback_and_page_etags(app):
+    c = app.test_client()
+    css = c.get("/static/css/night_theme.css")
+    assert css.status_code == 200 and "no-cache" in css.headers["Cache-Control"]
+    assert c.get("/assets/night_compact.svg").mimetype == "image/svg+xml"
+    assert c.get("/static/../app.py").status_code == 404
+    page = c.get("/login")
+    assert page.headers["ETag"] and "private" in page.headers["Cache-Control"]
+    assert c.get("/login", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
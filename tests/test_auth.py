@@ -0,0 +1,93 @@
+import re
+
+from flask import g
+from sqlalchemy import event
+
+from gigforge import auth
+from gigforge.models import db, User
+
+
+def _count_user_selects(app):
+    seen = []
+    def listener(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT") and re.search(r"FROM user\b", statement):
+            seen.append(statement)
+    event.listen(db.engine, "before_cursor_execute", listener)
+    return seen, lambda: event.remove(db.engine, "before_cursor_execute", listener)
+
+
+def test_session_user_is_cached_and_evicted_on_change(app, client, user):
+    assert client.get("/api/invoices").status_code == 200
+    seen, stop = _count_user_selects(app)
+    try:
+        assert client.get("/api/invoices").status_code == 200
+        assert client.get("/dashboard").status_code == 200
+        assert seen == []
+        user.business_name = "Renamed Co"
+        db.session.commit()
+        assert b"Renamed Co" in client.get("/dashboard").data
+        assert len(seen) == 1
+    finally:
+        stop()
+
+
+def test_login_uses_normalized_username(app, user):
+    c = app.test_client()
+    assert c.post("/login", data={"username": "  ALICE ", "password": "pw"}).status_code == 302
+    assert app.test_client().post("/register", data={"username": "Alice", "email": "x@example.com",
+                                                      "password": "pw"}).status_code == 200
+    assert User.query.count() == 1
+
+
+def test_login_flood_is_refused_before_hashing(app, user, monkeypatch):
+    calls = []
+    real = User.check_password
+    monkeypatch.setattr(User, "check_password", lambda self, pw: calls.append(pw) or real(self, pw))
+    c = app.test_client()
+    for _ in range(auth.LOGIN_MAX_FAILURES):
+        assert c.post("/login", data={"username": "alice", "password": "nope"}).status_code == 200
+    resp = c.post("/login", data={"username": "alice", "password": "pw"})
+    assert resp.status_code == 429 and int(resp.headers["Retry-After"]) > 0
+    assert len(calls) == auth.LOGIN_MAX_FAILURES
+    # Another address is unaffected.
+    other = c.post("/login", data={"username": "alice", "password": "pw"},
+                   environ_base={"REMOTE_ADDR": "10.0.0.9"})
+    assert other.status_code == 302
+
+
+def test_address_throttle_uses_forwarded_client_behind_proxy(app, user, monkeypatch):
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    from app import create_app
+    assert isinstance(create_app({"PROXY_HOPS": 1}).wsgi_app, ProxyFix)
+    assert not isinstance(create_app({"PROXY_HOPS": 0}).wsgi_app, ProxyFix)
+    monkeypatch.setattr(app, "wsgi_app", ProxyFix(app.wsgi_app, x_for=1))
+    c = app.test_client()
+    behind = lambda addr: {"environ_base": {"REMOTE_ADDR": "10.0.0.1"}, "headers": {"X-Forwarded-For": addr}}
+    for _ in range(auth.LOGIN_MAX_FAILURES):
+        c.post("/login", data={"username": "alice", "password": "nope"}, **behind("203.0.113.5"))
+    assert c.post("/login", data={"username": "alice", "password": "pw"}, **behind("203.0.113.5")).status_code == 429
+    # Same proxy, different client: not locked out.
+    assert c.post("/login", data={"username": "alice", "password": "pw"}, **behind("198.51.100.7")).status_code == 302
+
+
+def _call(client, method, url, **kwargs):
+    g.pop("_login_user", None)  # the fixture's app context (and so `g`) outlives each request
+    return client.open(url, method=method, **kwargs)
+
+
+def test_api_token_exchange_use_and_revoke(app, user, monkeypatch):
+    c = app.test_client()
+    assert c.post("/api/tokens", json={"username": "alice", "password": "bad"}).status_code == 401
+    resp = c.post("/api/tokens", json={"username": "alice", "password": "pw", "name": "ci"})
+    assert resp.status_code == 201
+    token, token_id = resp.json["token"], resp.json["id"]
+
+    monkeypatch.setattr(User, "check_password", lambda *a: 1 / 0)  # never hashed again
+    api = app.test_client()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert _call(api, "GET", "/api/invoices", headers=headers).status_code == 200
+    assert _call(api, "GET", "/api/tokens", headers=headers).json[0]["last_used_at"] is not None
+    assert _call(api, "GET", "/api/invoices", headers={"Authorization": "Bearer na_wrong"}).status_code == 302
+
+    assert _call(api, "DELETE", f"/api/tokens/{token_id}", headers=headers).json["revoked"] is True
+    assert _call(api, "GET", "/api/invoices", headers=headers).status_code == 302
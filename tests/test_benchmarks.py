@@ -0,0 +1,32 @@
+from benchmarks import suite
+from benchmarks.seed import Scale
+from gigforge import fiverr_api, payments
+from gigforge.models import Invoice, InvoiceItem, UserStats
+
+
+def test_suite_runs_every_case_offline(app):
+    real_stripe = payments.get_stripe
+    results = suite.run(app, Scale(users=1, clients=2, invoices=10, items=2, gigs=3), repeat=2)
+    assert set(results["results"]) == set(suite.CASES)
+    assert all(r["n"] == 2 and r["median_ms"] > 0 for r in results["results"].values())
+    assert payments.get_stripe is real_stripe and "127.0.0.1" not in fiverr_api.FIVERR_API_URL
+
+
+def test_seed_is_deterministic(app):
+    from benchmarks.seed import seed
+    from gigforge import models
+    scale = Scale(users=2, clients=2, invoices=5, items=3, gigs=2)
+    assert seed(models.db, models, scale) == ["bench0", "bench1"]
+    snapshot = [(i.amount, i.status) for i in Invoice.query.order_by(Invoice.id)]
+    assert InvoiceItem.query.count() == 30 and models.db.session.get(UserStats, 1).invoice_count == 5
+    models.db.drop_all(); models.db.create_all()
+    seed(models.db, models, scale)
+    assert [(i.amount, i.status) for i in Invoice.query.order_by(Invoice.id)] == snapshot
+
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = {"results": {"a": {"median_ms": 10.0}, "b": {"median_ms": 10.0}, "c": {"median_ms": 10.0}}}
+    current = {"results": {"a": {"median_ms": 13.0}, "b": {"median_ms": 11.0}, "c": {"median_ms": 5.0},
+                           "d": {"median_ms": 1.0}}}
+    verdicts = {row[0]: row[4] for row in suite.compare(current, baseline, threshold=0.25)}
+    assert verdicts == {"a": "regression", "b": "ok", "c": "improved", "d": "new"}
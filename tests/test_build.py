@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from gigforge import build
+
+
+def _manifest(tmp_path, artifacts, name="manifest.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps({"defaults": {"client": "Acme"}, "artifacts": artifacts}))
+    return str(path)
+
+
+ARTIFACTS = [
+    {"type": "proposal", "out": "out/p1.md", "project": "Site", "hours": 10, "rate": 50},
+    {"type": "invoice", "out": "out/i1.pdf", "items": [{"desc": "Work", "amount": 100}], "date": "2024-01-02"},
+    {"type": "promo", "out": "out/promo.png", "title": "Gig", "size": [300, 160]},
+    {"type": "gig", "out": "out/gig.txt", "title": "Logo", "fixed": 100},
+]
+
+
+@pytest.mark.parametrize("jobs", [0, 2])
+def test_build_renders_then_skips_unchanged(tmp_path, jobs):
+    specs = build.load_manifest(_manifest(tmp_path, ARTIFACTS))
+    state = str(tmp_path / build.STATE_FILE)
+    report = build.build(specs, state, jobs=jobs)
+    assert len(report.built) == 4 and not report.failed
+    assert (tmp_path / "out/i1.pdf").read_bytes().startswith(b"%PDF")
+    assert "Acme" in (tmp_path / "out/p1.md").read_text()
+
+    again = build.build(specs, state, jobs=jobs)
+    assert not again.built and len(again.skipped) == 4
+
+    changed = [dict(a, hours=20) if a["type"] == "proposal" else a for a in ARTIFACTS]
+    (tmp_path / "out/gig.txt").unlink()
+    report = build.build(build.load_manifest(_manifest(tmp_path, changed)), state, jobs=jobs)
+    assert sorted(s["type"] for s, _, _ in report.built) == ["gig", "proposal"]
+    assert build.summary_lines(report)[0].startswith("built 2, skipped 2 (up to date), failed 0")
+
+
+def test_template_and_renderer_version_are_part_of_the_fingerprint(tmp_path, monkeypatch):
+    spec = build.load_manifest(_manifest(tmp_path, ARTIFACTS[:1]))[0]
+    before = build.fingerprint(spec)
+    monkeypatch.setattr(build, "_template_digest", lambda name: "edited")
+    assert build.fingerprint(spec) != before
+    monkeypatch.undo()
+    monkeypatch.setitem(build.RENDERERS, "proposal", build.Renderer(build.render_proposal, 2, ("proposal.md.j2",), "%Y-%m-%d"))
+    assert build.fingerprint(spec) != before
+
+
+def test_editing_a_renderers_source_modules_changes_its_fingerprint(tmp_path, monkeypatch):
+    specs = build.load_manifest(_manifest(tmp_path, ARTIFACTS))
+    before = {s["type"]: build.fingerprint(s) for s in specs}
+    real = build._source_digest
+    monkeypatch.setattr(build, "_source_digest", lambda m: "edited" if m == "gigforge.pricing" else real(m))
+    after = {s["type"]: build.fingerprint(s) for s in specs}
+    # pricing feeds the proposal and gig prices, not invoices or promo images
+    assert {k for k in before if before[k] != after[k]} == {"proposal", "gig"}
+
+
+def test_jsonl_manifest_and_failures(tmp_path):
+    path = tmp_path / "m.jsonl"
+    path.write_text('{"type": "gig", "out": "a.txt", "title": "A"}\n\n{"type": "promo", "out": "b.png"}\n')
+    report = build.build(build.load_manifest(str(path)), str(tmp_path / "state.json"), jobs=0)
+    assert len(report.built) == 1 and "KeyError" in report.failed[0][1]
+    assert list(json.loads((tmp_path / "state.json").read_text())) == [str(tmp_path / "a.txt")]
+    with pytest.raises(build.ManifestError):
+        build.load_manifest(_manifest(tmp_path, [{"type": "brochure", "out": "x"}]))
+
+
+def test_yaml_manifest(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "m.yaml"
+    path.write_text("defaults:\n  fixed: 50\nartifacts:\n  - {type: gig, out: g.txt, title: Copywriting}\n")
+    build.build(build.load_manifest(str(path)), str(tmp_path / "state.json"), jobs=0)
+    assert "$60.0" in (tmp_path / "g.txt").read_text()
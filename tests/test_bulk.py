@@ -0,0 +1,52 @@
+import io
+import json
+
+from gigforge import bulk
+from gigforge.models import db, Client, Invoice, InvoiceItem, UserStats
+
+
+def _client(user):
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add(c)
+    db.session.commit()
+    return c
+
+
+def test_bulk_create_validates_and_inserts(user):
+    c = _client(user)
+    records = [
+        {"client_id": c.id, "project": "A", "items": [{"desc": "Dev", "amount": 100}, {"desc": "QA", "amount": 20.5}]},
+        {"client_id": 999, "project": "B"},
+        {"client_id": c.id, "project": "C", "status": "paid", "items": [{"desc": "X", "amount": 10}]},
+    ]
+    results = bulk.bulk_create_invoices(user.id, records, chunk_size=1)
+    assert [r["status"] for r in results] == ["created", "error", "created"]
+    assert results[1]["errors"] == ["unknown client_id"]
+
+    inv = db.session.get(Invoice, results[0]["invoice_id"])
+    assert (inv.project, inv.amount) == ("A", 120.5)
+    assert sorted(i.description for i in inv.items) == ["Dev", "QA"]
+    stats = db.session.get(UserStats, user.id)
+    assert (stats.invoice_count, stats.paid_revenue_cents) == (2, 1000)
+
+
+def test_atomic_mode_writes_nothing_on_error(user):
+    c = _client(user)
+    results = bulk.bulk_create_invoices(user.id, [{"client_id": c.id}, {"client_id": c.id, "status": "void"}],
+                                        atomic=True)
+    assert [r["status"] for r in results] == ["skipped", "error"]
+    assert Invoice.query.count() == 0 and InvoiceItem.query.count() == 0
+
+
+def test_bulk_endpoint_accepts_ndjson(client, user):
+    c = _client(user)
+    body = "\n".join(json.dumps({"client_id": c.id, "project": f"P{i}", "items": [{"desc": "d", "amount": i}]})
+                     for i in range(5))
+    resp = client.post("/api/invoices/bulk?chunk_size=2", data=body, content_type="application/x-ndjson")
+    assert resp.status_code == 201 and resp.json["created"] == 5
+    assert Invoice.query.count() == 5 and InvoiceItem.query.count() == 5
+
+
+def test_iter_records_reads_array_or_ndjson():
+    assert list(bulk.iter_records(io.StringIO('[{"a": 1}, {"a": 2}]'))) == [{"a": 1}, {"a": 2}]
+    assert list(bulk.iter_records(io.StringIO('{"a": 1}\n\n{"a": 2}\n'))) == [{"a": 1}, {"a": 2}]
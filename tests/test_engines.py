@@ -0,0 +1,55 @@
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from gigforge import auth, engines
+from gigforge.models import db, Client, Invoice, User
+
+
+def _pragma(app, name):
+    with app.app_context():
+        return db.session.execute(db.text(f"PRAGMA {name}")).scalar()
+
+
+def test_sqlite_profile_sets_pragmas_on_connect(tmp_path):
+    tuned = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'tuned.db'}"})
+    assert _pragma(tuned, "journal_mode") == "wal"
+    assert _pragma(tuned, "synchronous") == 1  # NORMAL
+    assert _pragma(tuned, "busy_timeout") == engines.SQLITE_BUSY_TIMEOUT_MS
+    plain = create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'plain.db'}", "DB_PROFILE": "off"})
+    assert _pragma(plain, "journal_mode") == "delete"
+
+
+def test_postgres_profile_options():
+    options = engines.engine_options("postgresql+psycopg2://u:p@db/nightanvil")
+    assert options["pool_pre_ping"] and options["pool_size"] == engines.DB_POOL_SIZE
+    assert "connect_args" not in options
+    assert engines.engine_options("postgresql+psycopg://u:p@db/nightanvil")["connect_args"] == {
+        "prepare_threshold": engines.DB_PREPARE_THRESHOLD}
+    assert engines.engine_options("sqlite://", "off") == {}
+
+
+def test_read_only_views_use_the_replica(tmp_path):
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+                      "DATABASE_REPLICA_URL": f"sqlite:///{tmp_path / 'replica.db'}"})
+    auth.user_cache.invalidate()
+    alice = {"id": 1, "username": "alice", "username_key": "alice", "email": "a@example.com",
+             "password_hash": generate_password_hash("pw")}
+    with app.app_context():
+        for engine in engines.all_engines(app, db):
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(db.insert(User), alice)
+                conn.execute(db.insert(Client), {"id": 1, "user_id": 1, "name": f"On {engine.url.database[-10:]}"})
+    c = app.test_client()
+    try:
+        assert c.post("/login", data={"username": "alice", "password": "pw"}).status_code == 302
+        assert [row["name"] for row in c.get("/api/clients").get_json()["data"]] == ["On replica.db"]
+        assert c.post("/api/invoices/new", json={"client_id": 1, "project": "Site", "items": [{"desc": "Work", "amount": 10}]}
+                      ).get_json()["status"] == "success"
+        with app.app_context():
+            primary, replica = db.engine, engines.replica_engine()
+            count = db.select(db.func.count(Invoice.id))
+            with primary.connect() as p, replica.connect() as r:
+                assert (p.execute(count).scalar(), r.execute(count).scalar()) == (1, 0)
+    finally:
+        auth.user_cache.invalidate()
@@ -0,0 +1,123 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from gigforge import fiverr_api, fiverr_sync, jobs
+from gigforge.models import db, Gig, Job
+
+
+class FakeFiverr(BaseHTTPRequestHandler):
+    """Stand-in for the Fiverr API: fails the first call with 503, then accepts everything."""
+    calls = []
+    remote_gigs = []
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.calls.append(("POST", self.path, payload["title"]))
+        if len(self.calls) == 1:
+            return self._reply(503, {"error": "busy"})
+        gig_id = f"fv-{payload['title']}"
+        self._reply(201, {"gig_id": gig_id, "url": f"https://fiverr.test/{gig_id}"})
+
+    def do_PUT(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.calls.append(("PUT", self.path, None))
+        self._reply(200, {"url": "https://fiverr.test/updated"})
+
+    def do_GET(self):
+        self.calls.append(("GET", self.path, None))
+        self._reply(200, {"gigs": self.remote_gigs})
+
+
+@pytest.fixture
+def fake_fiverr(monkeypatch):
+    FakeFiverr.calls, FakeFiverr.remote_gigs = [], []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeFiverr)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(fiverr_api, "FIVERR_API_URL", f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(fiverr_api, "FIVERR_API_KEY", "key")
+    monkeypatch.setattr(fiverr_api, "FIVERR_SELLER_ID", "seller")
+    monkeypatch.setattr(fiverr_api, "_retry_delay", lambda *a: 0)
+    yield FakeFiverr
+    server.shutdown()
+
+
+def test_bulk_sync_retries_and_skips_unchanged(user, fake_fiverr):
+    db.session.add_all([Gig(user_id=user.id, title=f"g{i}", price=10 + i) for i in range(5)])
+    db.session.commit()
+    engine = fiverr_sync.SyncEngine(max_workers=4, rate=0)
+
+    summary = fiverr_sync.sync_draft_gigs(user.id, engine=engine)
+    assert summary == {"synced": 5, "failed": 0, "errors": {}}
+    assert len(fake_fiverr.calls) == 6  # one 503 retried
+    assert all(g.status == "fiverr_sync" and g.fiverr_gig_id for g in Gig.query)
+
+    assert fiverr_sync.sync_draft_gigs(user.id, engine=engine)["synced"] == 0
+    gig = Gig.query.filter_by(title="g2").one()
+    gig.price = 99
+    db.session.commit()
+    assert fiverr_sync.sync_draft_gigs(user.id, engine=engine)["synced"] == 1
+    assert fake_fiverr.calls[-1][:2] == ("PUT", "/gig/fv-g2")
+
+
+def test_pull_skips_unchanged_remote_gigs(user, fake_fiverr):
+    db.session.add_all([Gig(user_id=user.id, title=f"g{i}", price=10) for i in range(2)])
+    db.session.commit()
+    engine = fiverr_sync.SyncEngine(rate=0)
+    fiverr_sync.sync_draft_gigs(user.id, engine=engine)
+    synced_at = Gig.query.first().fiverr_synced_at
+    fake_fiverr.remote_gigs = [
+        {"gig_id": "fv-g0", "title": "g0 renamed", "updated_at": "2999-01-01T00:00:00Z"},
+        {"gig_id": "fv-g1", "title": "stale", "updated_at": synced_at.replace(year=2000).isoformat()},
+    ]
+    assert fiverr_sync.pull_gigs(user.id, engine=engine) == {"updated": 1, "skipped": 1}
+    assert {g.title for g in Gig.query} == {"g0 renamed", "g1"}
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = fiverr_sync.RateLimiter(rate=50, burst=1)
+    import time
+    t0 = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - t0 >= 0.09
+
+
+def test_bulk_sync_endpoint_queues_job(client, user, fake_fiverr):
+    db.session.add(Gig(user_id=user.id, title="queued", price=5))
+    db.session.commit()
+    resp = client.post("/gigs/sync-fiverr", json={})
+    assert resp.status_code == 202
+    jobs.run_worker(once=True, processes=0)
+    status = client.get(resp.json["status_url"]).json
+    assert status["status"] == "done" and status["result"]["synced"] == 1
+
+
+def test_single_gig_sync_is_queued_not_inline(client, user, fake_fiverr):
+    gigs = [Gig(user_id=user.id, title=t, price=5) for t in ("one", "other")]
+    db.session.add_all(gigs)
+    db.session.commit()
+    resp = client.post(f"/gigs/{gigs[0].id}/sync-fiverr")
+    assert resp.status_code == 202 and fake_fiverr.calls == []
+    jobs.run_worker(once=True, processes=0)
+    assert client.get(resp.json["status_url"]).json["result"]["synced"] == 1
+    assert {c[2] for c in fake_fiverr.calls} == {"one"}  # the first call is the fake's 503, retried
+    assert gigs[0].fiverr_gig_id and gigs[1].fiverr_gig_id is None
+
+
+def test_retry_after_is_capped():
+    response = type("R", (), {"headers": {"Retry-After": "3600"}})()
+    assert fiverr_api._retry_delay(0, 0.5, response) == fiverr_api.MAX_RETRY_AFTER
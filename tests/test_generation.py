@@ -0,0 +1,105 @@
+import threading, time
+
+import pytest
+
+from gigforge import generation, jobs
+from gigforge.models import db, Gig, Job
+from gigforge.render_cache import RenderCache
+
+
+class FakeBackend:
+    """Records each batch; blocks until `release` is set so tests can pile up requests."""
+    name, model = "fake", "test"
+
+    def __init__(self, block=False):
+        self.calls = []
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def complete(self, prompts):
+        self.calls.append([p.title for p in prompts])
+        self.release.wait(5)
+        return [f"about {p.title} ({p.bullets})" for p in prompts]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(generation, "_service", generation.GenerationService(backend, RenderCache(), batch_size=3))
+    return backend
+
+
+def test_caches_coalesces_and_batches(tmp_path):
+    backend = FakeBackend(block=True)
+    svc = generation.GenerationService(backend, RenderCache(disk_dir=str(tmp_path), suffix=".txt", ttl=60),
+                                       batch_size=3, max_concurrency=1)
+    first = svc.submit("Logo design")
+    while not backend.calls:  # let the first call start before queueing more
+        time.sleep(0.001)
+    waiting = [svc.submit("Logo  design") for _ in range(3)]  # same prompt, already in flight
+    many = svc.submit_many([f"Gig {i}" for i in range(5)])
+    backend.release.set()
+    assert {f.result(5) for f in [first, *waiting]} == {"about Logo design (3)"}
+    assert [f.result(5) for f in many][4] == "about Gig 4 (3)"
+    assert backend.calls == [["Logo design"], ["Gig 0", "Gig 1", "Gig 2"], ["Gig 3", "Gig 4"]]
+    assert svc.stats()["coalesced"] == 3 and svc.stats()["inflight"] == 0
+
+    restarted = generation.GenerationService(backend, RenderCache(disk_dir=str(tmp_path), suffix=".txt", ttl=60))
+    assert restarted.generate_many(["Gig 3", "Logo design"]) == ["about Gig 3 (3)", "about Logo design (3)"]
+    assert len(backend.calls) == 3 and restarted.stats()["cache"]["disk_hits"] == 2
+
+
+def test_backend_errors_reach_every_waiter_and_are_not_cached():
+    class Broken(FakeBackend):
+        def complete(self, prompts):
+            self.calls.append(len(prompts))
+            raise ValueError("boom")
+    backend = Broken()
+    svc = generation.GenerationService(backend, RenderCache())
+    with pytest.raises(generation.GenerationError, match="boom"):
+        svc.generate_many(["A", "B"])
+    with pytest.raises(generation.GenerationError):
+        svc.generate("A")
+    assert backend.calls == [2, 1] and svc.stats()["errors"] == 3
+
+
+def test_result_cached_after_the_first_lookup_is_not_generated_again():
+    backend = FakeBackend()
+    svc = generation.GenerationService(backend, RenderCache())
+    key = svc.key(generation.make_prompt("Logo design", 3))
+    lookups = []
+
+    def get(k, _get=svc.cache.get):
+        if not lookups:  # a batch finishes right after this first miss
+            lookups.append(k)
+            svc.cache.put(k, b"done elsewhere")
+            return None, None
+        return _get(k)
+
+    svc.cache.get = get
+    assert svc.generate("Logo design") == "done elsewhere"
+    assert lookups == [key] and backend.calls == []
+
+
+def test_gig_form_falls_back_and_job_fills_description(client, user, monkeypatch):
+    backend = FakeBackend(block=True)
+    monkeypatch.setattr(generation, "_service", generation.GenerationService(backend, RenderCache()))
+    monkeypatch.setattr(generation, "AI_FORM_TIMEOUT", 0.05)
+    assert client.post("/gigs/new", data={"title": "Shopify store", "description": "", "price": "50"}).status_code == 302
+    gig = Gig.query.one()
+    assert gig.description == generation.template_description("Shopify store")
+    backend.release.set()
+    job = db.session.get(Job, jobs.claim_next().id)
+    assert jobs.run_job(job).status == "done"
+    assert db.session.get(Gig, gig.id).description == "about Shopify store (3)"
+    assert backend.calls == [["Shopify store"]]  # the job reused the call the form started
+
+
+def test_bulk_descriptions_endpoint(client, fake):
+    resp = client.post("/api/gigs/descriptions", json={"titles": ["A", "B", "A", "C", "D"], "bullets": 2})
+    assert resp.get_json()["descriptions"] == ["about A (2)", "about B (2)", "about A (2)", "about C (2)", "about D (2)"]
+    assert sum(len(c) for c in fake.calls) == 4 and len(fake.calls) <= 2
+    assert client.post("/api/gigs/descriptions", json={"titles": ["ok", " "]}).status_code == 400
+    queued = client.post("/api/gigs/descriptions", json={"missing": True})
+    assert queued.status_code == 202 and queued.get_json()["job_id"]
@@ -0,0 +1,91 @@
+import zipfile
+from datetime import datetime, timedelta
+
+from gigforge import jobs
+from gigforge.models import db, Client, Invoice, InvoiceItem, Job
+
+
+def _invoices(user, n):
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add(c)
+    db.session.commit()
+    for i in range(n):
+        inv = Invoice(user_id=user.id, client_id=c.id, project=f"Site {i}", amount=100)
+        inv.items.append(InvoiceItem(description="Dev", amount=100))
+        db.session.add(inv)
+    db.session.commit()
+
+
+def test_invoice_export_job_writes_zip(client, user, tmp_path, app):
+    app.config["EXPORT_DIR"] = str(tmp_path)
+    _invoices(user, 3)
+    resp = client.post("/api/exports/invoices", json={"start": "2000-01-01"})
+    assert resp.status_code == 202
+    job_id = resp.json["job_id"]
+    assert client.get(f"/api/exports/{job_id}").json["status"] == "queued"
+
+    jobs.run_worker(once=True, processes=0)
+
+    status = client.get(f"/api/exports/{job_id}").json
+    assert (status["status"], status["progress"], status["total"]) == ("done", 3, 3)
+    resp = client.get(status["download_url"])
+    (tmp_path / "dl.zip").write_bytes(resp.data)
+    with zipfile.ZipFile(tmp_path / "dl.zip") as zf:
+        names = zf.namelist()
+        assert len(names) == 3 and all(zf.read(n).startswith(b"%PDF") for n in names)
+
+
+def test_claim_next_is_exclusive(user):
+    job = jobs.enqueue("invoice_export", user.id)
+    assert jobs.claim_next().id == job.id
+    assert jobs.claim_next() is None
+    assert db.session.get(Job, job.id).status == "running"
+
+
+def test_failed_job_records_error(user):
+    jobs.enqueue("invoice_export", user.id, start="not-a-date")
+    jobs.run_worker(once=True, processes=0)
+    job = Job.query.one()
+    assert job.status == "failed" and job.error
+
+
+def test_export_dates_and_numbers_pdfs_and_cleans_up_on_failure(user, tmp_path, app, monkeypatch):
+    from gigforge import utils
+    app.config["EXPORT_DIR"] = str(tmp_path)
+    _invoices(user, 2)
+    seen = []
+    monkeypatch.setattr(utils, "generate_invoice_pdf_bytes",
+                        lambda items, client, project, **kw: seen.append(kw) or b"%PDF")
+    jobs.enqueue("invoice_export", user.id)
+    jobs.run_worker(once=True, processes=0)
+    first = Invoice.query.order_by(Invoice.id).first()
+    assert seen[0] == {"invoice_date": first.created_at.date().isoformat(), "invoice_number": first.id}
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("renderer crashed")
+    monkeypatch.setattr(utils, "generate_invoice_pdf_bytes", broken)
+    job = jobs.enqueue("invoice_export", user.id)
+    jobs.run_worker(once=True, processes=0)
+    assert db.session.get(Job, job.id).status == "failed"
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_stale_running_job_is_requeued(user):
+    stale = jobs.enqueue("invoice_export", user.id)
+    assert jobs.claim_next().id == stale.id
+    fresh = jobs.enqueue("invoice_export", user.id)
+    assert jobs.claim_next().id == fresh.id
+    db.session.get(Job, stale.id).started_at = datetime.utcnow() - timedelta(seconds=jobs.JOB_LEASE_SECONDS + 1)
+    db.session.commit()
+
+    assert jobs.claim_next().id == stale.id  # the dead worker's job goes back on the queue
+    assert db.session.get(Job, fresh.id).status == "running"
+    assert jobs.claim_next() is None
+
+
+def test_only_finished_exports_get_a_download_url(client, user):
+    sync = jobs.enqueue("fiverr_sync", user.id)
+    sync.status = "done"
+    db.session.commit()
+    status = client.get(f"/api/jobs/{sync.id}").json
+    assert status["status"] == "done" and "download_url" not in status
@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+from gigforge.models import db, Client, Invoice
+
+
+def _seed(user, n=7):
+    c = Client(user_id=user.id, name="Acme", created_at=datetime(2024, 1, 1))
+    db.session.add(c)
+    db.session.commit()
+    base = datetime(2024, 1, 1)
+    for i in range(n):
+        # Pairs share a timestamp so the id tie-breaker is exercised.
+        db.session.add(Invoice(user_id=user.id, client_id=c.id, project=f"P{i}", amount=i,
+                               status="paid" if i % 2 else "draft", created_at=base + timedelta(days=i // 2)))
+    db.session.commit()
+
+
+def test_keyset_pagination_walks_every_row_once(client, user):
+    _seed(user)
+    seen, cursor = [], None
+    while True:
+        resp = client.get("/api/invoices", query_string={"limit": 3, **({"cursor": cursor} if cursor else {})})
+        seen += [r["project"] for r in resp.json["data"]]
+        cursor = resp.json["next_cursor"]
+        if not cursor:
+            break
+    assert seen == ["P6", "P5", "P4", "P3", "P2", "P1", "P0"]
+    assert resp.json["data"][0]["client_name"] == "Acme"
+
+
+def test_filters(client, user):
+    _seed(user)
+    paid = client.get("/api/invoices?status=paid&since=2024-01-02").json["data"]
+    assert [r["project"] for r in paid] == ["P5", "P3"]
+    assert client.get("/api/invoices?status=bogus").status_code == 400
+    assert client.get("/api/invoices?cursor=!!").status_code == 400
+
+
+def test_streaming_exports(client, user):
+    _seed(user)
+    lines = client.get("/api/invoices?format=ndjson").get_data(as_text=True).splitlines()
+    assert [json.loads(l)["project"] for l in lines][:2] == ["P6", "P5"]
+    rows = list(csv.reader(io.StringIO(client.get("/api/clients?format=csv").get_data(as_text=True))))
+    assert rows[0] == ["id", "name", "email", "phone", "created_at"] and rows[1][1] == "Acme"
+    assert client.get("/api/gigs").json == {"data": [], "next_cursor": None}
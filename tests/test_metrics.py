@@ -0,0 +1,53 @@
+import json
+
+from flask import Response
+
+from gigforge import metrics
+from gigforge.models import db, User
+
+
+def test_metrics_endpoint_reports_route_latency(client):
+    client.get("/dashboard")
+    text = client.get("/metrics").get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{method="GET",route="/dashboard",status="200"}' in text
+    assert "db_queries_per_request_bucket" in text
+    assert 'render_cache_events_total{cache="promo",event="misses"}' in text
+
+
+def test_n_plus_one_and_slow_request_detection(app, user, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "N_PLUS_ONE_THRESHOLD", 3)
+    monkeypatch.setattr(metrics, "SLOW_REQUEST_SECONDS", 0)
+    before = metrics.registry.snapshot()["counters"].get('n_plus_one_requests_total{"route":"/dashboard"}', 0)
+    with app.test_request_context("/dashboard"):
+        app.preprocess_request()
+        for _ in range(3):
+            db.session.execute(db.select(User).where(User.id == user.id)).all()
+        with caplog.at_level("WARNING", logger="nightanvil.metrics"):
+            metrics._after_request(Response())
+    after = metrics.registry.snapshot()["counters"]['n_plus_one_requests_total{"route":"/dashboard"}']
+    assert after == before + 1
+    assert "possible N+1" in caplog.text and "slow request" in caplog.text and "db=" in caplog.text
+
+
+def test_snapshots_from_other_workers_are_merged(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    other = {"counters": {'slow_requests_total{"route":"/x"}': 5}, "histograms": {}, "buckets": {}}
+    (tmp_path / "metrics-999999.json").write_text(json.dumps(other))
+    metrics.registry.inc("slow_requests_total", {"route": "/x"}, 2)
+    merged = metrics.merged_snapshot()
+    assert merged["counters"]['slow_requests_total{"route":"/x"}'] >= 7
+    assert 'slow_requests_total{route="/x"}' in metrics.render_prometheus(merged)
+
+
+def test_label_values_are_escaped():
+    assert metrics._fmt_labels({"route": 'a\\b"c\nd'}) == '{route="a\\\\b\\"c\\nd"}'
+
+
+def test_metrics_without_token_is_local_only(client, monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", None)
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "10.0.0.5"}).status_code == 200
+    assert client.get("/metrics", environ_base={"REMOTE_ADDR": "8.8.8.8"}).status_code == 403
+    monkeypatch.setattr(metrics, "METRICS_TOKEN", "s3cret")
+    assert client.get("/metrics").status_code == 401
+    ok = client.get("/metrics", environ_base={"REMOTE_ADDR": "8.8.8.8"}, headers={"Authorization": "Bearer s3cret"})
+    assert ok.status_code == 200
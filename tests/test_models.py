@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from gigforge.models import db, Client, Gig, Invoice, InvoiceRollup, UserStats, rebuild_rollups
+
+
+def _rollups(user_id):
+    return {(r.dimension, r.bucket): (r.count, r.amount_cents)
+            for r in InvoiceRollup.query.filter_by(user_id=user_id) if r.count}
+
+
+def test_rollups_follow_invoice_lifecycle(user):
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add_all([c, Gig(user_id=user.id, title="Logo", price=50)])
+    db.session.commit()
+    inv = Invoice(user_id=user.id, client_id=c.id, project="Site", amount=120.10)
+    db.session.add(inv)
+    db.session.commit()
+
+    inv.status = "paid"
+    db.session.commit()
+    stats = db.session.get(UserStats, user.id)
+    assert (stats.invoice_count, stats.client_count, stats.gig_count) == (1, 1, 1)
+    assert stats.paid_revenue_cents == 12010
+    month, day = inv.created_at.strftime("%Y-%m"), inv.created_at.strftime("%Y-%m-%d")
+    assert inv.amount_cents == 12010
+    assert _rollups(user.id) == {("status", "paid"): (1, 12010), ("month", month): (1, 12010),
+                                 ("day", day): (1, 12010), ("paid_day", day): (1, 12010)}
+
+    inv.paid_at = datetime(2031, 1, 2)
+    db.session.commit()
+    assert ("paid_day", "2031-01-02") in _rollups(user.id) and ("paid_day", day) not in _rollups(user.id)
+
+    db.session.delete(inv)
+    db.session.commit()
+    db.session.refresh(stats)
+    assert (stats.invoice_count, stats.paid_revenue_cents) == (0, 0)
+    assert _rollups(user.id) == {}
+
+
+def test_rebuild_matches_incremental(user):
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add(c)
+    db.session.commit()
+    for i, status in enumerate(["draft", "paid", "paid", "sent"]):
+        db.session.add(Invoice(user_id=user.id, client_id=c.id, project=f"P{i}", amount=10 + i, status=status))
+    db.session.commit()
+    before = _rollups(user.id)
+    rebuild_rollups(user.id)
+    assert _rollups(user.id) == before
+    assert db.session.get(UserStats, user.id).paid_revenue_cents == 2300
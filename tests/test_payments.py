@@ -0,0 +1,73 @@
+import json
+
+from benchmarks.standins import stripe_signature
+from gigforge import jobs, payments
+from gigforge.models import db, Client, Invoice, UserStats, WebhookEvent
+
+
+def _event(event_id, kind, intent_id, created):
+    return {"id": event_id, "type": f"payment_intent.{kind}", "created": created,
+            "data": {"object": {"id": intent_id}}}
+
+
+def _post(app, evt, secret=None):
+    body = json.dumps(evt)
+    return app.test_client().post("/webhook/payments", data=body, content_type="application/json",
+                                  headers={"Stripe-Signature": stripe_signature(body, secret or payments.WEBHOOK_SECRET)})
+
+
+def _invoice(user, intent_id):
+    c = Client(user_id=user.id, name="Acme")
+    db.session.add(c)
+    db.session.commit()
+    inv = Invoice(user_id=user.id, client_id=c.id, project="Site", amount=50, status="sent",
+                  stripe_intent_id=intent_id)
+    db.session.add(inv)
+    db.session.commit()
+    return inv
+
+
+def test_webhook_only_records_and_dedupes(app, user):
+    evt = _event("evt_1", "succeeded", "pi_1", 1_700_000_000)
+    assert _post(app, evt).json == {"received": True, "duplicate": False}
+    assert _post(app, evt).json == {"received": True, "duplicate": True}
+    assert WebhookEvent.query.count() == 1
+    assert _post(app, {"type": "no id"}).status_code == 400
+
+
+def test_webhook_requires_a_valid_signature(app, user, monkeypatch):
+    inv = _invoice(user, "pi_1")
+    forged = _event("evt_forged", "succeeded", "pi_1", 1_700_000_000)
+    assert _post(app, forged, secret="whsec_attacker").status_code == 400
+    unsigned = app.test_client().post("/webhook/payments", json=forged)
+    assert unsigned.status_code == 400
+    monkeypatch.setattr(payments, "WEBHOOK_SECRET", "")
+    assert _post(app, forged, secret="whsec_any").status_code == 503
+    payments.drain_inbox()
+    assert WebhookEvent.query.count() == 0 and db.session.get(Invoice, inv.id).status == "sent"
+
+
+def test_inbox_settles_invoice_out_of_order(app, user):
+    inv = _invoice(user, "pi_1")
+    # The failure is delivered after the success but must not un-pay the invoice.
+    _post(app, _event("evt_ok", "succeeded", "pi_1", 1_700_000_100))
+    _post(app, _event("evt_fail", "payment_failed", "pi_1", 1_700_000_000))
+    _post(app, _event("evt_other", "succeeded", "pi_unknown", 1_700_000_200))
+
+    jobs.run_worker(once=True, processes=0, idle_hooks=(payments.process_inbox,))
+
+    db.session.refresh(inv)
+    assert inv.status == "paid" and inv.paid_at.year == 2023
+    assert db.session.get(UserStats, user.id).paid_revenue_cents == 5000
+    statuses = {e.event_id: e.status for e in WebhookEvent.query}
+    assert statuses == {"evt_ok": "applied", "evt_fail": "applied", "evt_other": "unmatched"}
+
+
+def test_replay_applies_unmatched_events_once_linked(app, user):
+    _post(app, _event("evt_early", "succeeded", "pi_late", 1_700_000_000))
+    payments.drain_inbox()
+    inv = _invoice(user, "pi_late")
+    assert payments.requeue_events() == 1
+    assert payments.drain_inbox() == 1
+    db.session.refresh(inv)
+    assert inv.status == "paid"
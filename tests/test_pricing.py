@@ -0,0 +1,101 @@
+import random
+
+import pytest
+
+from gigforge import pricing
+from gigforge.models import db, Gig
+
+RULES = pricing.PricingRules.from_dict({
+    "margin": 0.25, "minimum": 15,
+    "tiers": [{"up_to": 10, "factor": 1}, {"up_to": 40, "factor": 0.9}, {"factor": 0.8}],
+    "volume": [{"min_quantity": 5, "discount": 0.05}, {"min_quantity": 20, "discount": 0.1}],
+})
+
+
+def test_batch_quote_matches_single_line_formula():
+    rng = random.Random(7)
+    lines = []
+    for _ in range(500):
+        line = {"hours": rng.randrange(0, 8000) / 100, "rate": rng.randrange(100, 20000) / 100,
+                "quantity": rng.randrange(1, 30)}
+        if rng.random() < 0.3:
+            line["fixed"] = rng.randrange(0, 500000) / 100
+        lines.append(line)
+    result = pricing.quote(lines, RULES)
+    expected = [pricing.calc_price_cents(l["hours"], l["rate"], l.get("fixed"), quantity=l["quantity"], rules=RULES)
+                for l in lines]
+    assert result.total_cents.tolist() == expected
+
+
+def test_quote_is_exact_in_cents():
+    # 50 h at $19.99: tiers 10h*100% + 30h*90% + 10h*80% = 45 h -> $899.55, +25% -> $1124.4375 -> $1124.44
+    result = pricing.quote([{"hours": 50, "rate": 19.99, "quantity": 20}, {"fixed": 0.1}, {"fixed": 0.2}], RULES)
+    assert result.unit_cents.tolist() == [112444, 1500, 1500]  # minimum $15 floor
+    assert result.discount_cents.tolist()[0] == 224888  # 10% of 20 x 1124.44
+    assert pricing.quote([{"fixed": 0.1}] * 1000, pricing.PricingRules(margin_bp=0)).total_cents.sum() == 10000
+
+
+def test_invalid_rules_and_lines_are_rejected():
+    with pytest.raises(pricing.QuoteError):
+        pricing.PricingRules.from_dict({"tiers": [{"up_to": 10}, {"up_to": 5}]})
+    with pytest.raises(pricing.QuoteError):
+        pricing.quote([{"hours": -1, "rate": 10}])
+    with pytest.raises(pricing.QuoteError):
+        pricing.quote([{"hours": "ten", "rate": 10}])
+    # values that would wrap around in int64 are refused rather than mispriced
+    for line in ({"hours": 1e7, "rate": 1e5}, {"fixed": 1e17}, {"fixed": 10, "quantity": 1e16}, {"margin": 1e6}):
+        with pytest.raises(pricing.QuoteError):
+            pricing.quote([line])
+        with pytest.raises(pricing.QuoteError):
+            pricing.calc_price_cents(**line)
+    most = pricing.MAX_VALUES
+    rules = pricing.PricingRules.from_dict({"margin": most["margin"], "tiers": [{"factor": most["factor"]}],
+                                            "volume": [{"min_quantity": 1, "discount": 0.33}]})
+    line = {"hours": most["hours"], "rate": most["rate"], "quantity": most["quantity"]}
+    assert pricing.quote([line], rules).rows()[0]["total_cents"] == pricing.calc_price_cents(**line, rules=rules)
+
+
+def test_reprice_catalogue_what_if_then_apply(app, user):
+    gigs = [Gig(user_id=user.id, title="hourly", price=1, hours=10, hourly_rate=50),
+            Gig(user_id=user.id, title="fixed", price=120, fixed_price=100),
+            Gig(user_id=user.id, title="no inputs", price=42)]
+    db.session.add_all(gigs)
+    db.session.commit()
+    stamp = gigs[0].updated_at
+
+    preview = pricing.reprice_gigs(user.id, pricing.PricingRules(), {"rate_factor": 2})
+    assert preview["gigs"] == 2 and preview["changes"] == [{"gig_id": gigs[0].id, "old_cents": 100, "new_cents": 120000}]
+    assert db.session.get(Gig, gigs[0].id).price == 1
+
+    pricing.reprice_gigs(user.id, pricing.PricingRules(), {"rate_factor": 2}, apply=True)
+    db.session.expire_all()
+    assert [g.price for g in Gig.query.order_by(Gig.id)] == [1200.0, 120.0, 42.0]
+    assert db.session.get(Gig, gigs[0].id).updated_at > stamp
+
+
+def test_quote_api(client, user):
+    resp = client.post("/api/quote", json={"rules": {"margin": 0}, "lines": [{"hours": 2, "rate": 40, "ref": "a"}]})
+    assert resp.json == {"lines": [{"ref": "a", "unit_cents": 8000, "subtotal_cents": 8000, "discount_cents": 0,
+                                    "total_cents": 8000}], "total_cents": 8000}
+    assert client.post("/api/quote", json={"lines": [{"hours": -2}]}).status_code == 400
+    assert client.post("/api/quote", json={"lines": [{"hours": 1e7, "rate": 1e5}]}).status_code == 400
+    assert client.post("/api/generate_proposal", json={"hours": -1, "rate": 10}).status_code == 400
+    db.session.add(Gig(user_id=user.id, title="g", price=1, fixed_price=10))
+    db.session.commit()
+    resp = client.post("/api/quote", json={"catalogue": True, "apply": True, "overrides": {"margin": 0.5}})
+    assert resp.json["new_total_cents"] == 1500 and Gig.query.one().price == 15.0
+
+
+def test_gig_form_stores_pricing_inputs_and_cli_rejects_bad_ones(client, user):
+    from click.testing import CliRunner
+    from gigforge import cli
+    form = {"title": "Landing page", "description": "x", "price": "500", "hours": "10", "hourly_rate": "40"}
+    assert client.post("/gigs/new", data=form).status_code == 302
+    gig = Gig.query.one()
+    assert (gig.hours, gig.hourly_rate, gig.fixed_price) == (10, 40, None)
+    assert client.post("/gigs/new", data={**form, "hours": "-3"}).status_code == 400
+    assert client.post("/gigs/new", data={**form, "fixed_price": "lots"}).status_code == 400
+    assert Gig.query.count() == 1
+
+    result = CliRunner().invoke(cli.cli, ["gig", "--title", "X", "--hours", "-1", "--rate", "10"])
+    assert result.exit_code == 2 and "hours must be a non-negative number" in result.output
@@ -0,0 +1,55 @@
+import io, zipfile
+
+import pytest
+from PIL import Image
+
+from gigforge import promo
+
+
+def test_long_titles_wrap_shrink_and_cut():
+    title = promo.measure("React Landing Page Development With Tailwind", 0)
+    lines, size = promo.fit(title, 0, 1032, promo.MAX_TITLE_LINES, 1.0)
+    assert 1 < len(lines) <= promo.MAX_TITLE_LINES and size == 72
+    assert all(promo.font(0, size).getlength(line) <= 1032 for line in lines)
+    word = promo.measure("x" * 200, 0)
+    lines, size = promo.fit(word, 0, 372, promo.MAX_TITLE_LINES, 1 / 3)
+    assert lines[0].endswith("…") and size == round(72 / 3 * promo.MIN_TEXT_SCALE)
+    assert promo.font(0, size).getlength(lines[0]) <= 372
+
+
+def test_renders_every_variant_and_format_in_one_pass():
+    out = promo.render("React Pro", "Fast delivery", "og,square,320x100", "png,webp,jpg", year=2024)
+    assert [(r.variant.name, r.format) for r in out][:4] == [("og", "png"), ("og", "webp"), ("og", "jpeg"),
+                                                             ("square", "png")]
+    for r in out:
+        img = Image.open(io.BytesIO(r.data))
+        assert img.size == (r.variant.width, r.variant.height) and img.format == promo.FORMATS[r.format][0]
+    preview = promo.render("React Pro", "Fast delivery", "og", "png", "preview", year=2024)[0]
+    assert len(out[0].data) < len(preview.data)
+    with pytest.raises(promo.PromoError):
+        promo.parse_variants("og,banner")
+
+
+def test_api_variant_sets_are_zipped_and_cached(app):
+    promo.cache.clear()
+    c = app.test_client()
+    url = "/api/generate_promo?title=Zip&variants=marketplaces&formats=png,webp&profile=preview"
+    first = c.get(url)
+    assert first.mimetype == "application/zip" and first.headers["X-Cache"] == "MISS"
+    names = zipfile.ZipFile(io.BytesIO(first.data)).namelist()
+    assert names == [f"promo-{v}.{ext}" for v in ("fiverr", "og", "square") for ext in ("png", "webp")]
+    again = c.get(url)
+    assert again.headers["X-Cache"] == "MEMORY" and again.data == first.data
+    assert c.get(url.replace("formats=png,webp", "formats=webp")).headers["X-Cache"] == "MEMORY"
+    single = c.post("/api/generate_promo", json={"title": "Zip", "variants": ["thumb"], "formats": ["jpeg"]})
+    assert single.mimetype == "image/jpeg" and Image.open(io.BytesIO(single.data)).size == (400, 210)
+    assert c.get("/api/generate_promo?formats=gif").status_code == 400
+
+
+def test_disk_cache_files_do_not_claim_a_format(tmp_path, monkeypatch):
+    promo.cache.clear()
+    monkeypatch.setattr(promo.cache, "disk_dir", str(tmp_path))
+    promo.cached_render("Disk", "", "thumb", "png,webp,jpeg", "preview")
+    files = sorted(tmp_path.rglob("*.*"))
+    assert len(files) == 3 and {f.suffix for f in files} == {".bin"}
+    assert {Image.open(f).format for f in files} == {"PNG", "WEBP", "JPEG"}
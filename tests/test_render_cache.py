@@ -0,0 +1,41 @@
+from gigforge.render_cache import RenderCache, cache_key
+
+
+def test_memory_tier_is_lru():
+    cache = RenderCache(max_items=2)
+    calls = []
+    render = lambda k: (lambda: calls.append(k) or k.encode())
+    for k in ("a", "b", "a", "c", "b"):
+        cache.get_or_render(k, render(k))
+    # "b" was evicted by "c" (since "a" had been used more recently), so it is rendered twice.
+    assert calls == ["a", "b", "c", "b"]
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["evictions"] == 2
+
+
+def test_disk_tier_survives_restart_and_is_bounded(tmp_path):
+    cache = RenderCache(disk_dir=str(tmp_path), disk_max_bytes=250)
+    for i in range(5):
+        cache.get_or_render(cache_key(i), lambda: b"x" * 100)
+    files = list(tmp_path.rglob("*.bin"))
+    assert sum(f.stat().st_size for f in files) <= 250
+
+    fresh = RenderCache(disk_dir=str(tmp_path), disk_max_bytes=250)
+    entry, hit = fresh.get_or_render(cache_key(4), lambda: b"never rendered")
+    assert (hit, entry.data) == ("disk", b"x" * 100)
+
+
+def test_cache_key_covers_every_input():
+    assert cache_key("t", "s", (1, 2, 3)) != cache_key("t", "s", (1, 2, 4))
+
+
+def test_ttl_expires_both_tiers(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("gigforge.render_cache.time.time", lambda: now[0])
+    cache = RenderCache(disk_dir=str(tmp_path), ttl=60)
+    cache.put("k", b"old")
+    now[0] += 30
+    assert cache.get("k")[1] == "memory"
+    now[0] += 31
+    assert cache.get("k") == (None, None)
+    assert RenderCache(disk_dir=str(tmp_path), ttl=60).get("k") == (None, None)
+    assert cache.stats()["expired"] == 2 and not list(tmp_path.rglob("*.bin"))
@@ -0,0 +1,55 @@
+from gigforge import search
+from gigforge.models import db, Client, Gig, Invoice, InvoiceItem, User
+
+
+def _data(user):
+    other = User(username="bob", email="bob@example.com", password_hash="x")
+    acme = Client(user_id=user.id, name="Acme Webworks", email="ops@acme.io")
+    db.session.add_all([other, acme])
+    db.session.flush()
+    db.session.add_all([
+        Gig(user_id=user.id, title="Web design", description="Landing pages", price=100),
+        Gig(user_id=user.id, title="Logo", description="Vector web assets", price=50),
+        Gig(user_id=other.id, title="Web scraping", price=80),
+        Invoice(user_id=user.id, client_id=acme.id, project="Rebrand", amount=30,
+                items=[InvoiceItem(description="Website copy", amount=10), InvoiceItem(description="Webinar", amount=20)]),
+    ])
+    db.session.commit()
+
+
+def test_ranked_prefix_search_is_per_user_and_kept_in_sync(app, user):
+    _data(user)
+    hits = search.search(user.id, "we")["data"]
+    assert hits[-1]["title"] in ("Logo", "Rebrand")  # body-only matches rank below title matches
+    assert {h["title"] for h in hits} == {"Web design", "Logo", "Acme Webworks", "Rebrand"}
+    assert [h["title"] for h in search.search(user.id, "web des")["data"]] == ["Web design"]
+    assert search.search(user.id, "scrap")["data"] == []  # bob's gig
+    assert search.search(user.id, "web desi")["data"][0]["title"] == "Web design"
+    assert search.search(user.id, "we design")["data"] == []  # only the last word is a prefix
+    invoice = search.search(user.id, "webin")["data"]
+    assert invoice == [{"type": "invoice", "id": 1, "score": invoice[0]["score"], "title": "Rebrand",
+                        "amount": 30.0, "status": "draft", "client_name": "Acme Webworks"}]
+
+    gig = Gig.query.filter_by(title="Logo").one()
+    gig.title, gig.description = "Brand mark", None
+    db.session.commit()
+    assert [h["title"] for h in search.search(user.id, "brand")["data"]] == ["Brand mark"]
+    db.session.delete(Invoice.query.one())
+    db.session.commit()
+    assert search.search(user.id, "webinar")["data"] == []
+
+
+def test_pagination_types_and_rebuild(app, user, client):
+    db.session.execute(db.insert(Gig), [{"user_id": user.id, "title": f"Widget {i}", "price": 1} for i in range(25)])
+    db.session.commit()
+    first = search.search(user.id, "widg", limit=20)
+    rest = search.search(user.id, "widg", limit=20, offset=first["next_offset"])
+    assert len(first["data"]) == 20 and len(rest["data"]) == 5 and rest["next_offset"] is None
+    assert not {h["id"] for h in first["data"]} & {h["id"] for h in rest["data"]}
+    assert search.search(user.id, "widg", kinds=["client"])["data"] == []
+
+    db.session.execute(db.text(f"DELETE FROM {search.FTS_TABLE}"))
+    assert search.rebuild() == 25
+    resp = client.get("/api/search?q=widget+2&type=gig")
+    assert resp.status_code == 200 and {h["title"] for h in resp.get_json()["data"]} == {"Widget 2"} | {f"Widget {i}" for i in range(20, 25)}
+    assert client.get("/api/search?q=x&type=order").status_code == 400
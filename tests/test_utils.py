@@ -1,3 +1,53 @@
 from gigforge import utils
 def test_calc_price():
     assert utils.calc_price(hours=10, rate=10, margin=0.0)==100
+
+def test_promo_image_renders_png():
+    assert utils.generate_promo_image("Title", "Sub", year=2024).startswith(b"\x89PNG")
+
+def test_promo_cache_reuses_render():
+    utils.promo_cache.clear()
+    first, hit = utils.cached_promo_image("Cache me", "please")
+    again, hit2 = utils.cached_promo_image("Cache me", "please")
+    assert (hit, hit2) == (None, "memory") and first.key == again.key
+
+def test_invoice_pdf_paginates_long_invoices():
+    import io
+    buf = io.BytesIO()
+    items = ((f"Line {i} " + "x" * 300, 1.10) for i in range(500))
+    total = utils.invoice_pdf(items, "Client", "Project", buf)
+    pdf = buf.getvalue()
+    assert total == 550.0
+    # 24 rows per page -> 21 item pages plus the totals page
+    assert b"/Count 22" in pdf
+
+def test_short_invoice_stays_on_one_page():
+    pdf = utils.generate_invoice_pdf_bytes([("Design", 800), ("Dev", 1200)], "Acme", "Site")
+    assert b"/Count 1" in pdf
+
+def test_render_documents_batches_proposals_and_contracts():
+    payloads = [{"client": f"C{i}", "project": "Site", "deliverables": ["Design", "Dev"], "price": 100 + i}
+                for i in range(3)]
+    out = list(utils.render_documents(iter(payloads)))
+    assert [i for i, _ in out] == [0, 1, 2]
+    docs = out[2][1]
+    assert "Proposal for C2" in docs["proposal"] and "$102" in docs["proposal"]
+    assert "Scope: Work to deliver Site" in docs["contract"] and "Deliverables: Design, Dev" in docs["contract"]
+
+def test_template_edits_reload_only_when_enabled(tmp_path, monkeypatch):
+    import os, time
+    monkeypatch.setattr(utils, "TEMPLATES_DIR", str(tmp_path))
+    monkeypatch.setattr(utils, "TEMPLATE_CACHE_DIR", str(tmp_path))
+    utils.get_env.cache_clear()
+    path = tmp_path / "reload.j2"
+    try:
+        path.write_text("v1")
+        assert utils.render_template("reload.j2", {}) == "v1"
+        path.write_text("v2")
+        os.utime(path, (time.time() + 5, time.time() + 5))
+        utils.set_template_auto_reload(False)
+        assert utils.render_template("reload.j2", {}) == "v1"
+        utils.set_template_auto_reload(True)
+        assert utils.render_template("reload.j2", {}) == "v2"
+    finally:
+        utils.get_env.cache_clear()  # later tests get an environment on the real templates again